@@ -3,6 +3,7 @@ import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
+from utils.startup_profile import phase, log_report, import_time_report
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -25,17 +26,44 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 
 db.init_app(app)
 
-with app.app_context():
-    try:
+def init_db():
+    """
+    Create any missing database tables.
+
+    This is a deploy step (`flask --app app init-db`), not something every
+    process does at import time, so cold starts don't wait on the database.
+    """
+    with app.app_context():
         # Import models here to ensure they're registered before create_all
-        from models import InterviewQuestion, Message
+        import models
         logger.info("Creating database tables...")
         db.create_all()
+        # create_all skips tables that already exist; add indexes defined later
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=db.engine, checkfirst=True)
         logger.info("Database tables created successfully")
 
-        # Import routes after database initialization
+@app.cli.command("init-db")
+def init_db_command():
+    """Create database tables."""
+    init_db()
+    print("Database tables created")
+
+@app.cli.command("profile-imports")
+def profile_imports_command():
+    """Show which imports dominate application start-up time."""
+    print(f"{'module':<40} {'self ms':>10} {'cumulative ms':>14}")
+    for module, self_ms, cumulative_ms in import_time_report("app"):
+        print(f"{module:<40} {self_ms:>10.1f} {cumulative_ms:>14.1f}")
+
+try:
+    # Routes only wire things up; the OpenAI client and knowledge index
+    # are created lazily or warmed in the background
+    with phase("routes"):
         import routes
-        logger.info("Routes imported successfully")
-    except Exception as e:
-        logger.error(f"Error during application setup: {e}")
-        raise
\ No newline at end of file
+    logger.info("Routes imported successfully")
+    log_report()
+except Exception as e:
+    logger.error(f"Error during application setup: {e}")
+    raise
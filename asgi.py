@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from a2wsgi import WSGIMiddleware
+
+from app import app, init_db
+from routes import chat_pipeline, chat_sessions, rate_limiter, sse_event, CHAT_TIMING_HEADER
+from utils.rate_limit import client_address, bucket_keys, BucketKey, CHAT_RATE_PER_MINUTE, CHAT_BURST
+from utils.rag_utils import CHAT_ERROR_RESPONSE
+from utils.metrics import REGISTRY, METRICS_ENABLED
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Configuration
+ASYNC_CHAT_MAX_CONCURRENT = int(os.environ.get("ASYNC_CHAT_MAX_CONCURRENT", "500"))  # Chats in flight per process
+WSGI_THREADS = int(os.environ.get("WSGI_THREADS", "16"))      # Threads serving the Flask routes
+MAX_CHAT_BODY = 64 * 1024                                     # Largest accepted chat request, in bytes
+
+HTTP_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to build each response (streamed bodies excluded).",
+    ["endpoint", "method", "status"]
+)
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+async def read_json(receive) -> Optional[Dict[str, Any]]:
+    """The request body parsed as a JSON object; None if too large or malformed."""
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body += message.get("body", b"")
+        if len(body) > MAX_CHAT_BODY:
+            return None
+        if not message.get("more_body"):
+            break
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def request_client(scope, data: Dict[str, Any]) -> List[BucketKey]:
+    """Rate limit buckets of a request; see utils.rate_limit.client_key."""
+    headers = dict(scope.get("headers") or [])
+    forwarded = headers.get(b"x-forwarded-for", b"").decode("latin1")
+    forwarded_for = [address.strip() for address in forwarded.split(",") if address.strip()]
+    remote_addr = (scope.get("client") or ("", 0))[0]
+    return bucket_keys(client_address(remote_addr, forwarded_for), data.get("session_id"), chat_sessions.issued)
+
+
+async def send_json(send, status: int, payload: Dict[str, Any], headers: Optional[Headers] = None) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+                   + (headers or [])
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def chatbot(data: Dict[str, Any]) -> Tuple[Dict[str, Any], Headers]:
+    """POST /chatbot, answered on the event loop."""
+    try:
+        query = (data.get('query') or '').strip()
+        user_type = data.get('user_type', 'other')
+        if not query:
+            return {"response": "Please ask a question."}, []
+
+        session = chat_sessions.get(data.get('session_id'))
+        result = await chat_pipeline.run_async(query, user_type, history=session.memory())
+        chat_sessions.record(session, query, result.response)
+
+        headers = [(b"server-timing", result.server_timing().encode())] if CHAT_TIMING_HEADER else []
+        return {
+            "response": result.response,
+            "suggest_meeting": result.suggest_meeting,
+            "session_id": session.id
+        }, headers
+    except Exception as e:
+        logger.error(f"Error in chatbot: {str(e)}")
+        return {"response": CHAT_ERROR_RESPONSE, "suggest_meeting": False}, []
+
+
+async def chatbot_stream(data: Dict[str, Any], receive, send) -> None:
+    """
+    POST /chatbot/stream, answered on the event loop.
+
+    If the client disconnects, the completion stream is closed rather than
+    read to the end.
+    """
+    query = (data.get('query') or '').strip()
+    user_type = data.get('user_type', 'other')
+    session = chat_sessions.get(data.get('session_id'))
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")]
+    })
+
+    async def emit(event: str, payload: Dict[str, Any]) -> None:
+        await send({"type": "http.response.body", "body": sse_event(event, payload).encode("utf-8"), "more_body": True})
+
+    async def wait_for_disconnect() -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    disconnect = asyncio.ensure_future(wait_for_disconnect())
+    events = chat_pipeline.stream_async(query, user_type, history=session.memory())
+    try:
+        if not query:
+            await emit("token", {"text": "Please ask a question."})
+            await emit("done", {"suggest_meeting": False, "session_id": session.id})
+            return
+        try:
+            async for event, payload in events:
+                if disconnect.done():
+                    logger.info("Chat stream client disconnected; closing the completion")
+                    break
+                if event == "token":
+                    await emit("token", {"text": payload})
+                else:
+                    chat_sessions.record(session, query, payload.response)
+                    await emit("done", {"suggest_meeting": payload.suggest_meeting, "session_id": session.id})
+        except Exception as e:
+            logger.error(f"Error in streaming chatbot: {str(e)}")
+            await emit("error", {"response": CHAT_ERROR_RESPONSE})
+    finally:
+        await events.aclose()
+        disconnect.cancel()
+        await send({"type": "http.response.body", "body": b""})
+
+
+class ChatASGIApp:
+    """
+    Async serving mode.
+
+    The chat endpoints, which spend nearly all their time waiting on
+    OpenAI, run as coroutines on the event loop with the async OpenAI
+    client, so one process can hold hundreds of chats in flight. Every
+    other route is the Flask app, run on a pool of WSGI_THREADS threads.
+    Both modes share the pipeline, caches, sessions and rate limits;
+    the chat concurrency cap is raised to ASYNC_CHAT_MAX_CONCURRENT.
+
+    Run with e.g. `uvicorn asgi:application --host 0.0.0.0 --port 5000`.
+    """
+
+    routes = {"/chatbot": "chatbot", "/chatbot/stream": "chatbot_stream"}
+
+    def __init__(self, wsgi_app, max_concurrent: int = ASYNC_CHAT_MAX_CONCURRENT, wsgi_threads: int = WSGI_THREADS):
+        self.wsgi = WSGIMiddleware(wsgi_app, workers=wsgi_threads)
+        # Same bucket per client as the sync routes; only the in-flight cap differs
+        rate_limiter.budget("chat", CHAT_RATE_PER_MINUTE, CHAT_BURST, max_concurrent)
+
+    async def __call__(self, scope, receive, send) -> None:
+        endpoint = self.routes.get(scope.get("path")) if scope["type"] == "http" else None
+        if endpoint is None or scope["method"] != "POST":
+            await self.wsgi(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 200
+        data = await read_json(receive)
+        if data is None:
+            status = 400
+            await send_json(send, status, {"response": "Invalid request."})
+        else:
+            client = request_client(scope, data)
+            rejection = rate_limiter.admit("chat", client)
+            if rejection is not None:
+                _, retry_after, message = rejection
+                seconds, body = rate_limiter.rejection_body(retry_after, message)
+                status = 429
+                await send_json(send, status, body, [(b"retry-after", str(seconds).encode())])
+            else:
+                try:
+                    if endpoint == "chatbot":
+                        payload, headers = await chatbot(data)
+                        await send_json(send, status, payload, headers)
+                    else:
+                        await chatbot_stream(data, receive, send)
+                finally:
+                    rate_limiter.release("chat")
+        if METRICS_ENABLED:
+            HTTP_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, method="POST", status=str(status))
+
+
+application = ChatASGIApp(app)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    if os.environ.get("SKIP_DB_INIT", "").lower() not in ("1", "true", "yes"):
+        try:
+            init_db()
+        except Exception as e:
+            logger.warning(f"Could not create database tables: {e}")
+    uvicorn.run(application, host="0.0.0.0", port=int(os.environ.get("PORT", "5000")))
@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+import tempfile
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+def configure_environment(openai_url: str, workdir: str = None) -> str:
+    """
+    Point the app at the fake OpenAI server and at throwaway storage.
+
+    Must run before the app's modules are imported: they read their
+    configuration at import time. Returns the working directory used.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix="bench-")
+    os.environ["OPENAI_BASE_URL"] = openai_url
+    os.environ["OPENAI_API_KEY"] = "fake-key"
+    os.environ.setdefault("FLASK_SECRET_KEY", "benchmark")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    os.environ["EMBEDDING_STORE_DIR"] = os.path.join(workdir, "embeddings")
+    os.environ["PDF_CACHE_DIR"] = os.path.join(workdir, "pdf-cache")
+    os.environ["LINKEDIN_CACHE_DIR"] = os.path.join(workdir, "linkedin-cache")
+    # Every simulated user shares one client address; measure the app, not the limiter
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    return workdir
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Latency percentiles in milliseconds."""
+    if not latencies:
+        return {"count": 0}
+    values = np.asarray(latencies) * 1000
+    return {
+        "count": len(values),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max())
+    }
+
+
+def time_calls(fn, repeat: int) -> Dict[str, float]:
+    """Call fn repeat times and summarize the wall-clock time of each call."""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def run_metadata() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+
+def write_results(path: str, kind: str, config: Dict[str, Any], results: Any) -> None:
+    """Write a benchmark run as JSON, for benchmarks.compare."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"kind": kind, "meta": run_metadata(), "config": config, "results": results}, f, indent=2)
+    print(f"Results written to {path}")
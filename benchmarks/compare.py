@@ -0,0 +1,48 @@
+"""
+Compare two benchmark result files written by benchmarks.micro or benchmarks.load:
+
+    python -m benchmarks.compare baseline.json candidate.json
+
+Prints every latency percentile and throughput figure found in both runs
+with the relative change.
+"""
+import sys
+import json
+from typing import Any, Dict, Iterator, Tuple
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "mean_ms", "throughput_rps", "index_build_s")
+
+
+def flatten(results: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """Yield (path, value) for every metric in a results tree."""
+    if not isinstance(results, dict):
+        return
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if key in METRICS and isinstance(value, (int, float)):
+            yield path, float(value)
+        else:
+            yield from flatten(value, path)
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> None:
+    old = dict(flatten(baseline["results"]))
+    new = dict(flatten(candidate["results"]))
+    print(f"baseline:  {baseline['meta'].get('commit')} {baseline['meta'].get('timestamp')}")
+    print(f"candidate: {candidate['meta'].get('commit')} {candidate['meta'].get('timestamp')}")
+    print(f"{'metric':<60} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for path in sorted(old.keys() & new.keys()):
+        change = (new[path] - old[path]) / old[path] * 100 if old[path] else 0.0
+        print(f"{path:<60} {old[path]:>12.2f} {new[path]:>12.2f} {change:>+8.1f}%")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(sys.argv[2], 'r', encoding='utf-8') as f:
+        candidate = json.load(f)
+    if baseline.get("kind") != candidate.get("kind"):
+        sys.exit(f"Cannot compare a {baseline.get('kind')} run with a {candidate.get('kind')} run")
+    compare(baseline, candidate)
@@ -0,0 +1,224 @@
+"""
+Local stand-in for the OpenAI API, for offline benchmarks.
+
+Serves POST /v1/embeddings and POST /v1/chat/completions (plain and
+streamed) with deterministic output, configurable latency and an optional
+rate of 503 errors (to exercise retries and the circuit breaker). Embeddings
+are hashed bags of words, so texts that share words are similar, as with
+a real embedding model.
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 and
+any OPENAI_API_KEY. Run standalone with:
+
+    python -m benchmarks.fake_openai --port 8765 --completion-latency 0.3
+"""
+import re
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 1536
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class FakeOpenAIConfig:
+    """Latencies in seconds; answers are `tokens` words long; error_rate of requests fail with a 503."""
+
+    def __init__(self, embedding_latency: float = 0.05, completion_latency: float = 0.3,
+                 token_latency: float = 0.01, tokens: int = 40, dim: int = EMBEDDING_DIM,
+                 error_rate: float = 0.0):
+        self.embedding_latency = embedding_latency
+        self.completion_latency = completion_latency
+        self.token_latency = token_latency
+        self.tokens = tokens
+        self.dim = dim
+        self.error_rate = error_rate
+        self.failed_requests = 0
+        self.embedding_requests = 0
+        self.embedding_inputs = 0
+        self.completion_requests = 0
+        self._lock = threading.Lock()
+        self._token_vectors: Dict[str, np.ndarray] = {}
+
+    def token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            seed = int.from_bytes(hashlib.sha256(token.encode('utf-8')).digest()[:8], 'little')
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            self._token_vectors[token] = vector
+        return vector
+
+    def embed(self, text: str) -> List[float]:
+        tokens = TOKEN_PATTERN.findall(text.lower()) or [""]
+        vector = np.sum([self.token_vector(token) for token in tokens], axis=0)
+        return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+    def answer(self, prompt: str) -> List[str]:
+        words = TOKEN_PATTERN.findall(prompt)[-8:] or ["answer"]
+        return [words[i % len(words)] for i in range(self.tokens)]
+
+    def count(self, **counters: int) -> None:
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "embedding_requests": self.embedding_requests,
+            "embedding_inputs": self.embedding_inputs,
+            "completion_requests": self.completion_requests,
+            "failed_requests": self.failed_requests
+        }
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    config: FakeOpenAIConfig = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload: Dict, status: int = 200) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, data: str) -> None:
+        body = data.encode('utf-8')
+        self.wfile.write(f"{len(body):x}\r\n".encode('ascii') + body + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        try:
+            request = self._read_json()
+            if self.config.error_rate and random.random() < self.config.error_rate:
+                self.config.count(failed_requests=1)
+                self._send_json({"error": {"message": "Injected failure", "type": "server_error"}}, 503)
+            elif self.path.endswith('/embeddings'):
+                self._embeddings(request)
+            elif self.path.endswith('/chat/completions'):
+                self._chat(request)
+            else:
+                self._send_json({"error": {"message": f"Unknown path {self.path}"}}, 404)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _embeddings(self, request: Dict) -> None:
+        config = self.config
+        inputs = request.get("input", [])
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        time.sleep(config.embedding_latency)
+        config.count(embedding_requests=1, embedding_inputs=len(inputs))
+        tokens = sum(len(TOKEN_PATTERN.findall(str(text))) for text in inputs)
+        self._send_json({
+            "object": "list",
+            "model": request.get("model", "fake-embedding"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": config.embed(str(text))}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        })
+
+    def _chat(self, request: Dict) -> None:
+        config = self.config
+        config.count(completion_requests=1)
+        prompt = " ".join(str(message.get("content", "")) for message in request.get("messages", []))
+        words = config.answer(prompt)
+        prompt_tokens = len(TOKEN_PATTERN.findall(prompt))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                 "total_tokens": prompt_tokens + len(words)}
+        base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": request.get("model", "fake-chat")}
+
+        time.sleep(config.completion_latency)
+        if not request.get("stream"):
+            time.sleep(config.token_latency * len(words))
+            self._send_json(dict(base, object="chat.completion", usage=usage, choices=[{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(words)},
+                "finish_reason": "stop"
+            }]))
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for i, word in enumerate(words):
+            chunk = dict(base, object="chat.completion.chunk", choices=[{
+                "index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None
+            }])
+            self._send_chunk(f"data: {json.dumps(chunk)}\n\n")
+            time.sleep(config.token_latency)
+        final = dict(base, object="chat.completion.chunk",
+                     choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (request.get("stream_options") or {}).get("include_usage"):
+            final["usage"] = usage
+        self._send_chunk(f"data: {json.dumps(final)}\n\n")
+        self._send_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The async server opens hundreds of connections at once
+    request_queue_size = 1024
+
+
+def start_server(config: FakeOpenAIConfig, host: str = "127.0.0.1",
+                 port: int = 0) -> Tuple[FakeOpenAIServer, str]:
+    """Serve in a daemon thread. Returns the server and its base URL (ending in /v1)."""
+    handler = type("ConfiguredFakeOpenAIHandler", (FakeOpenAIHandler,), {"config": config})
+    server = FakeOpenAIServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    url = f"http://{host}:{server.server_address[1]}/v1"
+    logger.info(f"Fake OpenAI API listening on {url}")
+    return server, url
+
+
+def add_latency_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="Seconds per embeddings request")
+    parser.add_argument("--completion-latency", type=float, default=0.3, help="Seconds before the first token")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="Seconds per generated token")
+    parser.add_argument("--tokens", type=int, default=40, help="Tokens per answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with a 503")
+
+
+def config_from_args(args: argparse.Namespace) -> FakeOpenAIConfig:
+    return FakeOpenAIConfig(args.embedding_latency, args.completion_latency, args.token_latency, args.tokens,
+                            error_rate=args.error_rate)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    add_latency_arguments(parser)
+    args = parser.parse_args()
+    server, url = start_server(config_from_args(args), port=args.port)
+    print(f"Serving fake OpenAI API on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
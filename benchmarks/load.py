@@ -0,0 +1,182 @@
+"""
+Concurrent load generator for /chatbot, /appointment/slots, /contact and the home page.
+
+By default the app is started in-process (werkzeug, threaded) against a
+throwaway SQLite database and the local fake OpenAI server, so a run is
+fully offline and repeatable:
+
+    python -m benchmarks.load --requests 300 --concurrency 16 --output load.json
+
+Use --url to load an already running deployment instead; it must be
+configured for whatever OpenAI endpoint you want to measure against.
+Reports p50/p95/p99 latency, throughput and errors per endpoint.
+"""
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.fake_openai import start_server, add_latency_arguments, config_from_args
+from benchmarks.common import configure_environment, summarize, write_results
+
+QUESTIONS = [
+    "What is your experience with {}?",
+    "Tell me about your work in {}",
+    "How have you used {} in your career?",
+    "Do you have certifications in {}?",
+    "Describe a project involving {}",
+]
+SUBJECTS = [
+    "IT service management", "ITIL", "team leadership", "cloud migration", "SLA management",
+    "digital transformation", "vendor management", "incident management", "agile delivery", "budgeting",
+]
+USER_TYPES = ["recruiter", "employer", "other"]
+ENDPOINTS = ("chatbot", "slots", "contact", "page")
+
+
+def request_factory(endpoint: str, query_pool: int, seed: int) -> Callable[[int], Tuple[str, str, bytes, Dict]]:
+    """Return a function building the i-th request (method, path, body, headers) for endpoint."""
+    rng = random.Random(seed)
+    templates = [question.format(subject) for question in QUESTIONS for subject in SUBJECTS]
+    rng.shuffle(templates)
+    # Beyond the templates, number the repeats so every query in the pool is distinct
+    queries = [templates[i % len(templates)] + (f" ({i // len(templates)})" if i >= len(templates) else "")
+               for i in range(max(1, query_pool))]
+    monday = datetime.utcnow().date() + timedelta(days=7 - datetime.utcnow().weekday())
+
+    def build(i: int):
+        if endpoint == "chatbot":
+            body = json.dumps({"query": queries[i % len(queries)], "user_type": USER_TYPES[i % len(USER_TYPES)]})
+            return "POST", "/chatbot", body.encode('utf-8'), {"Content-Type": "application/json"}
+        if endpoint == "slots":
+            start = datetime(monday.year, monday.month, monday.day) + timedelta(days=i % 14)
+            params = urllib.parse.urlencode({"start": start.isoformat() + "Z",
+                                             "end": (start + timedelta(days=7)).isoformat() + "Z"})
+            return "GET", f"/appointment/slots?{params}", None, {}
+        if endpoint == "page":
+            return "GET", "/", None, {"Accept-Encoding": "gzip"}
+        body = urllib.parse.urlencode({"name": f"Load {i}", "email": f"load{i}@example.com",
+                                       "message": "Benchmark message"})
+        return "POST", "/contact", body.encode('utf-8'), {"Content-Type": "application/x-www-form-urlencoded"}
+
+    return build
+
+
+def send(base_url: str, method: str, path: str, body: bytes, headers: Dict) -> Tuple[int, float]:
+    request = urllib.request.Request(base_url + path, data=body, headers=headers, method=method)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def run_endpoint(base_url: str, endpoint: str, requests: int, concurrency: int,
+                 query_pool: int) -> Dict[str, Any]:
+    build = request_factory(endpoint, query_pool, seed=requests)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def worker(i: int):
+        status, elapsed = send(base_url, *build(i))
+        with lock:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if 200 <= status < 300:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(latencies)
+    summary.update({
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": requests - len(latencies),
+        "statuses": statuses,
+        "throughput_rps": requests / elapsed if elapsed else 0.0,
+        "duration_s": elapsed
+    })
+    return summary
+
+
+def start_app(port: int = 0) -> str:
+    """Serve the app in-process; returns its base URL once /readyz reports ready."""
+    from werkzeug.serving import make_server
+    from app import app, init_db
+
+    init_db()
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-app", daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        status, _ = send(base_url, "GET", "/readyz", None, {})
+        if status == 200:
+            return base_url
+        time.sleep(0.2)
+    raise RuntimeError("App did not become ready within 120s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Load this running server instead of starting the app in-process")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--query-pool", type=int, default=40, help="Distinct chatbot queries (repeats hit caches)")
+    parser.add_argument("--output", default="bench-load.json")
+    add_latency_arguments(parser)
+    args = parser.parse_args()
+
+    fake = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        logging.disable(logging.INFO)
+        fake = config_from_args(args)
+        _, openai_url = start_server(fake)
+        configure_environment(openai_url)
+        base_url = start_app()
+
+    results = {}
+    for endpoint in [name for name in args.endpoints.split(",") if name]:
+        if endpoint not in ENDPOINTS:
+            parser.error(f"Unknown endpoint {endpoint}; choose from {', '.join(ENDPOINTS)}")
+        print(f"Loading {endpoint}: {args.requests} requests, concurrency {args.concurrency}")
+        results[endpoint] = run_endpoint(base_url, endpoint, args.requests, args.concurrency, args.query_pool)
+        summary = results[endpoint]
+        print(f"  p50={summary.get('p50_ms', 0):.1f}ms p95={summary.get('p95_ms', 0):.1f}ms "
+              f"p99={summary.get('p99_ms', 0):.1f}ms {summary['throughput_rps']:.1f} req/s "
+              f"errors={summary['errors']}")
+
+    if fake is not None:
+        results["fake_openai"] = fake.stats()
+    try:
+        with urllib.request.urlopen(base_url + "/admin/stats", timeout=10) as response:
+            results["app_stats"] = json.loads(response.read())
+    except Exception:
+        pass
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    write_results(args.output, "load", config, results)
+
+
+if __name__ == "__main__":
+    main()
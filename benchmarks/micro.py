@@ -0,0 +1,163 @@
+"""
+Micro-benchmarks for content loading, retrieval and PDF extraction.
+
+Synthetic knowledge bases and PDFs of increasing size are generated in a
+temporary directory, and OpenAI calls go to the local fake server, so no
+network access is needed:
+
+    python -m benchmarks.micro --sizes 10,100,1000 --output micro.json
+
+Compare two runs with `python -m benchmarks.compare old.json new.json`.
+"""
+import os
+import time
+import random
+import logging
+import argparse
+from typing import Any, Dict, List
+
+from benchmarks.fake_openai import start_server, add_latency_arguments, config_from_args
+from benchmarks.common import configure_environment, time_calls, write_results
+
+VOCABULARY = """
+service management itil sla kpi incident problem change release cloud azure aws
+migration team leadership stakeholder budget vendor contract transformation agile
+scrum devops automation monitoring python sql reporting dashboard governance risk
+security compliance audit customer support escalation process improvement lean
+""".split()
+TOPICS = ["Experience", "Projects", "Skills", "Education", "Certifications", "Achievements"]
+
+
+def sentence(rng: random.Random, words: int = 14) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words)).capitalize() + "."
+
+
+def write_knowledge_base(path: str, sections: int, seed: int = 0) -> None:
+    """A markdown knowledge base with `sections` subsections of a few paragraphs each."""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(sections):
+        if i % 10 == 0:
+            lines.append(f"# {TOPICS[(i // 10) % len(TOPICS)]} {i // 10}")
+        lines.append(f"## Section {i}")
+        for _ in range(3):
+            lines.append(" ".join(sentence(rng) for _ in range(3)))
+        lines.append("")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+
+
+def _pdf_string(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 40, seed: int = 0) -> None:
+    """A text-only PDF with CV-like section headings, written without a PDF library."""
+    rng = random.Random(seed)
+    headings = ["Summary", "Experience", "Education", "Skills"]
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages, filled in below
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    kids = []
+    for page in range(pages):
+        text = ["BT /F1 10 Tf 12 TL 40 800 Td"]
+        for line in range(lines_per_page):
+            content = headings[page % len(headings)] if line == 0 else sentence(rng, 10)
+            text.append(f"({_pdf_string(content)}) Tj T*")
+        text.append("ET")
+        stream = "\n".join(text)
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_ref = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    output = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    output += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    with open(path, 'w', encoding='latin-1') as f:
+        f.write(output)
+
+
+def run(sizes: List[int], repeat: int, workdir: str) -> Dict[str, Any]:
+    # Imported here: configure_environment must run first
+    from utils import rag_utils
+    from utils.pdf_parser import extract_pdf_content, iter_pdf_pages
+
+    results = {}
+    rng = random.Random(1)
+    for size in sizes:
+        print(f"Benchmarking {size} sections")
+        kb_path = os.path.join(workdir, f"kb-{size}.md")
+        pdf_path = os.path.join(workdir, f"cv-{size}.pdf")
+        write_knowledge_base(kb_path, size)
+        write_pdf(pdf_path, pages=max(1, size // 20))
+
+        def load():
+            return rag_utils.load_content_from_file(kb_path, warm=False, interviews_dir=None, documents_dir=None)
+
+        sections = load()
+        entry = {
+            "sections": len(sections),
+            "load_content_from_file": time_calls(load, repeat)
+        }
+
+        # First query builds the snapshot: embeds every section, builds both indexes
+        start = time.perf_counter()
+        rag_utils.find_relevant_context("team leadership experience", sections)
+        entry["index_build_s"] = time.perf_counter() - start
+
+        # Retrieval alone, with the query already embedded
+        query = "What is your experience with service management and itil?"
+        embedding = rag_utils.get_query_embedding(query)
+        entry["find_relevant_context"] = time_calls(
+            lambda: rag_utils.find_relevant_context(query, sections, query_embedding=embedding), repeat
+        )
+        # Including the query embedding round trip (unique queries miss the cache)
+        entry["find_relevant_context_with_embedding"] = time_calls(
+            lambda: rag_utils.find_relevant_context(sentence(rng, 8), sections), repeat
+        )
+
+        entry["pdf_pages"] = max(1, size // 20)
+        # Without the page cache, then with it warm
+        entry["extract_pdf_pages_uncached"] = time_calls(
+            lambda: list(iter_pdf_pages(pdf_path, cache_dir=None)), max(1, repeat // 4)
+        )
+        entry["extract_pdf_content"] = time_calls(lambda: extract_pdf_content(pdf_path), max(1, repeat // 4))
+        results[str(size)] = entry
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated knowledge base sizes (sections)")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed calls per measurement")
+    parser.add_argument("--output", default="bench-micro.json")
+    add_latency_arguments(parser)
+    parser.set_defaults(embedding_latency=0.0, completion_latency=0.0, token_latency=0.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    fake = config_from_args(args)
+    server, url = start_server(fake)
+    workdir = configure_environment(url)
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+
+    results = run(sizes, args.repeat, workdir)
+    results["fake_openai"] = fake.stats()
+    config = {"sizes": sizes, "repeat": args.repeat, "embedding_latency": args.embedding_latency}
+    write_results(args.output, "micro", config, results)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
-from app import app
+import os
+from app import app, init_db
 import logging
 
 logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
 
 if __name__ == "__main__":
+    # Deployments should run `flask --app app init-db` as a separate step and
+    # set SKIP_DB_INIT=1; a briefly unreachable database is not fatal here
+    if os.environ.get("SKIP_DB_INIT", "").lower() not in ("1", "true", "yes"):
+        try:
+            init_db()
+        except Exception as e:
+            logger.warning(f"Could not create database tables: {e}")
     app.run(host="0.0.0.0", port=5000, debug=True)
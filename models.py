@@ -8,6 +8,9 @@ class InterviewQuestion(db.Model):
     category = db.Column(db.String(100), nullable=False)
 
 class Message(db.Model):
+    # Admin browsing pages through messages newest first
+    __table_args__ = (db.Index('ix_message_created_at_id', 'created_at', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=False)
@@ -15,13 +18,33 @@ class Message(db.Model):
     created_at = db.Column(db.DateTime, server_default=db.func.now())
 
 class ChatMessage(db.Model):
+    # Admin browsing pages newest first, optionally for one user type
+    __table_args__ = (
+        db.Index('ix_chat_message_created_at_id', 'created_at', 'id'),
+        db.Index('ix_chat_message_user_type_created_at_id', 'user_type', 'created_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_type = db.Column(db.String(50), nullable=False)
     message = db.Column(db.Text, nullable=False)
     response = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
 
+class ChatRollup(db.Model):
+    """Chats per day and user type, kept after the chats themselves are archived."""
+    __table_args__ = (db.UniqueConstraint('day', 'user_type', name='uq_chat_rollup_day_user_type'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    user_type = db.Column(db.String(50), nullable=False)
+    chats = db.Column(db.Integer, nullable=False, default=0)
+    top_queries = db.Column(db.Text, nullable=False, default='[]')  # JSON: [{"query": ..., "count": ...}]
+    updated_at = db.Column(db.DateTime, server_default=db.func.now())
+
 class Appointment(db.Model):
+    # Availability queries filter on active statuses and a date range
+    __table_args__ = (db.Index('ix_appointment_status_date', 'status', 'date'),)
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=False)
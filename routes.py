@@ -1,10 +1,37 @@
 import os
-from flask import render_template, request, jsonify
+import json
+import hmac
+import uuid
+from functools import wraps
+from flask import render_template, request, jsonify, Response, stream_with_context, has_app_context
 from werkzeug.utils import secure_filename
+from sqlalchemy import text, event
 from app import app, db
-from models import Message, Appointment, ChatMessage
-from utils.rag_utils import load_content_from_file, find_relevant_context, get_chat_response
-from utils.linkedin_scraper import save_linkedin_data
+from models import Message, Appointment, ChatMessage, ChatRollup, InterviewQuestion
+from utils.rag_utils import (
+    is_index_ready, openai_available, get_query_cache_stats, get_knowledge_version, get_openai_stats, is_fallback_response,
+    summarize_conversation, DOCUMENTS_DIR
+)
+from utils.pdf_parser import write_pdf_markdown
+from utils.knowledge_base import KnowledgeBase, KNOWLEDGE_WATCH
+from utils.chat_pipeline import ChatPipeline
+from utils.chat_sessions import ChatSessionStore
+from utils.response_cache import ResponseCache
+from utils.faq_index import FAQIndex, load_qa_files
+from utils.write_behind import WriteBehindQueue, WRITE_BEHIND_ENABLED
+from utils.jobs import JobQueue, Debouncer, JOB_MAX_PENDING
+from utils.http_cache import HTTPCache
+from utils.rate_limit import (
+    RateLimiter, client_key, CHAT_RATE_PER_MINUTE, CHAT_BURST, CHAT_MAX_CONCURRENT,
+    IMPORT_RATE_PER_MINUTE, IMPORT_BURST, IMPORT_MAX_CONCURRENT
+)
+from utils.pagination import keyset_page, page_size
+from utils.log_maintenance import LogMaintenance, ROLLUPS_ENABLED, RETENTION_ENABLED
+from utils.availability import (
+    AvailabilityEngine, SlotConflict, to_utc_naive, day_lock_keys, MAX_APPOINTMENT_MINUTES
+)
+from utils.startup_profile import report as startup_report
+from utils.metrics import REGISTRY, METRICS_ENABLED, instrument_app, instrument_sqlalchemy
 from datetime import datetime, timedelta
 import logging
 
@@ -12,11 +39,158 @@ import logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Send per-stage chat timings in a Server-Timing header (debugging aid)
+CHAT_TIMING_HEADER = os.environ.get("CHAT_TIMING_HEADER", "").lower() in ("1", "true", "yes")
+KNOWLEDGE_RELOAD_DEBOUNCE = float(os.environ.get("KNOWLEDGE_RELOAD_DEBOUNCE", "2"))  # Seconds of quiet before reloading
+# Chat logs and contact messages are only served to requests carrying this token; unset disables them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
 # Ensure content directories exist
+UPLOAD_DIR = 'content/.cache/uploads'
 os.makedirs('content/interviews', exist_ok=True)
+os.makedirs(DOCUMENTS_DIR, exist_ok=True)
+os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-# Load content at startup
-knowledge_base = load_content_from_file()
+def load_faq_pairs():
+    """Curated answers: the InterviewQuestion table first, then the Q&A files."""
+    pairs = load_qa_files()
+    try:
+        with app.app_context():
+            questions = InterviewQuestion.query.order_by(InterviewQuestion.id).all()
+        pairs = [{"question": q.question, "answer": q.answer} for q in questions] + pairs
+    except Exception as e:
+        logger.error(f"Error loading interview questions: {str(e)}")
+    return pairs
+
+# Direct answers for curated questions, rebuilt when the table or Q&A files change
+faq = FAQIndex(load_faq_pairs)
+
+# Pre-rendered pages, ETags and versioned, precompressed static files
+http_cache = HTTPCache(app)
+
+# Per-client token buckets and per-route concurrency caps for expensive endpoints;
+# in session mode only ids chat_sessions handed out get their own bucket
+rate_limiter = RateLimiter(key=lambda: client_key(chat_sessions.issued))
+
+@event.listens_for(InterviewQuestion, 'after_insert')
+@event.listens_for(InterviewQuestion, 'after_update')
+@event.listens_for(InterviewQuestion, 'after_delete')
+def invalidate_faq(mapper, connection, target):
+    faq.invalidate()
+
+def on_knowledge_change():
+    faq.invalidate()
+    http_cache.invalidate()
+
+# Load content and warm the index in the background; /readyz reports when done
+knowledge = KnowledgeBase(on_change=on_knowledge_change)
+knowledge.start()
+if KNOWLEDGE_WATCH:
+    knowledge.watch()
+
+response_cache = ResponseCache()
+
+# Multi-turn memory: a rolling summary plus the latest exchanges per session
+chat_sessions = ChatSessionStore(summarize=summarize_conversation)
+
+# Background jobs (LinkedIn imports); reloads after imports are debounced into one
+jobs = JobQueue()
+knowledge_reload = Debouncer(knowledge.reload, KNOWLEDGE_RELOAD_DEBOUNCE)
+
+# Optional batched persistence for chat logs and contact messages
+write_behind = WriteBehindQueue(app, db)
+if WRITE_BEHIND_ENABLED:
+    write_behind.start()
+
+# Roll chats up by day; archiving old chats and messages is opt-in (LOG_MAINTENANCE)
+log_maintenance = LogMaintenance(app, db, ChatMessage, Message, ChatRollup)
+if ROLLUPS_ENABLED or RETENTION_ENABLED:
+    log_maintenance.start()
+
+# Prometheus metrics; collectors below read existing stats at scrape time
+if METRICS_ENABLED:
+    instrument_app(app)
+    instrument_sqlalchemy()
+
+CHAT_STAGE_SECONDS = REGISTRY.histogram(
+    "chat_stage_duration_seconds", "Chat pipeline stage latency.", ["stage"]
+)
+CHAT_ANSWERS = REGISTRY.counter(
+    "chat_answers_total", "Chat answers by where they came from.", ["source"]
+)
+
+def record_chat_metrics(result):
+    """Observe a finished chat; used as the pipeline's observe hook."""
+    if not METRICS_ENABLED:
+        return
+    for stage, ms in result.timings.items():
+        CHAT_STAGE_SECONDS.observe(ms / 1000, stage=stage)
+    if result.faq_hit:
+        source = "faq"
+    elif result.cache_hit:
+        source = "response_cache"
+    elif not result.context:
+        source = "no_context"
+    elif is_fallback_response(result.response):
+        source = "degraded"
+    else:
+        source = "lexical" if result.lexical else "generated"
+    CHAT_ANSWERS.inc(source=source)
+
+def _cache_counters(stats, *names):
+    return {name: stats[name] for name in names if name in stats}
+
+REGISTRY.callback("query_embedding_cache_events_total", "Query embedding cache hits, misses and coalesced calls.",
+                  lambda: _cache_counters(get_query_cache_stats(), "hits", "misses", "coalesced"),
+                  type="counter", labelnames=["result"])
+REGISTRY.callback("response_cache_events_total", "Semantic response cache hits and misses.",
+                  lambda: _cache_counters(response_cache.stats(), "hits", "misses"),
+                  type="counter", labelnames=["result"])
+REGISTRY.callback("chat_sessions", "Live chat sessions.", lambda: len(chat_sessions))
+REGISTRY.callback("response_cache_entries", "Answers in the response cache.", lambda: len(response_cache))
+REGISTRY.callback("faq_events_total", "FAQ lookups and direct answers.",
+                  lambda: _cache_counters(faq.stats(), "lookups", "lexical_hits", "embedding_hits"),
+                  type="counter", labelnames=["result"])
+REGISTRY.callback("knowledge_sections", "Sections in the loaded knowledge base.", lambda: len(knowledge.sections))
+REGISTRY.callback("knowledge_reload_seconds", "Duration of the last knowledge base reload, until its index was served.",
+                  lambda: knowledge.last_reload_seconds)
+REGISTRY.callback("knowledge_parse_seconds", "Time the last reload spent reading and chunking content files.",
+                  lambda: knowledge.last_parse_seconds)
+REGISTRY.callback("knowledge_index_ready", "1 once the vector index is warm.", lambda: int(is_index_ready()))
+REGISTRY.callback("http_cache_events_total", "Cached page and static responses by result.",
+                  lambda: _cache_counters(http_cache.stats(), "hits", "misses", "not_modified"),
+                  type="counter", labelnames=["result"])
+REGISTRY.callback("openai_circuit_open", "1 while OpenAI calls are failing fast.",
+                  lambda: int(get_openai_stats().get("state", "closed") == "open"))
+REGISTRY.callback("openai_in_flight", "OpenAI calls in flight.", lambda: get_openai_stats().get("in_flight", 0))
+REGISTRY.callback("openai_client_events_total", "OpenAI retries, failed calls, circuit rejections and saturation.",
+                  lambda: _cache_counters(get_openai_stats(), "retries", "failures", "rejected", "saturated"),
+                  type="counter", labelnames=["event"])
+REGISTRY.callback("rate_limit_in_flight", "Rate-limited requests in flight by route.",
+                  rate_limiter.in_flight, labelnames=["route"])
+REGISTRY.callback("jobs_pending", "Background job items queued or running.", jobs.pending)
+REGISTRY.callback("write_behind_queue_depth", "Rows waiting in the write-behind queue.", write_behind.depth)
+
+ACTIVE_APPOINTMENT_STATUSES = ('pending', 'confirmed')
+
+def load_busy_intervals(start, end):
+    """Active bookings overlapping [start, end) as sorted (start, end) intervals."""
+    appointments = Appointment.query.filter(
+        Appointment.status.in_(ACTIVE_APPOINTMENT_STATUSES),
+        Appointment.date >= start - timedelta(minutes=MAX_APPOINTMENT_MINUTES),
+        Appointment.date < end
+    ).order_by(Appointment.date).all()
+    intervals = [(apt.date, apt.date + timedelta(minutes=apt.duration or 30)) for apt in appointments]
+    return [interval for interval in intervals if interval[1] > start]
+
+def lock_appointment_range(start, end):
+    """Serialize bookings across workers: transaction-scoped advisory locks per day."""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for key in day_lock_keys(start, end):
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {"key": key})
+
+availability = AvailabilityEngine(load_busy_intervals)
 
 @app.route('/appointment/slots', methods=['GET'])
 def get_appointment_slots():
@@ -24,36 +198,37 @@ def get_appointment_slots():
         # Get start and end dates from query parameters with default values
         start_date = request.args.get('start', type=str, default=datetime.utcnow().isoformat())
         end_date = request.args.get('end', type=str, default=(datetime.utcnow() + timedelta(days=30)).isoformat())
+        duration = request.args.get('duration', type=int, default=30)
+        if not 0 < duration <= MAX_APPOINTMENT_MINUTES:
+            return jsonify({'success': False, 'error': 'Invalid duration', 'appointments': [], 'slots': []}), 400
 
         # Convert string dates to datetime objects for comparison
-        start_datetime = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        end_datetime = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        start_datetime = to_utc_naive(datetime.fromisoformat(start_date.replace('Z', '+00:00')))
+        end_datetime = to_utc_naive(datetime.fromisoformat(end_date.replace('Z', '+00:00')))
 
-        # Query appointments within the date range
-        appointments = Appointment.query.filter(
-            Appointment.date >= start_datetime,
-            Appointment.date <= end_datetime,
-            Appointment.status != 'cancelled'
-        ).all()
+        # Bookable part of the range: busy intervals and the free slots around them
+        busy, slots = availability.availability(start_datetime, end_datetime, duration)
 
-        # Return appointments as JSON
         return jsonify({
             'success': True,
             'appointments': [{
-                'date': apt.date.isoformat(),
-                'duration': apt.duration
-            } for apt in appointments]
+                'date': busy_start.isoformat(),
+                'duration': int((busy_end - busy_start).total_seconds() // 60)
+            } for busy_start, busy_end in busy],
+            'slots': [slot.isoformat() + 'Z' for slot in slots]
         })
     except Exception as e:
         logger.error(f"Error fetching appointment slots: {str(e)}")
         return jsonify({
             'success': False,
             'error': str(e),
-            'appointments': []  # Return empty list on error
+            'appointments': [],  # Return empty list on error
+            'slots': []
         }), 500
 
 # Update the appointment route to handle timezone
 @app.route('/appointment', methods=['GET', 'POST'])
+@http_cache.page
 def appointment():
     if request.method == 'POST':
         try:
@@ -63,37 +238,57 @@ def appointment():
                 email=data['email'],
                 user_type=data['user_type'],
                 company=data['company'],
-                date=datetime.fromisoformat(data['date'].replace('Z', '+00:00')),
+                date=to_utc_naive(datetime.fromisoformat(data['date'].replace('Z', '+00:00'))),
                 timezone=data['timezone'],
                 notes=data['notes']
             )
-            db.session.add(appointment)
-            db.session.commit()
+
+            def find_conflicts(start, end):
+                return load_busy_intervals(start, end)
+
+            def save():
+                db.session.add(appointment)
+                db.session.commit()
+
+            # Conflict check and insert happen in one transaction under the booking locks
+            availability.book(appointment.date, appointment.duration or 30, find_conflicts, save,
+                              lock_range=lock_appointment_range)
             return jsonify({"success": True})
+        except SlotConflict:
+            db.session.rollback()
+            return jsonify({"success": False, "error": "That time is no longer available. Please choose another slot."}), 409
         except Exception as e:
+            db.session.rollback()
             logger.error(f"Error saving appointment: {str(e)}")
             return jsonify({"success": False, "error": str(e)})
     return render_template('appointment.html')
 
 @app.route('/')
+@http_cache.page
 def index():
     return render_template('index.html')
 
 @app.route('/cv')
+@http_cache.page
 def cv():
     return render_template('cv.html')
 
 @app.route('/contact', methods=['GET', 'POST'])
+@http_cache.page
 def contact():
     if request.method == 'POST':
         try:
-            message = Message(
-                name=request.form['name'],
-                email=request.form['email'],
-                message=request.form['message']
-            )
-            db.session.add(message)
-            db.session.commit()
+            values = {
+                "name": request.form['name'],
+                "email": request.form['email'],
+                "message": request.form['message']
+            }
+            if WRITE_BEHIND_ENABLED:
+                # Stamp arrival time; the row may reach the database a little later
+                write_behind.enqueue(Message, dict(values, created_at=datetime.utcnow()))
+            else:
+                db.session.add(Message(**values))
+                db.session.commit()
             return jsonify({"success": True})
         except Exception as e:
             logger.error(f"Error saving contact message: {str(e)}")
@@ -101,7 +296,38 @@ def contact():
     return render_template('contact.html')
 
 
+def save_chat_message(result):
+    """Persist a chatbot exchange; used as the pipeline's persist stage."""
+    values = {
+        "user_type": result.user_type,
+        "message": result.query,
+        "response": result.response
+    }
+    if WRITE_BEHIND_ENABLED:
+        write_behind.enqueue(ChatMessage, dict(values, created_at=datetime.utcnow()))
+        return
+    if not has_app_context():
+        # The async server persists from a worker thread, outside any request
+        with app.app_context():
+            return save_chat_message(result)
+    try:
+        db.session.add(ChatMessage(**values))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+chat_pipeline = ChatPipeline(
+    get_sections=lambda: knowledge.sections,
+    persist=save_chat_message,
+    cache=response_cache,
+    faq=faq,
+    get_version=get_knowledge_version,
+    observe=record_chat_metrics
+)
+
 @app.route('/chatbot', methods=['POST'])
+@rate_limiter.limit("chat", CHAT_RATE_PER_MINUTE, CHAT_BURST, CHAT_MAX_CONCURRENT)
 def chatbot():
     try:
         data = request.json
@@ -111,42 +337,18 @@ def chatbot():
         if not query:
             return jsonify({"response": "Please ask a question."})
 
-        # Get response using RAG
-        context = find_relevant_context(query, knowledge_base)
-        response = get_chat_response(query, context) if context else "I apologize, but I don't have enough information to answer that question accurately."
-
-        # Save chat message
-        chat_message = ChatMessage(
-            user_type=user_type,
-            message=query,
-            response=response
-        )
-        db.session.add(chat_message)
-        db.session.commit()
-
-        # Get relevant context using RAG
-        context = find_relevant_context(query, knowledge_base)
+        session = chat_sessions.get(data.get('session_id'))
+        result = chat_pipeline.run(query, user_type, history=session.memory())
+        chat_sessions.record(session, query, result.response)
 
-        # If no context found, return a default message
-        if not context:
-            return jsonify({
-                "response": "I apologize, but I don't have enough information to answer that question accurately."
-            })
-
-        # Get response using the context
-        response = get_chat_response(query, context)
-
-        # Check if we should suggest booking a meeting based on user type and query content
-        suggest_meeting = False
-        if user_type in ['recruiter', 'employer']:
-            meeting_keywords = ['interview', 'meet', 'discuss', 'talk', 'available', 'schedule', 'when']
-            if any(keyword in query.lower() for keyword in meeting_keywords):
-                suggest_meeting = True
-
-        return jsonify({
-            "response": response,
-            "suggest_meeting": suggest_meeting
+        response = jsonify({
+            "response": result.response,
+            "suggest_meeting": result.suggest_meeting,
+            "session_id": session.id
         })
+        if CHAT_TIMING_HEADER:
+            response.headers['Server-Timing'] = result.server_timing()
+        return response
     except Exception as e:
         logger.error(f"Error in chatbot: {str(e)}")
         return jsonify({
@@ -154,43 +356,254 @@ def chatbot():
             "suggest_meeting": False
         })
 
+def sse_event(event, data):
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/chatbot/stream', methods=['POST'])
+@rate_limiter.limit("chat", CHAT_RATE_PER_MINUTE, CHAT_BURST, CHAT_MAX_CONCURRENT)
+def chatbot_stream():
+    """Streaming variant of /chatbot: answer tokens are sent as Server-Sent Events."""
+    data = request.json or {}
+    query = data.get('query', '').strip()
+    user_type = data.get('user_type', 'other')
+    session = chat_sessions.get(data.get('session_id'))
+
+    def generate():
+        if not query:
+            yield sse_event("token", {"text": "Please ask a question."})
+            yield sse_event("done", {"suggest_meeting": False, "session_id": session.id})
+            return
+        try:
+            for event, payload in chat_pipeline.stream(query, user_type, history=session.memory()):
+                if event == "token":
+                    yield sse_event("token", {"text": payload})
+                else:
+                    chat_sessions.record(session, query, payload.response)
+                    yield sse_event("done", {"suggest_meeting": payload.suggest_meeting, "session_id": session.id})
+        except Exception as e:
+            logger.error(f"Error in streaming chatbot: {str(e)}")
+            yield sse_event("error", {
+                "response": "I apologize, but I encountered an error processing your question."
+            })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: the knowledge index is warm and the database is reachable."""
+    index_ready = is_index_ready()
+    try:
+        db.session.execute(text('SELECT 1'))
+        database_ready = True
+    except Exception as e:
+        logger.warning(f"Database not reachable: {str(e)}")
+        db.session.rollback()
+        database_ready = False
+
+    ready = index_ready and database_ready
+    return jsonify({
+        "ready": ready,
+        "index": index_ready,
+        "database": database_ready,
+        # Informational only: with the circuit open chats still get degraded answers
+        "openai": openai_available()
+    }), 200 if ready else 503
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of the metrics registry."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 # Admin routes
 @app.route('/admin')
+@http_cache.page
 def admin():
     return render_template('admin.html')
 
+@app.route('/admin/stats')
+def admin_stats():
+    return jsonify({
+        "response_cache": response_cache.stats(),
+        "faq": faq.stats(),
+        "chat_sessions": chat_sessions.stats(),
+        "availability": availability.stats(),
+        "query_embedding_cache": get_query_cache_stats(),
+        "openai": get_openai_stats(),
+        "write_behind": write_behind.stats(),
+        "http_cache": http_cache.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "log_maintenance": log_maintenance.stats(),
+        "startup": startup_report()
+    })
+
+def require_admin_token(view):
+    """Serve view only to requests with the ADMIN_TOKEN (X-Admin-Token or a Bearer token)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({"success": False, "error": "Not available: ADMIN_TOKEN is not configured"}), 404
+        token = request.headers.get('X-Admin-Token', '')
+        authorization = request.headers.get('Authorization', '')
+        if not token and authorization.startswith('Bearer '):
+            token = authorization[len('Bearer '):]
+        if not hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+            return jsonify({"success": False, "error": "Admin token required"}), 401
+        return view(*args, **kwargs)
+
+    return wrapper
+
+@app.route('/admin/chats')
+@require_admin_token
+def list_chats():
+    """Chat log, newest first; pass next_cursor back as ?cursor= for the next page."""
+    try:
+        query = ChatMessage.query
+        if request.args.get('user_type'):
+            query = query.filter(ChatMessage.user_type == request.args['user_type'])
+        chats, next_cursor = keyset_page(query, ChatMessage, page_size(request.args.get('limit')),
+                                         request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({
+        "success": True,
+        "items": [{
+            "id": chat.id,
+            "user_type": chat.user_type,
+            "message": chat.message,
+            "response": chat.response,
+            "created_at": chat.created_at.isoformat() if chat.created_at else None
+        } for chat in chats],
+        "next_cursor": next_cursor
+    })
+
+@app.route('/admin/messages')
+@require_admin_token
+def list_messages():
+    """Contact messages, newest first, paginated like /admin/chats."""
+    try:
+        messages, next_cursor = keyset_page(Message.query, Message, page_size(request.args.get('limit')),
+                                            request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({
+        "success": True,
+        "items": [{
+            "id": message.id,
+            "name": message.name,
+            "email": message.email,
+            "message": message.message,
+            "created_at": message.created_at.isoformat() if message.created_at else None
+        } for message in messages],
+        "next_cursor": next_cursor
+    })
+
+@app.route('/admin/chats/rollups')
+@require_admin_token
+def chat_rollups():
+    """Chats per day and user type with their top queries, for the last ?days= days."""
+    days = min(max(request.args.get('days', 30, type=int), 1), 366)
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    rollups = ChatRollup.query.filter(ChatRollup.day >= since).order_by(
+        ChatRollup.day.desc(), ChatRollup.user_type
+    ).all()
+    return jsonify({
+        "success": True,
+        "rollups": [{
+            "day": rollup.day.isoformat(),
+            "user_type": rollup.user_type,
+            "chats": rollup.chats,
+            "top_queries": json.loads(rollup.top_queries)
+        } for rollup in rollups]
+    })
+
+@app.route('/admin/maintenance', methods=['POST'])
+@require_admin_token
+def run_log_maintenance():
+    """Roll up and archive now instead of waiting for the next scheduled run."""
+    job = jobs.submit("log-maintenance", ["run"], lambda _: log_maintenance.run())
+    return jsonify({"success": True, "job_id": job.id, "status_url": f"/admin/jobs/{job.id}"}), 202
+
+def linkedin_url_error(url):
+    """Why url can't be imported, or None if it looks like a LinkedIn profile."""
+    if not url:
+        return "LinkedIn URL is required"
+    if not url.startswith(('http://', 'https://')):
+        return "Invalid LinkedIn URL format"
+    if 'linkedin.com/in/' not in url.lower():
+        return "Invalid LinkedIn profile URL"
+    return None
+
+def import_linkedin_profile(url):
+    """Job item: fetch one profile and save its Q&A file."""
+    # Imported here: trafilatura is slow to import and only needed by admins
+    from utils.linkedin_scraper import save_linkedin_data, profile_filename
+    return save_linkedin_data(url, filename=profile_filename(url))
+
 @app.route('/admin/import-linkedin', methods=['POST'])
+@rate_limiter.limit("import", IMPORT_RATE_PER_MINUTE, IMPORT_BURST, IMPORT_MAX_CONCURRENT)
 def import_linkedin():
     try:
-        data = request.json
-        linkedin_url = data.get('url')
-
-        if not linkedin_url:
-            return jsonify({"success": False, "error": "LinkedIn URL is required"})
-
-        if not linkedin_url.startswith(('http://', 'https://')):
-            return jsonify({"success": False, "error": "Invalid LinkedIn URL format"})
-
-        if 'linkedin.com/in/' not in linkedin_url.lower():
-            return jsonify({"success": False, "error": "Invalid LinkedIn profile URL"})
-
-        # Save LinkedIn data to JSON file in content/interviews directory
-        success = save_linkedin_data(linkedin_url)
-
-        if success:
-            # Reload knowledge base after successful import
-            global knowledge_base
-            knowledge_base = load_content_from_file()
-            logger.info(f"Successfully imported LinkedIn profile from {linkedin_url}")
-            return jsonify({"success": True})
-        else:
-            logger.error(f"Failed to import LinkedIn profile from {linkedin_url}")
-            return jsonify({"success": False, "error": "Failed to import LinkedIn profile"})
+        data = request.json or {}
+        urls = data.get('urls') or [data.get('url')]
+        urls = list(dict.fromkeys((url or '').strip() for url in urls))
+
+        invalid = {url: error for url, error in ((url, linkedin_url_error(url)) for url in urls) if error}
+        valid = [url for url in urls if url not in invalid]
+        if not valid:
+            return jsonify({"success": False, "error": next(iter(invalid.values())), "invalid": invalid})
+
+        # Refuse rather than let the backlog of fetches grow without bound
+        if jobs.pending() + len(valid) > JOB_MAX_PENDING:
+            response = jsonify({"success": False, "error": "Too many imports in progress. Please try again later."})
+            response.headers['Retry-After'] = '30'
+            return response, 429
+
+        # Fetch in the background; the knowledge base reloads once the burst of imports settles
+        job = jobs.submit("linkedin-import", valid, import_linkedin_profile,
+                          on_complete=lambda job: knowledge_reload.call())
+        logger.info(f"Queued LinkedIn import of {len(valid)} profiles as job {job.id}")
+        return jsonify({
+            "success": True,
+            "job_id": job.id,
+            "status_url": f"/admin/jobs/{job.id}",
+            "invalid": invalid
+        }), 202
 
     except Exception as e:
         logger.error(f"Error importing LinkedIn profile: {str(e)}")
         return jsonify({"success": False, "error": str(e)})
 
+@app.route('/admin/jobs')
+def list_jobs():
+    return jsonify({"jobs": [job.to_dict() for job in jobs.recent()]})
+
+@app.route('/admin/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Unknown job"}), 404
+    return jsonify(dict(job.to_dict(), success=True))
+
+def ingest_pdf(item):
+    """Job item: stream an uploaded PDF into a markdown document in the knowledge base."""
+    upload_path, filename = item
+    try:
+        stem = os.path.splitext(filename)[0]
+        write_pdf_markdown(upload_path, os.path.join(DOCUMENTS_DIR, f"{stem}.md"), title=stem)
+        return True
+    finally:
+        os.remove(upload_path)
+
 @app.route('/admin/upload', methods=['POST'])
 def upload_file():
     try:
@@ -201,17 +614,24 @@ def upload_file():
         if file.filename == '':
             return jsonify({"success": False, "error": "No file selected"})
 
+        filename = secure_filename(file.filename)
+        if filename.lower().endswith('.pdf'):
+            # Extract in the background; the knowledge base reloads when it's done
+            upload_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}.pdf")
+            file.save(upload_path)
+            job = jobs.submit("pdf-ingest", [(upload_path, filename)], ingest_pdf,
+                              on_complete=lambda job: knowledge_reload.call())
+            return jsonify({"success": True, "job_id": job.id, "status_url": f"/admin/jobs/{job.id}"}), 202
+
         if not file.filename.endswith('.txt'):
-            return jsonify({"success": False, "error": "Only .txt files are allowed"})
+            return jsonify({"success": False, "error": "Only .txt and .pdf files are allowed"})
 
-        filename = secure_filename(file.filename)
         file.save('content/knowledge_base.txt')
 
         # Reload the knowledge base
-        global knowledge_base
-        knowledge_base = load_content_from_file()
+        changes = knowledge.reload()
 
-        return jsonify({"success": True})
+        return jsonify({"success": True, "changes": changes})
 
     except Exception as e:
         logger.error(f"Error uploading file: {str(e)}")
@@ -220,8 +640,7 @@ def upload_file():
 @app.route('/admin/content')
 def get_content():
     try:
-        with open('content/knowledge_base.txt', 'r') as f:
-            return f.read()
+        return http_cache.file('content/knowledge_base.txt')
     except FileNotFoundError:
         return "No content available"
     except Exception as e:
@@ -11,11 +11,12 @@ document.addEventListener('DOMContentLoaded', function() {
     // Handle LinkedIn form submission
     linkedinForm.addEventListener('submit', async function(e) {
         e.preventDefault();
-        const linkedinUrl = document.getElementById('linkedin-url').value;
+        const urls = document.getElementById('linkedin-url').value
+            .split('\n')
+            .map(url => url.trim())
+            .filter(url => url);
 
-        linkedinStatus.textContent = 'Importing profile data...';
-        linkedinStatus.className = 'alert alert-info';
-        linkedinStatus.classList.remove('d-none');
+        showLinkedinStatus('Queuing import...', 'info');
 
         try {
             const response = await fetch('/admin/import-linkedin', {
@@ -23,24 +24,66 @@ document.addEventListener('DOMContentLoaded', function() {
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ url: linkedinUrl })
+                body: JSON.stringify({ urls: urls })
             });
 
             const data = await response.json();
             if (data.success) {
-                linkedinStatus.textContent = 'LinkedIn profile imported successfully!';
-                linkedinStatus.className = 'alert alert-success';
-                loadCurrentContent();
+                const skipped = Object.keys(data.invalid || {}).length;
+                pollJob(data.status_url, job => showLinkedinJob(job, skipped),
+                        error => showLinkedinStatus(error, 'danger'));
             } else {
-                linkedinStatus.textContent = data.error || 'Failed to import profile';
-                linkedinStatus.className = 'alert alert-danger';
+                showLinkedinStatus(data.error || 'Failed to import profile', 'danger');
             }
         } catch (error) {
-            linkedinStatus.textContent = 'Error importing profile: ' + error;
-            linkedinStatus.className = 'alert alert-danger';
+            showLinkedinStatus('Error importing profile: ' + error, 'danger');
         }
     });
 
+    function showLinkedinStatus(message, type) {
+        linkedinStatus.textContent = message;
+        linkedinStatus.className = `alert alert-${type}`;
+        linkedinStatus.classList.remove('d-none');
+    }
+
+    // Imports and PDF ingestion run as background jobs; poll until the job finishes
+    async function pollJob(statusUrl, onUpdate, onError) {
+        try {
+            const response = await fetch(statusUrl);
+            const job = await response.json();
+            if (!job.success) {
+                onError(job.error || 'Job not found');
+                return;
+            }
+            onUpdate(job);
+            if (job.status === 'queued' || job.status === 'running') {
+                setTimeout(() => pollJob(statusUrl, onUpdate, onError), 1000);
+            } else if (job.status === 'succeeded') {
+                loadCurrentContent();
+            }
+        } catch (error) {
+            onError('Error checking job status: ' + error);
+        }
+    }
+
+    function firstError(job) {
+        const errors = job.results.map(result => result.error).filter(error => error);
+        return errors.length ? ': ' + errors[0] : '';
+    }
+
+    function showLinkedinJob(job, skipped) {
+        const skippedNote = skipped ? ` (${skipped} invalid URL${skipped > 1 ? 's' : ''} skipped)` : '';
+        if (job.status === 'queued' || job.status === 'running') {
+            showLinkedinStatus(`Importing profiles: ${job.done}/${job.total} done${skippedNote}...`, 'info');
+        } else if (job.status === 'succeeded') {
+            const failedNote = job.failed ? `, ${job.failed} failed` : '';
+            showLinkedinStatus(`Imported ${job.total - job.failed}/${job.total} profiles${failedNote}${skippedNote}.`,
+                               job.failed ? 'warning' : 'success');
+        } else {
+            showLinkedinStatus('Failed to import profile' + firstError(job), 'danger');
+        }
+    }
+
     // Handle drag and drop events
     ['dragenter', 'dragover', 'dragleave', 'drop'].forEach(eventName => {
         dropZone.addEventListener(eventName, preventDefaults, false);
@@ -86,8 +129,8 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     function handleFile(file) {
-        if (file.type !== 'text/plain') {
-            showStatus('Please upload a .txt file', 'danger');
+        if (file.type !== 'text/plain' && file.type !== 'application/pdf') {
+            showStatus('Please upload a .txt or .pdf file', 'danger');
             return;
         }
 
@@ -108,7 +151,17 @@ document.addEventListener('DOMContentLoaded', function() {
         })
         .then(response => response.json())
         .then(data => {
-            if (data.success) {
+            if (data.success && data.job_id) {
+                // PDFs are ingested in the background
+                showStatus('Extracting PDF...', 'info');
+                pollJob(data.status_url, job => {
+                    if (job.status === 'succeeded') {
+                        showStatus('PDF added to the knowledge base!', 'success');
+                    } else if (job.status === 'failed') {
+                        showStatus('PDF ingestion failed' + firstError(job), 'danger');
+                    }
+                }, error => showStatus(error, 'danger'));
+            } else if (data.success) {
                 showStatus('File uploaded successfully!', 'success');
                 loadCurrentContent();
             } else {
@@ -140,6 +193,87 @@ document.addEventListener('DOMContentLoaded', function() {
             });
     }
 
+    // Chat logs and contact messages need the server's ADMIN_TOKEN, asked for once per tab
+    let tokenPrompt = null;
+
+    async function fetchWithAdminToken(path) {
+        const sent = sessionStorage.getItem('admin_token');
+        let response = await fetch(path, {headers: sent ? {'X-Admin-Token': sent} : {}});
+        if (response.status === 401) {
+            let token = sessionStorage.getItem('admin_token');
+            if (token === sent) {
+                // Another table may be asking already; share its answer
+                if (!tokenPrompt) {
+                    tokenPrompt = Promise.resolve(window.prompt('Admin token'));
+                }
+                token = await tokenPrompt;
+                tokenPrompt = null;
+            }
+            if (token && token !== sent) {
+                sessionStorage.setItem('admin_token', token);
+                response = await fetch(path, {headers: {'X-Admin-Token': token}});
+            }
+        }
+        return response;
+    }
+
+    // Chat logs and contact messages, one page at a time (cursor-based)
+    function pagedTable(url, tbody, moreButton, columns) {
+        let cursor = null;
+
+        function addCell(row, text) {
+            const cell = document.createElement('td');
+            cell.textContent = text || '';
+            row.appendChild(cell);
+        }
+
+        async function load(reset) {
+            if (reset) {
+                cursor = null;
+                tbody.innerHTML = '';
+            }
+            const params = new URLSearchParams(url.params ? url.params() : {});
+            if (cursor) {
+                params.set('cursor', cursor);
+            }
+            try {
+                const response = await fetchWithAdminToken(`${url.path}?${params}`);
+                const data = await response.json();
+                if (!data.success) {
+                    throw new Error(data.error);
+                }
+                data.items.forEach(item => {
+                    const row = document.createElement('tr');
+                    addCell(row, item.created_at ? new Date(item.created_at + 'Z').toLocaleString() : '');
+                    columns.forEach(column => addCell(row, item[column]));
+                    tbody.appendChild(row);
+                });
+                cursor = data.next_cursor;
+                moreButton.classList.toggle('d-none', !cursor);
+            } catch (error) {
+                console.error('Error loading ' + url.path + ':', error);
+            }
+        }
+
+        moreButton.addEventListener('click', () => load(false));
+        return load;
+    }
+
+    const chatUserType = document.getElementById('chat-user-type');
+    const loadChats = pagedTable(
+        {path: '/admin/chats', params: () => chatUserType.value ? {user_type: chatUserType.value} : {}},
+        document.getElementById('chat-rows'), document.getElementById('chat-more'),
+        ['user_type', 'message', 'response']
+    );
+    const loadMessages = pagedTable(
+        {path: '/admin/messages'},
+        document.getElementById('message-rows'), document.getElementById('message-more'),
+        ['name', 'email', 'message']
+    );
+    chatUserType.addEventListener('change', () => loadChats(true));
+
     // Load current content when page loads
     loadCurrentContent();
+    loadChats(true);
+    loadMessages(true);
 });
\ No newline at end of file
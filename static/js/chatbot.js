@@ -36,39 +36,94 @@ document.addEventListener('DOMContentLoaded', function() {
         `;
         chatMessages.appendChild(messageDiv);
         chatMessages.scrollTop = chatMessages.scrollHeight;
+        return messageDiv;
+    }
+
+    function suggestMeeting() {
+        addMessage("Would you like to schedule a meeting to discuss this further? Click here to book an appointment.", false);
+        const bookingLink = document.createElement('div');
+        bookingLink.className = 'chat-message bot-message';
+        bookingLink.innerHTML = `
+            <div class="message-content">
+                <a href="/appointment" class="btn btn-success btn-sm">
+                    <i class="bi bi-calendar-check"></i> Schedule Meeting
+                </a>
+            </div>
+        `;
+        chatMessages.appendChild(bookingLink);
+    }
+
+    // Parse one Server-Sent Events message ("event: ...\ndata: ...")
+    function parseEvent(raw) {
+        let event = 'message';
+        let data = '';
+        raw.split('\n').forEach(line => {
+            if (line.startsWith('event: ')) {
+                event = line.slice(7);
+            } else if (line.startsWith('data: ')) {
+                data += line.slice(6);
+            }
+        });
+        return { event, data: data ? JSON.parse(data) : {} };
     }
 
     async function sendMessage(message) {
         addMessage(message, true);
 
         try {
-            const response = await fetch('/chatbot', {
+            const response = await fetch('/chatbot/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
                     query: message,
-                    user_type: sessionStorage.getItem('user_type')
+                    user_type: sessionStorage.getItem('user_type'),
+                    // Lets the server remember the conversation for follow-up questions
+                    session_id: sessionStorage.getItem('chat_session_id')
                 })
             });
+            if (response.status === 429) {
+                // Rate limited or busy: the server explains when to try again
+                const data = await response.json();
+                addMessage(data.response);
+                return;
+            }
+            if (!response.ok || !response.body) {
+                throw new Error(`Unexpected response: ${response.status}`);
+            }
+
+            // Render tokens into the bot message as they arrive
+            const messageText = addMessage('').querySelector('.message-text');
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const { event, data } = parseEvent(buffer.slice(0, boundary));
+                    buffer = buffer.slice(boundary + 2);
 
-            const data = await response.json();
-            addMessage(data.response);
-
-            // If response suggests booking a meeting, show suggestion
-            if (data.suggest_meeting) {
-                addMessage("Would you like to schedule a meeting to discuss this further? Click here to book an appointment.", false);
-                const bookingLink = document.createElement('div');
-                bookingLink.className = 'chat-message bot-message';
-                bookingLink.innerHTML = `
-                    <div class="message-content">
-                        <a href="/appointment" class="btn btn-success btn-sm">
-                            <i class="bi bi-calendar-check"></i> Schedule Meeting
-                        </a>
-                    </div>
-                `;
-                chatMessages.appendChild(bookingLink);
+                    if (event === 'token') {
+                        messageText.textContent += data.text;
+                        chatMessages.scrollTop = chatMessages.scrollHeight;
+                    } else if (event === 'error') {
+                        messageText.textContent = data.response;
+                    } else if (event === 'done') {
+                        if (data.session_id) {
+                            sessionStorage.setItem('chat_session_id', data.session_id);
+                        }
+                        if (data.suggest_meeting) {
+                            // If response suggests booking a meeting, show suggestion
+                            suggestMeeting();
+                        }
+                    }
+                }
             }
         } catch (error) {
             addMessage('Sorry, I encountered an error. Please try again.');
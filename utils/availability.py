@@ -0,0 +1,182 @@
+import os
+import time
+import zlib
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from utils.embedding_cache import LRUCache
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Configuration
+AVAILABILITY_TIMEZONE = os.environ.get("AVAILABILITY_TIMEZONE", "UTC")              # Timezone of the working hours
+WORKING_HOURS = (
+    int(os.environ.get("WORKING_HOURS_START", "9")),
+    int(os.environ.get("WORKING_HOURS_END", "17"))
+)
+WORKING_DAYS = frozenset(range(5))                                                    # Monday to Friday
+SLOT_STEP_MINUTES = int(os.environ.get("SLOT_STEP_MINUTES", "30"))                    # Offered start times are this far apart
+MIN_NOTICE_HOURS = float(os.environ.get("MIN_NOTICE_HOURS", "24"))                    # No slots sooner than this
+MAX_APPOINTMENT_MINUTES = 240                                                         # Longest booking, bounds conflict queries
+AVAILABILITY_CACHE_SIZE = int(os.environ.get("AVAILABILITY_CACHE_SIZE", "256"))       # Cached slot ranges (LRU)
+AVAILABILITY_CACHE_TTL = float(os.environ.get("AVAILABILITY_CACHE_TTL", "30"))        # Seconds, bounds staleness across workers
+
+Interval = Tuple[datetime, datetime]
+
+
+class SlotConflict(Exception):
+    """The requested time overlaps an existing booking."""
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Appointment dates are stored as naive UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def working_windows(start: datetime, end: datetime, tz_name: str = AVAILABILITY_TIMEZONE,
+                    hours: Tuple[int, int] = WORKING_HOURS, days: Iterable[int] = WORKING_DAYS) -> List[Interval]:
+    """Working-hour intervals (naive UTC) overlapping [start, end), in order."""
+    tz = ZoneInfo(tz_name)
+    days = frozenset(days)
+    windows = []
+    day = start.replace(tzinfo=timezone.utc).astimezone(tz).date() - timedelta(days=1)
+    last_day = end.replace(tzinfo=timezone.utc).astimezone(tz).date()
+    while day <= last_day:
+        if day.weekday() in days:
+            opens = to_utc_naive(datetime(day.year, day.month, day.day, hours[0], tzinfo=tz))
+            closes = to_utc_naive(datetime(day.year, day.month, day.day, hours[1], tzinfo=tz))
+            opens, closes = max(opens, start), min(closes, end)
+            if opens < closes:
+                windows.append((opens, closes))
+        day += timedelta(days=1)
+    return windows
+
+
+def _align(value: datetime, origin: datetime, step: timedelta) -> datetime:
+    """Round value up to the next origin + n * step."""
+    remainder = (value - origin) % step
+    return value if not remainder else value + (step - remainder)
+
+
+def free_slots(windows: List[Interval], busy: List[Interval], duration: timedelta,
+               step: timedelta = timedelta(minutes=SLOT_STEP_MINUTES)) -> List[datetime]:
+    """
+    Start times where duration fits inside a window without touching a busy interval.
+
+    windows and busy must be sorted by start; busy intervals may overlap.
+    Both lists are walked once, so the cost is linear in windows, bookings
+    and returned slots.
+    """
+    slots = []
+    i = 0
+    for opens, closes in windows:
+        cursor = opens
+        while cursor + duration <= closes:
+            # Bookings that end before the cursor can't block this or any later slot
+            while i < len(busy) and busy[i][1] <= cursor:
+                i += 1
+            if i < len(busy) and busy[i][0] < cursor + duration:
+                cursor = _align(busy[i][1], opens, step)
+                continue
+            slots.append(cursor)
+            cursor += step
+    return slots
+
+
+class AvailabilityEngine:
+    """
+    Free appointment slots and conflict-checked bookings.
+
+    load_busy(start, end) returns the (start, end) intervals of active
+    bookings that overlap the range, sorted by start. Slot lists are
+    cached per (start, end, duration) for AVAILABILITY_CACHE_TTL seconds
+    and dropped whenever this process books an appointment.
+
+    book() serializes bookings: a process-wide lock, plus whatever
+    cross-process lock lock_range takes inside the caller's transaction
+    (a PostgreSQL advisory lock in the routes), so two concurrent requests
+    can't both pass the conflict check for the same time.
+    """
+
+    def __init__(self, load_busy: Callable[[datetime, datetime], List[Interval]],
+                 ttl: float = AVAILABILITY_CACHE_TTL, max_entries: int = AVAILABILITY_CACHE_SIZE):
+        self.load_busy = load_busy
+        self.ttl = ttl
+        self.bookings = 0
+        self.conflicts = 0
+        self._cache = LRUCache(max_entries)
+        self._lock = threading.Lock()
+
+    def availability(self, start: datetime, end: datetime, duration_minutes: int = SLOT_STEP_MINUTES,
+                     now: Optional[datetime] = None) -> Tuple[List[Interval], List[datetime]]:
+        """
+        Busy intervals and free slot start times (naive UTC) in [start, end).
+
+        The range is clipped to start MIN_NOTICE_HOURS from now.
+        """
+        now = now or datetime.utcnow()
+        start = max(to_utc_naive(start), now + timedelta(hours=MIN_NOTICE_HOURS))
+        end = to_utc_naive(end)
+        if start >= end:
+            return [], []
+        # Snap the range to whole slots so nearby requests share cache entries
+        step = timedelta(minutes=SLOT_STEP_MINUTES)
+        start = _align(start, datetime(2000, 1, 1), step)
+        key = (start, end, duration_minutes)
+
+        cached = self._cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            return cached[1], cached[2]
+
+        busy = self.load_busy(start, end)
+        slots = free_slots(working_windows(start, end), busy, timedelta(minutes=duration_minutes), step)
+        self._cache.put(key, (time.monotonic(), busy, slots))
+        return busy, slots
+
+    def slots(self, start: datetime, end: datetime, duration_minutes: int = SLOT_STEP_MINUTES) -> List[datetime]:
+        """Free slot start times (naive UTC) in [start, end)."""
+        return self.availability(start, end, duration_minutes)[1]
+
+    def book(self, start: datetime, duration_minutes: int,
+             find_conflicts: Callable[[datetime, datetime], List[Any]],
+             save: Callable[[], Any],
+             lock_range: Callable[[datetime, datetime], None] = lambda start, end: None) -> Any:
+        """
+        Atomically check [start, start + duration) for conflicts and save.
+
+        Raises SlotConflict if an active booking overlaps.
+        """
+        start = to_utc_naive(start)
+        end = start + timedelta(minutes=duration_minutes)
+        with self._lock:
+            lock_range(start, end)
+            if find_conflicts(start, end):
+                self.conflicts += 1
+                raise SlotConflict(f"{start.isoformat()} is already booked")
+            saved = save()
+            self.bookings += 1
+            self.invalidate()
+            return saved
+
+    def invalidate(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._cache.stats(), bookings=self.bookings, conflicts=self.conflicts)
+
+
+def day_lock_keys(start: datetime, end: datetime) -> List[int]:
+    """Advisory lock keys for every UTC day a booking touches, in order."""
+    keys = []
+    day = start.date()
+    while day <= end.date():
+        keys.append(zlib.crc32(f"appointment:{day.isoformat()}".encode('utf-8')))
+        day += timedelta(days=1)
+    return keys
@@ -0,0 +1,91 @@
+import re
+import math
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from had has have how i in is it its me my
+of on or our so that the their them there these they this to was we were what when where
+which who why will with you your yours about tell
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens with common English stopwords removed."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an in-memory inverted index.
+
+    Each posting list stores the documents containing a term together with
+    the term's precomputed BM25 weight in that document, so scoring a query
+    is just adding a few small arrays: the cost depends on how many
+    documents contain the query terms, not on the size of the corpus.
+    """
+
+    def __init__(self, texts: List[str], k1: float = 1.5, b: float = 0.75):
+        self.size = len(texts)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        doc_terms = [Counter(tokenize(text)) for text in texts]
+        lengths = np.array([sum(terms.values()) for terms in doc_terms], dtype=np.float32)
+        avg_length = float(lengths.mean()) if self.size and lengths.sum() else 1.0
+
+        raw: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for doc, terms in enumerate(doc_terms):
+            for term, tf in terms.items():
+                raw[term].append((doc, tf))
+
+        for term, entries in raw.items():
+            docs = np.array([doc for doc, _ in entries], dtype=np.int32)
+            tfs = np.array([tf for _, tf in entries], dtype=np.float32)
+            df = len(entries)
+            idf = math.log((self.size - df + 0.5) / (df + 0.5) + 1.0)
+            norm = k1 * (1.0 - b + b * lengths[docs] / avg_length)
+            self.postings[term] = (docs, idf * tfs * (k1 + 1.0) / (tfs + norm))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for the query."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                docs, weights = posting
+                scores[docs] += weights
+        return scores
+
+    def coverage(self, query: str, doc: int) -> Tuple[int, int]:
+        """(query terms found in doc, distinct query terms)."""
+        terms = set(tokenize(query))
+        found = 0
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None and doc in posting[0]:
+                found += 1
+        return found, len(terms)
+
+    def search(self, query: str, top_k: int = 1) -> List[Tuple[float, int]]:
+        """Return up to top_k (score, document) pairs with a positive score, best first."""
+        scores = self.scores(query)
+        k = min(top_k, self.size)
+        if k <= 0:
+            return []
+        if k < self.size:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(self.size)
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[doc]), int(doc)) for doc in top if scores[doc] > 0]
@@ -0,0 +1,399 @@
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+)
+
+from utils.rag_utils import (
+    find_relevant_context, get_chat_response, stream_chat_response,
+    get_query_embedding, peek_query_embedding, lexical_context, is_fallback_response,
+    get_query_embedding_async, get_chat_response_async, stream_chat_response_async
+)
+from utils.response_cache import ResponseCache
+from utils.faq_index import FAQIndex
+from utils.chat_sessions import ConversationMemory
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+NO_CONTEXT_RESPONSE = "I apologize, but I don't have enough information to answer that question accurately."
+MEETING_USER_TYPES = ['recruiter', 'employer']
+MEETING_KEYWORDS = ['interview', 'meet', 'discuss', 'talk', 'available', 'schedule', 'when']
+
+
+def should_suggest_meeting(query: str, user_type: str) -> bool:
+    """Suggest booking a meeting to recruiters and employers asking about availability."""
+    if user_type not in MEETING_USER_TYPES:
+        return False
+    lowered = query.lower()
+    return any(keyword in lowered for keyword in MEETING_KEYWORDS)
+
+
+class ChatResult:
+    """Outcome of one pass through the chat pipeline."""
+
+    def __init__(self, query: str, user_type: str, history: Optional[ConversationMemory] = None):
+        self.query = query
+        self.user_type = user_type
+        self.history = history
+        # Follow-up questions are retrieved for together with the previous one
+        self.retrieval_query = history.rewrite(query) if history else query
+        self.query_embedding: List[float] = []
+        self.context = ""
+        self.response = ""
+        self.cache_hit = False
+        self.faq_hit = False
+        self.lexical = False
+        self.suggest_meeting = False
+        self.timings: Dict[str, float] = {}
+
+    @property
+    def follow_up(self) -> bool:
+        """The question only makes sense with the conversation so far."""
+        return self.retrieval_query != self.query
+
+    def timing_summary(self) -> str:
+        """Stage timings in milliseconds, e.g. 'retrieve=12.1ms generate=840.3ms'."""
+        return " ".join(f"{stage}={ms:.1f}ms" for stage, ms in self.timings.items())
+
+    def server_timing(self) -> str:
+        """Stage timings formatted for the Server-Timing response header."""
+        return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in self.timings.items())
+
+
+class ChatPipeline:
+    """
+    Answer a chatbot query in four stages, each run exactly once:
+
+    retrieve -> generate -> persist -> classify
+
+    The wall-clock time of every stage is recorded on the ChatResult, as
+    is the query embedding call on its own ("embed", part of retrieve).
+    Dependencies are injected so the routes decide where sections come from
+    and how chats are stored; observe receives every finished result.
+
+    With a response cache, the retrieve stage first looks the query
+    embedding up in the cache; on a hit the cached answer is used and no
+    completion is requested. get_version identifies the loaded knowledge
+    base so a reload invalidates cached answers.
+
+    Queries whose embedding is not already cached first try the lexical
+    fast path, which answers clear keyword matches without an embedding
+    call (and therefore without a response cache lookup).
+
+    With an FAQ index, queries matching a curated question are answered
+    with its curated answer before anything else, also without a
+    completion.
+
+    With conversation memory (history), follow-up questions are retrieved
+    for together with the previous question and skip the FAQ and the
+    response cache, whose answers don't know the conversation. The memory
+    is passed on to the completion prompt, so answers generated with it
+    are never written to the shared response cache.
+
+    run_async() and stream_async() are the same pipeline for an asyncio
+    server: OpenAI calls go through the async client, the FAQ lookup
+    (which may reload from the database) runs in a thread while the query
+    is being embedded, and the chat log is persisted in the background
+    instead of before the answer is returned.
+    """
+
+    def __init__(
+        self,
+        get_sections: Callable[[], List[Dict[str, str]]],
+        persist: Optional[Callable[[ChatResult], None]] = None,
+        cache: Optional[ResponseCache] = None,
+        faq: Optional[FAQIndex] = None,
+        get_version: Callable[[], Any] = lambda: None,
+        embed: Callable[[str], List[float]] = get_query_embedding,
+        peek: Callable[[str], Optional[List[float]]] = peek_query_embedding,
+        lexical: Optional[Callable[[str, List[Dict[str, str]]], Optional[str]]] = lexical_context,
+        retrieve: Callable[..., str] = find_relevant_context,
+        generate: Callable[..., str] = get_chat_response,
+        stream: Callable[..., Iterable[str]] = stream_chat_response,
+        observe: Optional[Callable[[ChatResult], None]] = None,
+        embed_async: Callable[[str], Awaitable[List[float]]] = get_query_embedding_async,
+        generate_async: Callable[..., Awaitable[str]] = get_chat_response_async,
+        stream_async: Callable[..., AsyncIterable[str]] = stream_chat_response_async,
+    ):
+        self.get_sections = get_sections
+        self.persist_fn = persist
+        self.cache = cache
+        self.faq = faq
+        self.get_version = get_version
+        self.embed_fn = embed
+        self.peek_fn = peek
+        self.lexical_fn = lexical
+        self.retrieve_fn = retrieve
+        self.generate_fn = generate
+        self.stream_fn = stream
+        self.observe_fn = observe
+        self.embed_async_fn = embed_async
+        self.generate_async_fn = generate_async
+        self.stream_async_fn = stream_async
+        # Background persist calls, referenced until they finish
+        self._pending_persists = set()
+
+    @contextmanager
+    def _stage(self, result: ChatResult, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            result.timings[name] = (time.perf_counter() - start) * 1000
+
+    def retrieve(self, result: ChatResult) -> None:
+        with self._stage(result, "retrieve"):
+            sections = self.get_sections()
+            query = result.retrieval_query
+            embedding = self.peek_fn(query)
+            if self.faq is not None and not result.follow_up:
+                answer, _ = self.faq.lookup(query, embedding)
+                if answer is not None:
+                    result.response = answer
+                    result.faq_hit = True
+                    return
+            if embedding is None and self.lexical_fn is not None:
+                context = self.lexical_fn(query, sections)
+                if context is not None:
+                    result.context = context
+                    result.lexical = True
+                    return
+
+            if embedding is None:
+                with self._stage(result, "embed"):
+                    embedding = self.embed_fn(query)
+                if self.faq is not None and not result.follow_up and len(embedding):
+                    answer = self.faq.lookup_embedding(embedding)
+                    if answer is not None:
+                        result.response = answer
+                        result.faq_hit = True
+                        return
+            result.query_embedding = embedding
+            if self.cache is not None and not result.follow_up and len(result.query_embedding):
+                cached = self.cache.get(result.query_embedding, self.get_version())
+                if cached is not None:
+                    result.response = cached
+                    result.cache_hit = True
+                    return
+            # An empty embedding means the embed call failed: retrieval then
+            # falls back to the lexical index rather than trying again
+            result.context = self.retrieve_fn(query, sections, query_embedding=result.query_embedding)
+
+    def generate(self, result: ChatResult) -> None:
+        if result.cache_hit or result.faq_hit:
+            return
+        with self._stage(result, "generate"):
+            if result.context:
+                result.response = self.generate_fn(result.query, result.context, history=result.history)
+            else:
+                result.response = NO_CONTEXT_RESPONSE
+        self._cache_response(result)
+
+    def generate_stream(self, result: ChatResult) -> Iterator[str]:
+        """Like generate, but yields the answer fragment by fragment."""
+        if result.cache_hit or result.faq_hit:
+            yield result.response
+            return
+        if not result.context:
+            result.response = NO_CONTEXT_RESPONSE
+            yield result.response
+            return
+
+        start = time.perf_counter()
+        fragments = []
+        for fragment in self.stream_fn(result.query, result.context, history=result.history):
+            if not fragments:
+                result.timings["first_token"] = (time.perf_counter() - start) * 1000
+            fragments.append(fragment)
+            yield fragment
+        result.timings["generate"] = (time.perf_counter() - start) * 1000
+        result.response = "".join(fragments)
+        self._cache_response(result)
+
+    def _cache_response(self, result: ChatResult) -> None:
+        # Only answers grounded in context are worth reusing, and only if they were
+        # generated without this session's history, which must not reach other visitors
+        if (self.cache is not None and result.context and len(result.query_embedding) and not result.history
+                and not is_fallback_response(result.response)):
+            self.cache.put(result.query_embedding, result.response, self.get_version())
+
+    def persist(self, result: ChatResult) -> None:
+        if self.persist_fn is None:
+            return
+        with self._stage(result, "persist"):
+            try:
+                self.persist_fn(result)
+            except Exception as e:
+                # The user still gets the answer if storing the chat log fails
+                logger.error(f"Error persisting chat message: {str(e)}")
+
+    def classify(self, result: ChatResult) -> None:
+        with self._stage(result, "classify"):
+            result.suggest_meeting = should_suggest_meeting(result.query, result.user_type)
+
+    def _observe(self, result: ChatResult) -> None:
+        if self.observe_fn is None:
+            return
+        try:
+            self.observe_fn(result)
+        except Exception as e:
+            logger.error(f"Error recording chat metrics: {str(e)}")
+
+    def run(self, query: str, user_type: str, history: Optional[ConversationMemory] = None) -> ChatResult:
+        result = ChatResult(query, user_type, history)
+        self.retrieve(result)
+        self.generate(result)
+        self.persist(result)
+        self.classify(result)
+        logger.info(f"Chat pipeline timings: {result.timing_summary()} cache_hit={result.cache_hit} faq_hit={result.faq_hit} lexical={result.lexical}")
+        self._observe(result)
+        return result
+
+    def stream(self, query: str, user_type: str,
+               history: Optional[ConversationMemory] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Run the pipeline with a streamed generate stage.
+
+        Yields ("token", text) for every fragment of the answer as it
+        arrives, then persists and classifies the complete answer and yields
+        ("done", result) last.
+        """
+        result = ChatResult(query, user_type, history)
+        self.retrieve(result)
+        for fragment in self.generate_stream(result):
+            yield "token", fragment
+        self.persist(result)
+        self.classify(result)
+        logger.info(f"Chat pipeline timings: {result.timing_summary()} cache_hit={result.cache_hit} faq_hit={result.faq_hit} lexical={result.lexical} streamed=True")
+        self._observe(result)
+        yield "done", result
+
+    async def _timed(self, result: ChatResult, name: str, awaitable: Awaitable[Any]) -> Any:
+        with self._stage(result, name):
+            return await awaitable
+
+    async def retrieve_async(self, result: ChatResult) -> None:
+        """
+        retrieve(), with the FAQ lookup and the query embedding overlapped.
+
+        When the query is embedded at all, the embedding call starts before
+        the FAQ answer is known; if the FAQ then answers, the embedding still
+        lands in the query cache.
+        """
+        with self._stage(result, "retrieve"):
+            sections = self.get_sections()
+            query = result.retrieval_query
+            embedding = self.peek_fn(query)
+            faq_lookup = None
+            if self.faq is not None and not result.follow_up:
+                faq_lookup = asyncio.ensure_future(asyncio.to_thread(self.faq.lookup, query, embedding))
+
+            context = None
+            if embedding is None and self.lexical_fn is not None:
+                # Can wait on a cold index build (get_snapshot), so keep it off the event loop
+                context = await asyncio.to_thread(self.lexical_fn, query, sections)
+            embedding_call = None
+            if embedding is None and context is None:
+                embedding_call = asyncio.ensure_future(self._timed(result, "embed", self.embed_async_fn(query)))
+
+            if faq_lookup is not None:
+                answer, _ = await faq_lookup
+                if answer is not None:
+                    result.response = answer
+                    result.faq_hit = True
+                    return
+            if context is not None:
+                result.context = context
+                result.lexical = True
+                return
+
+            if embedding_call is not None:
+                embedding = await embedding_call
+                if self.faq is not None and not result.follow_up and len(embedding):
+                    answer = self.faq.lookup_embedding(embedding)
+                    if answer is not None:
+                        result.response = answer
+                        result.faq_hit = True
+                        return
+            result.query_embedding = embedding
+            if self.cache is not None and not result.follow_up and len(result.query_embedding):
+                cached = self.cache.get(result.query_embedding, self.get_version())
+                if cached is not None:
+                    result.response = cached
+                    result.cache_hit = True
+                    return
+            result.context = await asyncio.to_thread(self.retrieve_fn, query, sections,
+                                                     query_embedding=result.query_embedding)
+
+    async def generate_async(self, result: ChatResult) -> None:
+        if result.cache_hit or result.faq_hit:
+            return
+        with self._stage(result, "generate"):
+            if result.context:
+                result.response = await self.generate_async_fn(result.query, result.context, history=result.history)
+            else:
+                result.response = NO_CONTEXT_RESPONSE
+        self._cache_response(result)
+
+    async def generate_stream_async(self, result: ChatResult) -> AsyncIterator[str]:
+        """Like generate_stream, for coroutines."""
+        if result.cache_hit or result.faq_hit:
+            yield result.response
+            return
+        if not result.context:
+            result.response = NO_CONTEXT_RESPONSE
+            yield result.response
+            return
+
+        start = time.perf_counter()
+        fragments = []
+        stream = self.stream_async_fn(result.query, result.context, history=result.history)
+        try:
+            async for fragment in stream:
+                if not fragments:
+                    result.timings["first_token"] = (time.perf_counter() - start) * 1000
+                fragments.append(fragment)
+                yield fragment
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        result.timings["generate"] = (time.perf_counter() - start) * 1000
+        result.response = "".join(fragments)
+        self._cache_response(result)
+
+    def persist_nowait(self, result: ChatResult) -> None:
+        """Run the persist stage in a worker thread without waiting for it."""
+        if self.persist_fn is None:
+            return
+        task = asyncio.ensure_future(asyncio.to_thread(self.persist, result))
+        self._pending_persists.add(task)
+        task.add_done_callback(self._pending_persists.discard)
+
+    async def run_async(self, query: str, user_type: str,
+                        history: Optional[ConversationMemory] = None) -> ChatResult:
+        result = ChatResult(query, user_type, history)
+        await self.retrieve_async(result)
+        await self.generate_async(result)
+        self.persist_nowait(result)
+        self.classify(result)
+        logger.info(f"Chat pipeline timings: {result.timing_summary()} cache_hit={result.cache_hit} faq_hit={result.faq_hit} lexical={result.lexical} async=True")
+        self._observe(result)
+        return result
+
+    async def stream_async(self, query: str, user_type: str,
+                           history: Optional[ConversationMemory] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """stream() for coroutines: yields ("token", text) events, then ("done", result)."""
+        result = ChatResult(query, user_type, history)
+        await self.retrieve_async(result)
+        async for fragment in self.generate_stream_async(result):
+            yield "token", fragment
+        self.persist_nowait(result)
+        self.classify(result)
+        logger.info(f"Chat pipeline timings: {result.timing_summary()} cache_hit={result.cache_hit} faq_hit={result.faq_hit} lexical={result.lexical} streamed=True async=True")
+        self._observe(result)
+        yield "done", result
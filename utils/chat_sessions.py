@@ -0,0 +1,221 @@
+import os
+import re
+import time
+import secrets
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.chunker import estimate_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Configuration
+CHAT_SESSION_TTL = float(os.environ.get("CHAT_SESSION_TTL", "1800"))        # Seconds of inactivity before a session is dropped
+CHAT_SESSION_MAX = int(os.environ.get("CHAT_SESSION_MAX", "10000"))         # Sessions kept in memory (least recent evicted)
+CHAT_MEMORY_TURNS = int(os.environ.get("CHAT_MEMORY_TURNS", "3"))           # Recent exchanges kept verbatim
+CHAT_MEMORY_TOKENS = int(os.environ.get("CHAT_MEMORY_TOKENS", "800"))       # Budget for summary + recent turns in the prompt
+CHAT_SUMMARY_TOKENS = int(os.environ.get("CHAT_SUMMARY_TOKENS", "200"))     # Longest rolling summary
+SUMMARY_WORKERS = 2                     # Background summarization threads
+
+# Words that make a short question depend on the previous one ("what about there?")
+FOLLOW_UP_WORDS = {
+    "it", "its", "that", "this", "those", "these", "they", "them", "their", "there",
+    "he", "him", "his", "she", "her", "then", "more", "else", "also", "same"
+}
+FOLLOW_UP_MAX_WORDS = 8
+_WORDS = re.compile(r"[a-z']+")
+
+Turn = Tuple[str, str]
+
+
+def truncate_tokens(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """Cut text to roughly max_tokens, keeping its start (or its end)."""
+    words = text.split()
+    max_words = max(1, int(max_tokens * 3 / 4))
+    if len(words) <= max_words:
+        return text
+    return " ".join(words[-max_words:] if keep_end else words[:max_words])
+
+
+def is_follow_up(query: str) -> bool:
+    """A short question leaning on earlier context, e.g. "where was that?" or "tell me more"."""
+    words = _WORDS.findall(query.lower())
+    return len(words) <= FOLLOW_UP_MAX_WORDS and (len(words) <= 2 or any(word in FOLLOW_UP_WORDS for word in words))
+
+
+class ConversationMemory:
+    """What the model is told about earlier turns: a rolling summary plus the latest exchanges."""
+
+    def __init__(self, summary: str = "", turns: Optional[List[Turn]] = None):
+        self.summary = summary
+        self.turns = turns or []
+
+    def __bool__(self) -> bool:
+        return bool(self.summary or self.turns)
+
+    def tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(estimate_tokens(q) + estimate_tokens(a) for q, a in self.turns)
+
+    def rewrite(self, query: str) -> str:
+        """
+        Query to retrieve context for.
+
+        A follow-up is prefixed with the previous question, so "where was
+        that?" retrieves the sections the conversation is about. Other
+        queries are used as they are.
+        """
+        if self.turns and is_follow_up(query):
+            return f"{self.turns[-1][0]} {query}"
+        return query
+
+
+class ChatSession:
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.summary = ""
+        self.turns: List[Turn] = []
+        self.pending: List[Turn] = []       # Turns out of the window, not yet in the summary
+        self.summarizing = False
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+
+    def memory(self, max_tokens: int = CHAT_MEMORY_TOKENS) -> ConversationMemory:
+        """
+        Summary plus as many of the latest turns as fit in max_tokens.
+
+        Turns folded out of the window but not summarized yet are not
+        included; until the background summary lands they are simply
+        missing, which keeps the prompt size fixed.
+        """
+        with self.lock:
+            summary = self.summary
+            turns = list(self.turns)
+        budget = max_tokens - estimate_tokens(summary)
+        kept: List[Turn] = []
+        for query, answer in reversed(turns):
+            cost = estimate_tokens(query) + estimate_tokens(answer)
+            if cost > budget:
+                break
+            kept.insert(0, (query, answer))
+            budget -= cost
+        return ConversationMemory(summary, kept)
+
+
+def fallback_summary(summary: str, turns: List[Turn]) -> str:
+    """Summary without the model: the earlier questions, newest kept when over budget."""
+    asked = " ".join(f"Asked: {query.strip()}" for query, _ in turns)
+    return truncate_tokens(f"{summary} {asked}".strip(), CHAT_SUMMARY_TOKENS, keep_end=True)
+
+
+class ChatSessionStore:
+    """
+    Server-side chat sessions with constant-size memory.
+
+    Each session keeps its last max_turns exchanges verbatim. Older turns
+    are folded into a rolling summary by summarize(summary, turns) in a
+    background thread, so answering never waits for it. If summarizing
+    fails, the questions are appended to the summary instead. The summary
+    is capped at CHAT_SUMMARY_TOKENS, so memory stays bounded however long
+    the conversation runs.
+
+    Sessions expire after ttl seconds without a message, and at most
+    max_sessions are kept (least recently used evicted first). Sessions
+    live in this process's memory; a worker that doesn't know a session
+    id starts a fresh one.
+    """
+
+    def __init__(self, summarize: Optional[Callable[[str, List[Turn]], str]] = None,
+                 ttl: float = CHAT_SESSION_TTL, max_sessions: int = CHAT_SESSION_MAX,
+                 max_turns: int = CHAT_MEMORY_TURNS):
+        self.summarize = summarize
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="chat-summary")
+        self.created = 0
+        self.expired = 0
+        self.summaries = 0
+        self.summary_failures = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self, now: float) -> None:
+        # Least recently used first, so expired sessions are all at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen < self.ttl and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def get(self, session_id: Optional[str]) -> ChatSession:
+        """The live session with this id, or a new one (unknown or expired ids start over)."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = ChatSession(secrets.token_urlsafe(16))
+                self._sessions[session.id] = session
+                self.created += 1
+            else:
+                self._sessions.move_to_end(session.id)
+            session.last_seen = now
+            self._evict(now)
+        return session
+
+    def issued(self, session_id: Optional[str]) -> bool:
+        """Whether session_id names a live session created here (a client can't make one up)."""
+        session = self._sessions.get(session_id) if isinstance(session_id, str) else None
+        return session is not None and time.monotonic() - session.last_seen < self.ttl
+
+    def record(self, session: ChatSession, query: str, answer: str) -> None:
+        """Add an exchange; turns pushed out of the window are summarized in the background."""
+        with session.lock:
+            session.turns.append((query, answer))
+            if len(session.turns) > self.max_turns:
+                overflow = len(session.turns) - self.max_turns
+                session.pending.extend(session.turns[:overflow])
+                del session.turns[:overflow]
+            if not session.pending or session.summarizing:
+                return
+            session.summarizing = True
+        self._pool.submit(self._fold, session)
+
+    def _fold(self, session: ChatSession) -> None:
+        """Fold pending turns into the summary until none are left."""
+        while True:
+            with session.lock:
+                turns, session.pending = session.pending, []
+                summary = session.summary
+                if not turns:
+                    session.summarizing = False
+                    return
+            try:
+                if self.summarize is None:
+                    raise RuntimeError("No summarizer configured")
+                updated = truncate_tokens(self.summarize(summary, turns), CHAT_SUMMARY_TOKENS)
+                self.summaries += 1
+            except Exception as e:
+                logger.warning(f"Falling back to extractive chat summary: {str(e)}")
+                updated = fallback_summary(summary, turns)
+                self.summary_failures += 1
+            with session.lock:
+                session.summary = updated
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "created": self.created,
+            "expired": self.expired,
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures
+        }
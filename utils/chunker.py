@@ -0,0 +1,152 @@
+import os
+import json
+import math
+import logging
+from typing import Any, Dict, Iterable, List
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Configuration
+CHUNK_TOKENS = int(os.environ.get("CHUNK_TOKENS", "200"))          # Target chunk size
+CHUNK_OVERLAP = int(os.environ.get("CHUNK_OVERLAP", "40"))         # Tokens repeated from the previous chunk
+DEFAULT_TITLE = "General"                                          # Title for text before the first header
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count for budgeting chunks.
+
+    English text averages about 0.75 words per token with the OpenAI
+    tokenizers, which is close enough for sizing chunks without pulling in
+    a tokenizer dependency.
+    """
+    return math.ceil(len(text.split()) * 4 / 3)
+
+
+def _split_long_line(line: str, max_tokens: int) -> List[str]:
+    """Break a line that alone exceeds the budget into word windows."""
+    words = line.split()
+    step = max(1, int(max_tokens * 3 / 4))
+    return [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+
+
+def pack_lines(lines: List[str], max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """
+    Pack consecutive lines into chunks of at most max_tokens.
+
+    Lines are never split unless a single line is over budget. Each chunk
+    after the first starts with the trailing lines of the previous one, up
+    to overlap tokens, so a fact that straddles a boundary stays retrievable.
+    """
+    pieces = []
+    for line in lines:
+        if estimate_tokens(line) > max_tokens:
+            pieces.extend(_split_long_line(line, max_tokens))
+        else:
+            pieces.append(line)
+
+    chunks = []
+    current: List[str] = []
+    current_tokens = 0
+    fresh = 0  # lines in current that are not overlap from the previous chunk
+    for piece in pieces:
+        tokens = estimate_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(" ".join(current))
+
+            carried: List[str] = []
+            carried_tokens = 0
+            for previous in reversed(current):
+                previous_tokens = estimate_tokens(previous)
+                if carried_tokens + previous_tokens > overlap or carried_tokens + previous_tokens + tokens > max_tokens:
+                    break
+                carried.insert(0, previous)
+                carried_tokens += previous_tokens
+            current, current_tokens, fresh = carried, carried_tokens, 0
+
+        current.append(piece)
+        current_tokens += tokens
+        fresh += 1
+
+    if current and fresh:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def chunk_markdown(content: str, source: str = "", max_tokens: int = CHUNK_TOKENS,
+                   overlap: int = CHUNK_OVERLAP) -> List[Dict[str, Any]]:
+    """
+    Split markdown (or plain text with markdown headers) into sections.
+
+    '# ' and '## ' headers delimit sections; deeper headers stay in the
+    text. Each section is packed into chunks of about max_tokens. Every
+    chunk's title is its full header path ("Parent > Child") and its
+    "parents" holds the enclosing header titles.
+    """
+    sections = []
+    heading = ""
+    subheading = ""
+    lines: List[str] = []
+
+    def flush():
+        if not lines:
+            return
+        parents = [heading] if subheading and heading else []
+        title = " > ".join(parents + [subheading or heading or DEFAULT_TITLE])
+        for chunk in pack_lines(lines, max_tokens, overlap):
+            sections.append({
+                "title": title,
+                "content": chunk,
+                "parents": parents,
+                "source": source
+            })
+
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        # Major section headers (lines starting with #)
+        if line.startswith('# '):
+            flush()
+            heading, subheading, lines = line[2:].strip(), "", []
+
+        # Subsection headers (lines starting with ##)
+        elif line.startswith('## '):
+            flush()
+            subheading, lines = line[3:].strip(), []
+
+        # Regular content
+        else:
+            lines.append(line)
+
+    flush()
+    return sections
+
+
+def chunk_qa_pairs(pairs: Iterable[Dict[str, str]], source: str = "") -> List[Dict[str, Any]]:
+    """One section per question/answer pair, titled by the question."""
+    sections = []
+    for pair in pairs:
+        question = (pair.get("question") or "").strip()
+        answer = (pair.get("answer") or "").strip()
+        if question and answer:
+            sections.append({
+                "title": question,
+                "content": answer,
+                "parents": [],
+                "source": source
+            })
+    return sections
+
+
+def chunk_file(file_path: str, max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP) -> List[Dict[str, Any]]:
+    """Chunk a .md/.txt knowledge file or a .json list of Q&A pairs."""
+    extension = os.path.splitext(file_path)[1].lower()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if extension == '.json':
+            data = json.load(f)
+            return chunk_qa_pairs(data if isinstance(data, list) else [], source=file_path)
+        return chunk_markdown(f.read(), source=file_path, max_tokens=max_tokens, overlap=overlap)
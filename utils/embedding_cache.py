@@ -0,0 +1,185 @@
+import os
+import re
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "1024"))  # Query embeddings kept (LRU)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: lowercased, punctuation dropped, whitespace collapsed."""
+    text = _PUNCTUATION.sub(" ", text.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class LRUCache:
+    """Small thread-safe least-recently-used mapping with hit/miss counters."""
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, count_miss: bool = True) -> Optional[Any]:
+        with self._lock:
+            if key not in self._entries:
+                if count_miss:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one.
+
+    The first caller for a key runs fn; callers arriving while it is in
+    flight wait for and share its result (or exception) instead of making
+    their own request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, "asyncio.Future"] = {}
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is not None:
+            self.shared += 1
+        else:
+            call = self._calls[key] = asyncio.ensure_future(fn())
+            call.add_done_callback(lambda _: self._calls.pop(key, None))
+        # A cancelled caller must not cancel the call the others are waiting on
+        return await asyncio.shield(call)
+
+
+class QueryEmbeddingCache:
+    """
+    LRU cache of query embeddings keyed on the normalized query text, with
+    single-flight so identical concurrent misses share one embedding call.
+    """
+
+    def __init__(self, embed: Callable[[str], List[float]], max_entries: int = QUERY_CACHE_SIZE,
+                 flight: Optional[SingleFlight] = None,
+                 embed_async: Optional[Callable[[str], Awaitable[List[float]]]] = None):
+        self.embed = embed
+        self.embed_async = embed_async
+        self.cache = LRUCache(max_entries)
+        self.flight = flight or SingleFlight()
+        self.async_flight = AsyncSingleFlight()
+
+    def peek(self, query: str) -> Optional[List[float]]:
+        """Return the cached embedding for query without calling the API."""
+        # A miss here is followed by get(), which counts it
+        return self.cache.get(normalize_query(query), count_miss=False)
+
+    def get(self, query: str) -> List[float]:
+        key = normalize_query(query)
+        embedding = self.cache.get(key)
+        if embedding is not None:
+            return embedding
+
+        embedding = self.flight.do(("query", key), lambda: self.embed(query))
+        # Failed lookups come back empty; don't pin them in the cache
+        if embedding is not None and len(embedding):
+            self.cache.put(key, embedding)
+        return embedding
+
+    async def get_async(self, query: str) -> List[float]:
+        """get() for coroutines: misses are embedded with embed_async, without blocking the loop."""
+        key = normalize_query(query)
+        embedding = self.cache.get(key)
+        if embedding is not None:
+            return embedding
+
+        embedding = await self.async_flight.do(("query", key), lambda: self.embed_async(query))
+        if embedding is not None and len(embedding):
+            self.cache.put(key, embedding)
+        return embedding
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        stats["coalesced"] = self.flight.shared + self.async_flight.shared
+        return stats
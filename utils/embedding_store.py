@@ -0,0 +1,208 @@
+import os
+import json
+import fcntl
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+STORE_DIR = os.environ.get("EMBEDDING_STORE_DIR", "content/.embeddings")
+INDEX_FILE = "index.json"
+MATRIX_PREFIX = "vectors-"
+LOCK_FILE = "writer.lock"
+
+
+def embedding_key(model: str, text: str) -> str:
+    """Content address of an embedding: hash of the model name plus the text."""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    On-disk embedding store shared by every worker process.
+
+    Layout of the store directory:
+    - vectors-<generation>.npy: float32 matrix, one row per embedding
+    - index.json: {"dim": int, "matrix": file name, "keys": [key, ...]}
+      where keys[i] is row i of the matrix
+
+    Readers only ever map the files read-only, so the OS page cache holds a
+    single copy for all workers. Writers buffer new vectors in memory and
+    publish them with flush(), which writes a new matrix generation and then
+    swaps the index in with os.replace, so a reader never pairs an index
+    with the wrong matrix. Writers in different processes take turns on an
+    flock, and each merges into the latest published store.
+    """
+
+    def __init__(self, directory: str = STORE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._pending: Dict[str, np.ndarray] = {}
+        self._index_mtime = 0.0
+        self.load()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, INDEX_FILE)
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def __len__(self) -> int:
+        return len(self._rows) + len(self._pending)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._pending or key in self._rows
+
+    def published_keys(self) -> Set[str]:
+        """Keys of the embeddings on disk, not counting pending ones."""
+        return set(self._rows)
+
+    def load(self) -> None:
+        """Map the published store files, if any."""
+        with self._lock:
+            self._load_locked()
+
+    def _load_locked(self) -> None:
+        try:
+            if not os.path.exists(self.index_path):
+                self._rows, self._matrix, self._index_mtime = {}, None, 0.0
+                return
+
+            mtime = os.path.getmtime(self.index_path)
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            matrix = np.load(os.path.join(self.directory, index["matrix"]), mmap_mode='r')
+
+            keys = index.get("keys", [])
+            if matrix.ndim != 2 or matrix.shape[0] != len(keys):
+                logger.warning(f"Embedding store at {self.directory} is inconsistent, ignoring it")
+                self._rows, self._matrix, self._index_mtime = {}, None, mtime
+                return
+
+            self._rows = {key: row for row, key in enumerate(keys)}
+            self._matrix = matrix
+            self._index_mtime = mtime
+            logger.info(f"Mapped {len(keys)} embeddings from {self.directory}")
+        except Exception as e:
+            logger.error(f"Error loading embedding store: {str(e)}")
+            self._rows, self._matrix = {}, None
+
+    def refresh(self) -> None:
+        """Re-map the store if another process has published a newer version."""
+        try:
+            mtime = os.path.getmtime(self.index_path)
+        except OSError:
+            return
+        if mtime != self._index_mtime:
+            with self._lock:
+                self._load_locked()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the stored vector for key, or None."""
+        vector = self._pending.get(key)
+        if vector is not None:
+            return vector
+        row = self._rows.get(key)
+        if row is None or self._matrix is None:
+            return None
+        return self._matrix[row]
+
+    def put(self, key: str, vector: List[float]) -> None:
+        """Buffer a vector; it becomes visible to other processes after flush()."""
+        if vector is None or len(vector) == 0:
+            return
+        with self._lock:
+            self._pending[key] = np.asarray(vector, dtype=np.float32)
+
+    @contextmanager
+    def _writer_lock(self):
+        """Exclusive, cross-process lock held while writing, publishing and cleaning up."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, LOCK_FILE), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def flush(self, keep: Optional[Iterable[str]] = None) -> None:
+        """
+        Publish pending vectors to disk.
+
+        When keep is given, every stored entry whose key is not in it is
+        evicted, so the store only holds embeddings of current sections.
+        """
+        with self._lock:
+            keep_set = set(keep) if keep is not None else None
+            if not self._pending and keep_set is None:
+                return
+            try:
+                with self._writer_lock():
+                    self._flush_locked(keep_set)
+            except Exception as e:
+                logger.error(f"Error writing embedding store: {str(e)}")
+
+    def _flush_locked(self, keep_set: Optional[set]) -> None:
+        # Start from what was published last, which may be another process's write
+        try:
+            if os.path.getmtime(self.index_path) != self._index_mtime:
+                self._load_locked()
+        except OSError:
+            pass
+
+        keys: List[str] = []
+        rows: List[np.ndarray] = []
+        for key, row in self._rows.items():
+            if key in self._pending or (keep_set is not None and key not in keep_set):
+                continue
+            keys.append(key)
+            rows.append(self._matrix[row])
+        for key, vector in self._pending.items():
+            if keep_set is not None and key not in keep_set:
+                continue
+            keys.append(key)
+            rows.append(vector)
+
+        if keys == list(self._rows) and not self._pending:
+            return
+
+        self._write_locked(keys, rows)
+        self._pending.clear()
+        self._load_locked()
+
+    def _write_locked(self, keys: List[str], rows: List[np.ndarray]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        dim = rows[0].shape[0] if rows else 0
+        matrix = np.vstack(rows).astype(np.float32) if rows else np.zeros((0, dim), dtype=np.float32)
+
+        generation = hashlib.sha256("\n".join(keys).encode("utf-8")).hexdigest()[:16]
+        matrix_name = f"{MATRIX_PREFIX}{generation}.npy"
+        matrix_tmp = os.path.join(self.directory, f"{matrix_name}.{os.getpid()}.tmp")
+        with open(matrix_tmp, 'wb') as f:
+            np.save(f, matrix)
+        os.replace(matrix_tmp, os.path.join(self.directory, matrix_name))
+
+        index_tmp = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(index_tmp, 'w') as f:
+            json.dump({"dim": int(dim), "matrix": matrix_name, "keys": keys}, f)
+        os.replace(index_tmp, self.index_path)
+
+        # Old generations can go: processes that still map them keep their pages
+        for name in os.listdir(self.directory):
+            if name.startswith(MATRIX_PREFIX) and name.endswith(".npy") and name != matrix_name:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        logger.info(f"Wrote {len(keys)} embeddings to {self.directory}")
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import difflib
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.embedding_cache import normalize_query
+from utils.rag_utils import get_embeddings, INTERVIEWS_DIR, WARMUP_RETRY_BASE, WARMUP_RETRY_MAX, WARMUP_MAX_ATTEMPTS
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Configuration
+FAQ_LEXICAL_THRESHOLD = float(os.environ.get("FAQ_LEXICAL_THRESHOLD", "0.9"))       # Fuzzy match ratio of normalized question text
+FAQ_EMBEDDING_THRESHOLD = float(os.environ.get("FAQ_EMBEDDING_THRESHOLD", "0.95"))   # Cosine similarity to a curated question
+FAQ_REFRESH_INTERVAL = float(os.environ.get("FAQ_REFRESH_INTERVAL", "60"))           # Seconds between source checks
+
+
+def load_qa_files(interviews_dir: Optional[str] = INTERVIEWS_DIR) -> List[Dict[str, str]]:
+    """Question/answer pairs from the JSON files in interviews_dir."""
+    pairs = []
+    if not interviews_dir or not os.path.isdir(interviews_dir):
+        return pairs
+    for name in sorted(os.listdir(interviews_dir)):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(interviews_dir, name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            pairs.extend(
+                {"question": item.get("question", ""), "answer": item.get("answer", ""), "source": path}
+                for item in (data if isinstance(data, list) else [])
+                if isinstance(item, dict)
+            )
+        except Exception as e:
+            logger.error(f"Error loading Q&A file {path}: {str(e)}")
+    return pairs
+
+
+class FAQIndex:
+    """
+    Curated question/answer pairs matched directly against chatbot queries.
+
+    A query is answered straight from the FAQ, with no completion call,
+    when its normalized text is (nearly) identical to a curated question,
+    or when its embedding is within FAQ_EMBEDDING_THRESHOLD of one.
+
+    load_pairs returns the current pairs (e.g. the InterviewQuestion table
+    plus the Q&A files). The index is rebuilt when invalidate() is called
+    and otherwise re-checks its sources every refresh_interval seconds;
+    a rebuild with unchanged pairs is a no-op. Question embeddings are
+    computed in the background and reused across rebuilds, so lexical
+    matches work immediately after a change. If embedding fails it is
+    retried with backoff like the retrieval index warm-up; once those
+    retries run out the signature is forgotten, so the next refresh
+    starts over.
+    """
+
+    def __init__(
+        self,
+        load_pairs: Callable[[], List[Dict[str, str]]],
+        embed: Callable[[List[str]], List[List[float]]] = get_embeddings,
+        lexical_threshold: float = FAQ_LEXICAL_THRESHOLD,
+        embedding_threshold: float = FAQ_EMBEDDING_THRESHOLD,
+        refresh_interval: float = FAQ_REFRESH_INTERVAL,
+    ):
+        self.load_pairs = load_pairs
+        self.embed = embed
+        self.lexical_threshold = lexical_threshold
+        self.embedding_threshold = embedding_threshold
+        self.refresh_interval = refresh_interval
+        self.lookups = 0
+        self.lexical_hits = 0
+        self.embedding_hits = 0
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+        self._stale = True
+        self._checked_at = 0.0
+        self._signature = None
+        # (normalized questions, normalized question -> answer, question embedding rows or None),
+        # replaced as a whole so a lookup never pairs rows with another rebuild's questions
+        self._entries: Tuple[List[str], Dict[str, str], Optional[np.ndarray]] = ([], {}, None)
+        # Question text -> normalized embedding, kept across rebuilds
+        self._vectors: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries[0])
+
+    def invalidate(self) -> None:
+        """Rebuild from the sources on the next lookup."""
+        self._stale = True
+
+    def refresh(self, force: bool = False) -> bool:
+        """Rebuild if the pairs changed. Returns True if the index was rebuilt."""
+        with self._lock:
+            if not force and not self._stale and time.monotonic() - self._checked_at < self.refresh_interval:
+                return False
+            self._stale = False
+            self._checked_at = time.monotonic()
+            try:
+                pairs = self.load_pairs()
+            except Exception as e:
+                logger.error(f"Error loading FAQ pairs: {str(e)}")
+                return False
+
+            answers = {}
+            for pair in pairs:
+                question = normalize_query(pair.get("question") or "")
+                answer = (pair.get("answer") or "").strip()
+                # First source wins for duplicate questions
+                if question and answer and question not in answers:
+                    answers[question] = answer
+
+            signature = hashlib.sha256(json.dumps(sorted(answers.items())).encode('utf-8')).hexdigest()
+            if signature == self._signature:
+                return False
+
+            # No matrix until the new questions are embedded: the old rows belong to the old questions
+            questions = list(answers)
+            self._signature = signature
+            self._entries = (questions, answers, None)
+            self.rebuilds += 1
+            logger.info(f"Rebuilt FAQ index with {len(answers)} questions")
+
+        threading.Thread(target=self._embed_questions, args=(signature, questions, answers),
+                         name="faq-embed", daemon=True).start()
+        return True
+
+    def _embed_questions(self, signature: str, questions: List[str], answers: Dict[str, str]) -> None:
+        missing = [question for question in questions if question not in self._vectors]
+        attempt = 0
+        while missing:
+            vectors = self.embed(missing)
+            if len(vectors) == len(missing):
+                break
+            with self._lock:
+                if self._signature != signature:
+                    return  # Superseded by a newer rebuild
+                if attempt >= WARMUP_MAX_ATTEMPTS:
+                    logger.error(f"Embedding {len(missing)} FAQ questions failed {attempt + 1} times; "
+                                 f"only lexical matching is available until the next refresh")
+                    self._signature = None
+                    return
+            delay = min(WARMUP_RETRY_MAX, WARMUP_RETRY_BASE * 2 ** attempt)
+            attempt += 1
+            logger.warning(f"Embedding {len(missing)} FAQ questions failed; retrying in {delay:.0f}s")
+            time.sleep(delay)
+        if missing:
+            for question, vector in zip(missing, vectors):
+                vector = np.asarray(vector, dtype=np.float32)
+                self._vectors[question] = vector / (np.linalg.norm(vector) or 1.0)
+
+        matrix = np.stack([self._vectors[question] for question in questions]) if questions else None
+        with self._lock:
+            if self._signature != signature:
+                return  # Superseded by a newer rebuild
+            self._entries = (questions, answers, matrix)
+            # Drop vectors of questions that were removed
+            self._vectors = {question: self._vectors[question] for question in questions}
+
+    def match_text(self, query: str) -> Optional[str]:
+        """Curated answer for a query worded (almost) exactly like a question."""
+        self.refresh()
+        questions, answers, _ = self._entries
+        normalized = normalize_query(query)
+        answer = answers.get(normalized)
+        if answer is None:
+            close = difflib.get_close_matches(normalized, questions, n=1, cutoff=self.lexical_threshold)
+            answer = answers.get(close[0]) if close else None
+        return answer
+
+    def match_embedding(self, query_embedding: List[float]) -> Optional[str]:
+        """Curated answer for a query whose embedding is close to a question's."""
+        questions, answers, matrix = self._entries
+        if matrix is None or not len(query_embedding):
+            return None
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if vector.shape != (matrix.shape[1],) or norm == 0:
+            return None
+        scores = matrix @ (vector / norm)
+        best = int(np.argmax(scores))
+        if scores[best] < self.embedding_threshold:
+            return None
+        return answers.get(questions[best])
+
+    def lookup(self, query: str, query_embedding: Optional[List[float]] = None) -> Tuple[Optional[str], str]:
+        """
+        Try the text match, then the embedding match if an embedding is given.
+
+        Returns (answer, how) where how is "lexical", "embedding" or "" on a miss.
+        Every call counts as one lookup in stats().
+        """
+        self.lookups += 1
+        answer = self.match_text(query)
+        if answer is not None:
+            self.lexical_hits += 1
+            return answer, "lexical"
+        if query_embedding is not None:
+            answer = self.lookup_embedding(query_embedding)
+            if answer is not None:
+                return answer, "embedding"
+        return None, ""
+
+    def lookup_embedding(self, query_embedding: List[float]) -> Optional[str]:
+        """Finish a lookup made without an embedding, once the query is embedded."""
+        answer = self.match_embedding(query_embedding)
+        if answer is not None:
+            self.embedding_hits += 1
+        return answer
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.lexical_hits + self.embedding_hits
+        return {
+            "questions": len(self._entries[0]),
+            "embedded": self._entries[2] is not None,
+            "lookups": self.lookups,
+            "hits": hits,
+            "lexical_hits": self.lexical_hits,
+            "embedding_hits": self.embedding_hits,
+            "hit_rate": hits / self.lookups if self.lookups else 0.0,
+            "rebuilds": self.rebuilds
+        }
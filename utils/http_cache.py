@@ -0,0 +1,318 @@
+import os
+import gzip
+import time
+import hashlib
+import logging
+import mimetypes
+import threading
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+
+# Optional: brotli variants are only built when the module is installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Configuration
+HTTP_CACHE_ENABLED = os.environ.get("HTTP_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+HTTP_CACHE_CHECK_INTERVAL = float(os.environ.get("HTTP_CACHE_CHECK_INTERVAL", "2"))  # Seconds between mtime checks
+STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", "31536000"))                  # Lifetime of versioned static URLs
+STATIC_MAX_BYTES = 1024 * 1024          # Larger static files are served from disk
+COMPRESS_MIN_BYTES = 256                # Smaller bodies aren't worth an encoded variant
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+PAGE_CACHE_CONTROL = "no-cache"         # Always revalidate; unchanged pages cost a 304
+STATIC_CACHE_CONTROL = f"public, max-age={STATIC_MAX_AGE}, immutable"
+
+FileSignature = Tuple[Tuple[str, int, int], ...]
+
+
+class CachedBody:
+    """
+    A response body with its strong ETag and precompressed variants.
+
+    Everything is computed once, when the body is built, so serving it is a
+    dictionary lookup: no rendering, hashing or compression per request.
+    """
+
+    __slots__ = ("body", "mimetype", "etag", "variants")
+
+    def __init__(self, body: bytes, mimetype: str):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.variants: Dict[str, bytes] = {}
+        if len(body) >= COMPRESS_MIN_BYTES and mimetype.startswith(COMPRESSIBLE_TYPES):
+            if brotli is not None:
+                self._add_variant("br", brotli.compress(body, quality=11))
+            self._add_variant("gzip", gzip.compress(body, compresslevel=9, mtime=0))
+
+    def _add_variant(self, encoding: str, data: bytes) -> None:
+        if len(data) < len(self.body):
+            self.variants[encoding] = data
+
+    def negotiate(self, accept_encodings) -> Optional[str]:
+        """The best encoding the client accepts, or None for the identity body."""
+        for encoding in self.variants:
+            if accept_encodings[encoding]:
+                return encoding
+        return None
+
+    def size(self) -> int:
+        return len(self.body) + sum(len(data) for data in self.variants.values())
+
+
+def cached_response(entry: CachedBody, cache_control: str):
+    """Serve entry for the current request, as a 304 if the client's copy is current."""
+    from flask import Response, request
+
+    encoding = entry.negotiate(request.accept_encodings)
+    # Each encoding is a different representation, so it gets its own strong ETag
+    etag = entry.etag if encoding is None else f"{entry.etag}-{encoding}"
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.variants.get(encoding, entry.body), mimetype=entry.mimetype)
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def directory_signature(root: str) -> FileSignature:
+    """(relative path, mtime, size) of every file under root, to detect changes cheaply."""
+    entries = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((os.path.relpath(path, root).replace(os.sep, "/"), stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(entries))
+
+
+class StaticAssets:
+    """
+    Files under the static folder, with content hashes for versioned URLs.
+
+    Files up to STATIC_MAX_BYTES are held in memory with their compressed
+    variants; only files whose mtime or size changed are re-read.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.signature: FileSignature = ()
+        self._versions: Dict[str, str] = {}
+        self._entries: Dict[str, CachedBody] = {}
+        self._stats: Dict[str, Tuple[int, int]] = {}
+
+    def refresh(self) -> bool:
+        """Re-scan the folder; True if any file was added, removed or modified."""
+        signature = directory_signature(self.root) if os.path.isdir(self.root) else ()
+        if signature == self.signature:
+            return False
+        versions, entries, stats = {}, {}, {}
+        for filename, mtime, size in signature:
+            if self._stats.get(filename) == (mtime, size) and filename in self._versions:
+                versions[filename] = self._versions[filename]
+                if filename in self._entries:
+                    entries[filename] = self._entries[filename]
+                stats[filename] = (mtime, size)
+                continue
+            try:
+                entry, version = self._load(filename, size)
+            except OSError as e:
+                logger.error(f"Error reading static file {filename}: {str(e)}")
+                continue
+            versions[filename] = version
+            if entry is not None:
+                entries[filename] = entry
+            stats[filename] = (mtime, size)
+        self._versions, self._entries, self._stats = versions, entries, stats
+        self.signature = signature
+        logger.info(f"Static assets refreshed: {len(versions)} files, {len(entries)} in memory")
+        return True
+
+    def _load(self, filename: str, size: int) -> Tuple[Optional[CachedBody], str]:
+        path = os.path.join(self.root, filename)
+        if size > STATIC_MAX_BYTES:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+            return None, digest.hexdigest()[:12]
+        with open(path, 'rb') as f:
+            body = f.read()
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        entry = CachedBody(body, mimetype)
+        return entry, entry.etag[:12]
+
+    def version(self, filename: str) -> Optional[str]:
+        return self._versions.get(filename)
+
+    def get(self, filename: str) -> Optional[CachedBody]:
+        return self._entries.get(filename)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "files": len(self._versions),
+            "in_memory": len(self._entries),
+            "bytes": sum(entry.size() for entry in self._entries.values())
+        }
+
+
+class HTTPCache:
+    """
+    Response caching for pages whose output doesn't depend on the request.
+
+    - page(): decorated GET views are rendered once and kept in memory, with
+      a strong ETag (304 when the client's copy is current) and gzip/brotli
+      variants chosen by Accept-Encoding.
+    - file(): a text file's contents, re-read only when its mtime or size
+      changes.
+    - Static files get ?v=<content hash> added by url_for, and versioned
+      requests are served from memory as immutable for STATIC_MAX_AGE.
+
+    Pages are dropped when templates or static files change on disk (checked
+    at most every HTTP_CACHE_CHECK_INTERVAL seconds) and on invalidate(),
+    e.g. when the knowledge base content changes.
+    """
+
+    def __init__(self, app, check_interval: float = HTTP_CACHE_CHECK_INTERVAL, enabled: bool = HTTP_CACHE_ENABLED):
+        self.app = app
+        self.enabled = enabled
+        self.check_interval = check_interval
+        self.static = StaticAssets(app.static_folder) if app.static_folder else None
+        self.template_folder = os.path.join(app.root_path, app.template_folder or "templates")
+        self._template_signature: FileSignature = ()
+        self._pages: Dict[str, CachedBody] = {}
+        self._files: Dict[str, Tuple[Tuple[int, int], CachedBody]] = {}
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+        if not enabled:
+            return
+
+        self._check(force=True)
+        if self.static is not None and "static" in app.view_functions:
+            self._send_static_file = app.view_functions["static"]
+            app.view_functions["static"] = self.serve_static
+            app.url_defaults(self._static_version)
+
+    def _check(self, force: bool = False) -> None:
+        """Drop rendered pages if templates or static files changed since the last check."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if not force and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            templates = directory_signature(self.template_folder) if os.path.isdir(self.template_folder) else ()
+            static_changed = self.static.refresh() if self.static is not None else False
+            if templates != self._template_signature or static_changed:
+                self._template_signature = templates
+                self._pages = {}
+
+    def invalidate(self) -> None:
+        """Drop every rendered page and cached file."""
+        with self._lock:
+            self._pages = {}
+            self._files = {}
+        logger.info("HTTP cache invalidated")
+
+    def _serve(self, entry: CachedBody, cache_control: str):
+        response = cached_response(entry, cache_control)
+        if response.status_code == 304:
+            self._not_modified += 1
+        return response
+
+    def page(self, view: Callable) -> Callable:
+        """Decorator: cache a view's rendered output for GET requests."""
+        from flask import request
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or request.method not in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+            self._check()
+            key = request.endpoint
+            entry = self._pages.get(key)
+            if entry is None:
+                result = view(*args, **kwargs)
+                if not isinstance(result, str):
+                    # Redirects, tuples with status codes etc. aren't cacheable pages
+                    return result
+                self._misses += 1
+                entry = CachedBody(result.encode('utf-8'), "text/html")
+                self._pages[key] = entry
+            else:
+                self._hits += 1
+            return self._serve(entry, PAGE_CACHE_CONTROL)
+
+        return wrapper
+
+    def file(self, path: str, mimetype: str = "text/html"):
+        """Response with path's contents, read from disk only when the file changed."""
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._files.get(path)
+        if cached is None or cached[0] != key or not self.enabled:
+            with open(path, 'rb') as f:
+                entry = CachedBody(f.read(), mimetype)
+            self._files[path] = (key, entry)
+            self._misses += 1
+        else:
+            entry = cached[1]
+            self._hits += 1
+        return self._serve(entry, PAGE_CACHE_CONTROL)
+
+    def serve_static(self, filename: str):
+        """Replacement for Flask's static view: in-memory, precompressed, immutable when versioned."""
+        from flask import request
+
+        self._check()
+        version = self.static.version(filename)
+        versioned = version is not None and request.args.get("v") == version
+        cache_control = STATIC_CACHE_CONTROL if versioned else PAGE_CACHE_CONTROL
+        entry = self.static.get(filename)
+        if entry is None:
+            response = self._send_static_file(filename=filename)
+            if versioned:
+                response.headers["Cache-Control"] = cache_control
+            return response
+        self._hits += 1
+        return self._serve(entry, cache_control)
+
+    def _static_version(self, endpoint: str, values: dict) -> None:
+        # url_for('static', filename=...) -> /static/<filename>?v=<content hash>
+        if endpoint != "static" or "v" in values:
+            return
+        version = self.static.version(values.get("filename", ""))
+        if version is not None:
+            values["v"] = version
+
+    def stats(self) -> Dict[str, int]:
+        stats = {
+            "enabled": self.enabled,
+            "pages": len(self._pages),
+            "files": len(self._files),
+            "hits": self._hits,
+            "misses": self._misses,
+            "not_modified": self._not_modified,
+            "brotli": brotli is not None
+        }
+        if self.static is not None:
+            stats["static"] = self.static.stats()
+        return stats
@@ -0,0 +1,163 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Configuration
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))              # Job items processed concurrently
+JOB_HISTORY = int(os.environ.get("JOB_HISTORY", "100"))            # Finished jobs kept for status queries
+JOB_MAX_PENDING = int(os.environ.get("JOB_MAX_PENDING", "50"))     # Unfinished items accepted before submissions are refused
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+class Job:
+    """A batch of items processed in the background, with per-item results."""
+
+    def __init__(self, kind: str, items: List[Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.items = items
+        self.status = QUEUED
+        self.results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._remaining = len(items)
+
+    @property
+    def done(self) -> int:
+        return len(self.items) - self._remaining
+
+    def _record(self, index: int, result: Dict[str, Any]) -> bool:
+        """Store one item's result; True when it was the last item."""
+        with self._lock:
+            self.results[index] = result
+            self._remaining -= 1
+            return self._remaining == 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        failed = sum(1 for result in self.results if result is not None and not result["success"])
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": len(self.items),
+            "done": self.done,
+            "failed": failed,
+            "results": [
+                dict(result, item=item) if result is not None else {"item": item, "pending": True}
+                for item, result in zip(self.items, self.results)
+            ],
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobQueue:
+    """
+    Run jobs on a shared worker pool and keep their status for polling.
+
+    A job is a list of items; fn(item) runs once per item, items of the
+    same job run concurrently, and the job succeeds if at least one item
+    did (fn returning a falsy value or raising counts as a failed item).
+    on_complete(job) runs after the last item, e.g. to rebuild an index
+    once per batch instead of once per item.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, history: int = JOB_HISTORY):
+        self.history = history
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, items: List[Any], fn: Callable[[Any], Any],
+               on_complete: Optional[Callable[[Job], None]] = None) -> Job:
+        job = Job(kind, list(items))
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        if not job.items:
+            self._finish(job, on_complete)
+            return job
+        for index, item in enumerate(job.items):
+            self._pool.submit(self._run_item, job, index, item, fn, on_complete)
+        logger.info(f"Queued {kind} job {job.id} with {len(job.items)} items")
+        return job
+
+    def _run_item(self, job: Job, index: int, item: Any, fn: Callable[[Any], Any],
+                  on_complete: Optional[Callable[[Job], None]]) -> None:
+        job.status = RUNNING
+        try:
+            outcome = fn(item)
+            result = {"success": bool(outcome)}
+            if not outcome:
+                result["error"] = "Processing failed"
+        except Exception as e:
+            logger.error(f"Error in {job.kind} job {job.id} item {item}: {str(e)}")
+            result = {"success": False, "error": str(e)}
+        if job._record(index, result):
+            self._finish(job, on_complete)
+
+    def _finish(self, job: Job, on_complete: Optional[Callable[[Job], None]]) -> None:
+        job.status = SUCCEEDED if any(result and result["success"] for result in job.results) else FAILED
+        job.finished_at = time.time()
+        logger.info(f"{job.kind} job {job.id} {job.status}: {job.done}/{len(job.items)} items")
+        if on_complete is not None:
+            try:
+                on_complete(job)
+            except Exception as e:
+                logger.error(f"Error completing {job.kind} job {job.id}: {str(e)}")
+
+    def _prune(self) -> None:
+        # Drop the oldest finished jobs beyond the history limit
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def pending(self, kind: Optional[str] = None) -> int:
+        """Items queued or running, optionally only those of one kind of job."""
+        with self._lock:
+            return sum(job._remaining for job in self._jobs.values()
+                       if job.finished_at is None and (kind is None or job.kind == kind))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def recent(self, limit: int = 20) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())[-limit:][::-1]
+
+
+class Debouncer:
+    """Call fn once, delay seconds after the last of a burst of call() requests."""
+
+    def __init__(self, fn: Callable[[], Any], delay: float):
+        self.fn = fn
+        self.delay = delay
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def call(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run(self) -> None:
+        with self._lock:
+            self._timer = None
+        try:
+            self.fn()
+        except Exception as e:
+            logger.error(f"Error in debounced call: {str(e)}")
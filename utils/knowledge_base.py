@@ -0,0 +1,184 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.startup_profile import phase
+from utils.rag_utils import (
+    load_content_from_file, start_index_warmup, diff_sections, section_keys,
+    get_knowledge_version, refresh_shared_snapshot, INTERVIEWS_DIR, DOCUMENTS_DIR, SHARED_INDEX_DIR
+)
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Configuration
+KNOWLEDGE_FILE = "content/knowledge_base.md"
+KNOWLEDGE_WATCH = os.environ.get("KNOWLEDGE_WATCH", "").lower() in ("1", "true", "yes")
+KNOWLEDGE_WATCH_INTERVAL = float(os.environ.get("KNOWLEDGE_WATCH_INTERVAL", "5"))  # Seconds between checks
+SHARED_INDEX_POLL = float(os.environ.get("SHARED_INDEX_POLL", "2"))                # Seconds between generation checks
+
+
+class KnowledgeBase:
+    """
+    The knowledge base the chatbot answers from, with incremental reloads.
+
+    reload() re-parses the content files and compares the new chunks with
+    the current ones by content hash. Unchanged content is a no-op.
+    Otherwise only new or changed chunks are embedded (everything else is
+    already in the embedding store), in the background, and the complete
+    new snapshot replaces the old one in a single swap once it is ready.
+    Embeddings no current chunk uses are dropped from the store.
+
+    watch() optionally polls the content files, so edits made outside the
+    admin UI are picked up too.
+
+    With SHARED_INDEX_DIR set, indexes are published for all workers and
+    follow() adopts generations published by other workers, e.g. after an
+    admin reload handled elsewhere.
+
+    on_change, if given, is called whenever the content changed.
+    """
+
+    def __init__(self, file_path: str = KNOWLEDGE_FILE, interviews_dir: Optional[str] = INTERVIEWS_DIR,
+                 on_change: Optional[Callable[[], None]] = None, documents_dir: Optional[str] = DOCUMENTS_DIR):
+        self.file_path = file_path
+        self.interviews_dir = interviews_dir
+        self.documents_dir = documents_dir
+        self.on_change = on_change
+        self._sections: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._follower = None
+        self._mtimes: Dict[str, float] = {}
+        self.last_parse_seconds = 0.0       # Reading and chunking the content files
+        self.last_reload_seconds = 0.0      # Until the new index is served, embedding included
+
+    @property
+    def sections(self) -> List[Dict[str, Any]]:
+        return self._sections
+
+    @property
+    def version(self) -> Optional[str]:
+        """Version of the snapshot queries are answered from."""
+        return get_knowledge_version()
+
+    def load(self) -> Dict[str, int]:
+        changes = self.reload()
+        if SHARED_INDEX_DIR:
+            self.follow()
+        return changes
+
+    def start(self) -> threading.Thread:
+        """Load in a background thread so application start-up doesn't wait for it."""
+        def run():
+            with phase("knowledge_load"):
+                self.load()
+
+        thread = threading.Thread(target=run, name="knowledge-load", daemon=True)
+        thread.start()
+        return thread
+
+    def reload(self) -> Dict[str, int]:
+        """
+        Re-read the content files and warm a new index if anything changed.
+
+        Returns the number of chunks added, removed and unchanged.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            self._mtimes = self._content_mtimes()
+            sections = load_content_from_file(self.file_path, warm=False, interviews_dir=self.interviews_dir,
+                                              documents_dir=self.documents_dir)
+            changes = diff_sections(self._sections, sections)
+
+            if self._sections and section_keys(sections) == section_keys(self._sections):
+                logger.info("Knowledge base unchanged, keeping current index")
+                return changes
+
+            self._sections = sections
+            self.last_parse_seconds = time.perf_counter() - start
+            if sections:
+                start_index_warmup(sections, on_done=lambda: self._reloaded(start))
+            else:
+                self._reloaded(start)
+            logger.info(f"Reloading knowledge base: {changes}")
+        self._notify()
+        return changes
+
+    def _reloaded(self, start: float) -> None:
+        self.last_reload_seconds = time.perf_counter() - start
+        logger.info(f"Knowledge base reload finished in {self.last_reload_seconds:.2f}s")
+
+    def _notify(self) -> None:
+        if self.on_change is None:
+            return
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.error(f"Error in knowledge base change callback: {str(e)}")
+
+    def _content_files(self) -> List[str]:
+        files = [self.file_path]
+        if self.interviews_dir and os.path.isdir(self.interviews_dir):
+            files.extend(
+                os.path.join(self.interviews_dir, name)
+                for name in sorted(os.listdir(self.interviews_dir))
+                if name.endswith('.json')
+            )
+        if self.documents_dir and os.path.isdir(self.documents_dir):
+            files.extend(
+                os.path.join(self.documents_dir, name)
+                for name in sorted(os.listdir(self.documents_dir))
+                if name.endswith(('.md', '.txt'))
+            )
+        return files
+
+    def _content_mtimes(self) -> Dict[str, float]:
+        mtimes = {}
+        for path in self._content_files():
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except OSError:
+                continue
+        return mtimes
+
+    def follow(self, interval: float = SHARED_INDEX_POLL) -> None:
+        """Adopt shared index generations published by other workers."""
+        if self._follower is not None:
+            return
+
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    snapshot = refresh_shared_snapshot()
+                    if snapshot is not None:
+                        with self._lock:
+                            self._sections = snapshot.sections
+                        self._notify()
+                except Exception as e:
+                    logger.error(f"Error following shared index: {str(e)}")
+
+        self._follower = threading.Thread(target=poll, name="shared-index-follower", daemon=True)
+        self._follower.start()
+
+    def watch(self, interval: float = KNOWLEDGE_WATCH_INTERVAL) -> None:
+        """Reload in the background whenever a content file is added, removed or modified."""
+        if self._watcher is not None:
+            return
+
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    if self._content_mtimes() != self._mtimes:
+                        logger.info("Content files changed on disk, reloading knowledge base")
+                        self.reload()
+                except Exception as e:
+                    logger.error(f"Error watching content files: {str(e)}")
+
+        self._watcher = threading.Thread(target=poll, name="knowledge-watcher", daemon=True)
+        self._watcher.start()
@@ -1,15 +1,75 @@
 import trafilatura
 import json
 import os
+import re
+import time
+import hashlib
 import logging
-from typing import Dict, List
+import tempfile
+from typing import Dict, List, Optional
 from urllib.parse import unquote
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def scrape_linkedin_profile(url: str) -> Dict:
+# Configuration
+HTML_CACHE_DIR = os.environ.get("LINKEDIN_CACHE_DIR", "content/.cache/linkedin")   # Fetched profile pages
+HTML_CACHE_TTL = float(os.environ.get("LINKEDIN_CACHE_TTL", "86400"))              # Seconds before re-fetching
+LEGACY_QA_FILE = "linkedin_qa.json"                                                 # Single output file of earlier versions
+
+def write_atomically(path: str, text: str) -> None:
+    """
+    Replace path with text in one step, so readers never see half a file.
+
+    The temporary file gets a unique name: concurrent writers (e.g. two
+    job threads importing the same profile) each write their own.
+    """
+    f = tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(path) or '.',
+                                    prefix=os.path.basename(path) + '.', suffix='.tmp', delete=False)
+    try:
+        with f:
+            f.write(text)
+        os.replace(f.name, path)
+    except Exception:
+        try:
+            os.remove(f.name)
+        except OSError:
+            pass
+        raise
+
+def fetch_html(url: str, use_cache: bool = True) -> Optional[str]:
+    """
+    Download a page, reusing a copy fetched less than HTML_CACHE_TTL seconds ago.
+
+    Re-importing a profile then skips the network entirely.
+    """
+    path = os.path.join(HTML_CACHE_DIR, hashlib.sha256(url.encode('utf-8')).hexdigest() + ".html")
+    if use_cache:
+        try:
+            if time.time() - os.path.getmtime(path) < HTML_CACHE_TTL:
+                with open(path, 'r', encoding='utf-8') as f:
+                    logger.debug(f"Using cached page for {url}")
+                    return f.read()
+        except OSError:
+            pass
+
+    downloaded = trafilatura.fetch_url(url)
+    if downloaded is not None:
+        try:
+            os.makedirs(HTML_CACHE_DIR, exist_ok=True)
+            write_atomically(path, downloaded)
+        except OSError as e:
+            logger.warning(f"Could not cache page for {url}: {str(e)}")
+    return downloaded
+
+def profile_filename(url: str) -> str:
+    """Per-profile output file name, e.g. linkedin_jane-doe_qa.json."""
+    match = re.search(r"linkedin\.com/in/([^/?#]+)", unquote(url).lower())
+    slug = re.sub(r"[^a-z0-9_-]+", "-", match.group(1)).strip("-") if match else ""
+    return f"linkedin_{slug}_qa.json" if slug else LEGACY_QA_FILE
+
+def scrape_linkedin_profile(url: str, use_cache: bool = True) -> Dict:
     """
     Scrapes a LinkedIn profile and extracts relevant information.
     Returns a dictionary with structured profile data.
@@ -19,7 +79,7 @@ def scrape_linkedin_profile(url: str) -> Dict:
         decoded_url = unquote(url)
         logger.info(f"Attempting to scrape LinkedIn profile: {decoded_url}")
 
-        downloaded = trafilatura.fetch_url(decoded_url)
+        downloaded = fetch_html(decoded_url, use_cache=use_cache)
         if downloaded is None:
             logger.error("Could not download the LinkedIn page")
             raise ValueError("Could not download the LinkedIn page")
@@ -139,7 +199,8 @@ def convert_to_qa_format(profile_data: Dict) -> List[Dict]:
         logger.error(f"Error converting profile data to Q&A format: {str(e)}")
         return []
 
-def save_linkedin_data(url: str, output_dir: str = "content/interviews") -> bool:
+def save_linkedin_data(url: str, output_dir: str = "content/interviews",
+                       filename: str = LEGACY_QA_FILE, use_cache: bool = True) -> bool:
     """
     Scrapes LinkedIn profile and saves the Q&A data to a JSON file.
     """
@@ -149,7 +210,7 @@ def save_linkedin_data(url: str, output_dir: str = "content/interviews") -> bool
 
         # Scrape and convert the data
         logger.info("Starting LinkedIn data extraction")
-        profile_data = scrape_linkedin_profile(url)
+        profile_data = scrape_linkedin_profile(url, use_cache=use_cache)
         if not profile_data:
             logger.error("Failed to extract profile data")
             return False
@@ -159,10 +220,16 @@ def save_linkedin_data(url: str, output_dir: str = "content/interviews") -> bool
             logger.error("Failed to convert profile data to Q&A format")
             return False
 
-        # Save to JSON file
-        output_file = os.path.join(output_dir, "linkedin_qa.json")
-        with open(output_file, "w", encoding='utf-8') as f:
-            json.dump(qa_pairs, f, indent=2, ensure_ascii=False)
+        # Save to JSON file; replaced atomically so a concurrent reload never reads half of it
+        output_file = os.path.join(output_dir, filename)
+        write_atomically(output_file, json.dumps(qa_pairs, indent=2, ensure_ascii=False))
+
+        # Earlier versions wrote every import to linkedin_qa.json; once profiles have
+        # their own files it is a stale duplicate of one of them
+        legacy_file = os.path.join(output_dir, LEGACY_QA_FILE)
+        if filename != LEGACY_QA_FILE and os.path.exists(legacy_file):
+            os.remove(legacy_file)
+            logger.info(f"Removed legacy LinkedIn Q&A file {legacy_file}")
 
         logger.info(f"Successfully saved LinkedIn Q&A data to {output_file}")
         return True
@@ -0,0 +1,247 @@
+import os
+import gzip
+import json
+import time
+import zlib
+import logging
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, func, insert, select, text
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Configuration
+ROLLUPS_ENABLED = os.environ.get("LOG_ROLLUPS", "true").lower() in ("1", "true", "yes")
+# Archiving deletes rows from the database; the archive directory must be on persistent storage
+RETENTION_ENABLED = os.environ.get("LOG_MAINTENANCE", "false").lower() in ("1", "true", "yes")
+MAINTENANCE_INTERVAL = float(os.environ.get("LOG_MAINTENANCE_INTERVAL", "3600"))  # Seconds between runs
+CHAT_RETENTION_DAYS = int(os.environ.get("CHAT_RETENTION_DAYS", "90"))            # 0 keeps chats forever
+MESSAGE_RETENTION_DAYS = int(os.environ.get("MESSAGE_RETENTION_DAYS", "365"))     # 0 keeps messages forever
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", "content/archive")                    # Compressed JSONL of archived rows
+ARCHIVE_BATCH_SIZE = 1000               # Rows written and deleted per transaction
+ROLLUP_TOP_QUERIES = 10                 # Most frequent queries kept per day and user type
+ROLLUP_QUERY_CHARS = 200                # Longer queries are truncated in rollups
+
+# Only one worker process runs maintenance at a time (PostgreSQL advisory lock)
+MAINTENANCE_LOCK_KEY = zlib.crc32(b"log-maintenance")
+
+
+def _as_date(value) -> date:
+    # func.date() is a date on PostgreSQL and an ISO string on SQLite
+    if isinstance(value, datetime):
+        return value.date()
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def rollup_chats(conn, chats, rollups, since: Optional[date] = None) -> int:
+    """
+    Rebuild the rollup rows of every day from `since` on, in one transaction.
+
+    By default it starts at the latest day already rolled up (which may
+    have been partial), so each run only aggregates recent chats. Returns
+    the number of rollup rows written.
+    """
+    if since is None:
+        since = conn.execute(select(func.max(rollups.c.day))).scalar()
+        if since is None:
+            since = conn.execute(select(func.min(chats.c.created_at))).scalar()
+            if since is None:
+                return 0
+        since = _as_date(since)
+    start = datetime.combine(since, datetime.min.time())
+
+    day = func.date(chats.c.created_at)
+    counts = conn.execute(
+        select(day, chats.c.user_type, func.count())
+        .where(chats.c.created_at >= start)
+        .group_by(day, chats.c.user_type)
+    ).all()
+
+    query = func.lower(func.trim(chats.c.message))
+    top: Dict[Any, list] = defaultdict(list)
+    for row_day, user_type, message, count in conn.execute(
+        select(day, chats.c.user_type, query, func.count())
+        .where(chats.c.created_at >= start)
+        .group_by(day, chats.c.user_type, query)
+        .order_by(func.count().desc())
+    ):
+        key = (_as_date(row_day), user_type)
+        if len(top[key]) < ROLLUP_TOP_QUERIES:
+            top[key].append({"query": (message or "")[:ROLLUP_QUERY_CHARS], "count": count})
+
+    rows = [
+        {
+            "day": _as_date(row_day),
+            "user_type": user_type,
+            "chats": count,
+            "top_queries": json.dumps(top[(_as_date(row_day), user_type)]),
+            "updated_at": datetime.utcnow()
+        }
+        for row_day, user_type, count in counts
+    ]
+    conn.execute(delete(rollups).where(rollups.c.day >= since))
+    if rows:
+        conn.execute(insert(rollups), rows)
+    conn.commit()
+    return len(rows)
+
+
+def archive_rows(conn, table, cutoff: datetime, archive_dir: str = ARCHIVE_DIR,
+                 batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Move rows created before cutoff to a gzipped JSONL file, in batches.
+
+    Each batch is appended and flushed to the archive before it is deleted,
+    and deleted in its own transaction, so the table is never locked for
+    long. A crash between the two can only duplicate a batch in the
+    archive, never lose it. Returns the number of rows archived.
+    """
+    path = os.path.join(archive_dir, f"{table.name}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.jsonl.gz")
+    archived = 0
+    last_id = 0
+    archive = None
+    try:
+        while True:
+            rows = conn.execute(
+                select(table)
+                .where(table.c.created_at < cutoff, table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            if archive is None:
+                os.makedirs(archive_dir, exist_ok=True)
+                archive = gzip.open(path, 'at', encoding='utf-8')
+            archive.write("".join(json.dumps(dict(row), default=str) + "\n" for row in rows))
+            archive.flush()
+            os.fsync(archive.fileno())
+
+            ids = [row["id"] for row in rows]
+            conn.execute(delete(table).where(table.c.id.in_(ids)))
+            conn.commit()
+            last_id = ids[-1]
+            archived += len(rows)
+    finally:
+        if archive is not None:
+            archive.close()
+    if archived:
+        logger.info(f"Archived {archived} {table.name} rows created before {cutoff:%Y-%m-%d} to {path}")
+    return archived
+
+
+class LogMaintenance:
+    """
+    Keep the chat and contact message tables small.
+
+    Each run first rolls recent chats up into per-day summaries (so the
+    summaries survive archiving), then, only if retention is enabled,
+    archives chats older than chat_retention_days and messages older than
+    message_retention_days and deletes them from the database. start()
+    runs it every `interval` seconds in a background thread; run() can
+    also be called directly, e.g. from an admin job.
+    """
+
+    def __init__(self, app, db, chat_model, message_model, rollup_model,
+                 interval: float = MAINTENANCE_INTERVAL, chat_retention_days: int = CHAT_RETENTION_DAYS,
+                 message_retention_days: int = MESSAGE_RETENTION_DAYS, archive_dir: str = ARCHIVE_DIR,
+                 rollups: bool = ROLLUPS_ENABLED, retention: bool = RETENTION_ENABLED):
+        self.app = app
+        self.db = db
+        self.chats = chat_model.__table__
+        self.messages = message_model.__table__
+        self.rollups = rollup_model.__table__
+        self.interval = interval
+        self.chat_retention_days = chat_retention_days
+        self.message_retention_days = message_retention_days
+        self.archive_dir = archive_dir
+        self.rollups_enabled = rollups
+        self.retention_enabled = retention
+        self._run_lock = threading.Lock()
+        self._thread = None
+        self.runs = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.interval)
+                try:
+                    self.run()
+                except Exception:
+                    pass  # Logged by run(); try again next interval
+
+        self._thread = threading.Thread(target=loop, name="log-maintenance", daemon=True)
+        self._thread.start()
+
+    def _lock(self, conn) -> bool:
+        if conn.dialect.name != 'postgresql':
+            return True
+        acquired = conn.execute(text('SELECT pg_try_advisory_lock(:key)'), {"key": MAINTENANCE_LOCK_KEY}).scalar()
+        conn.commit()
+        return bool(acquired)
+
+    def _unlock(self, conn) -> None:
+        if conn.dialect.name == 'postgresql':
+            conn.execute(text('SELECT pg_advisory_unlock(:key)'), {"key": MAINTENANCE_LOCK_KEY})
+            conn.commit()
+
+    def run(self) -> Optional[Dict[str, Any]]:
+        """Roll up, then archive; returns what was done, or None if another run holds the lock."""
+        if not self._run_lock.acquire(blocking=False):
+            return None
+        try:
+            with self.app.app_context():
+                engine = self.db.engine
+            # One connection throughout: the advisory lock belongs to it
+            with engine.connect() as conn:
+                if not self._lock(conn):
+                    logger.info("Log maintenance already running in another process")
+                    return None
+                try:
+                    start = time.perf_counter()
+                    now = datetime.utcnow()
+                    result = {}
+                    if self.rollups_enabled:
+                        result["rollup_rows"] = rollup_chats(conn, self.chats, self.rollups)
+                    for key, table, days in (("archived_chats", self.chats, self.chat_retention_days),
+                                             ("archived_messages", self.messages, self.message_retention_days)):
+                        if self.retention_enabled and days > 0:
+                            cutoff = datetime.combine((now - timedelta(days=days)).date(), datetime.min.time())
+                            result[key] = archive_rows(conn, table, cutoff, self.archive_dir)
+                    result["seconds"] = round(time.perf_counter() - start, 3)
+                    result["finished_at"] = now.isoformat()
+                finally:
+                    self._unlock(conn)
+            self.runs += 1
+            self.last_run = result
+            self.last_error = None
+            logger.info(f"Log maintenance: {result}")
+            return result
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Error in log maintenance: {str(e)}")
+            raise
+        finally:
+            self._run_lock.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rollups_enabled": self.rollups_enabled,
+            "retention_enabled": self.retention_enabled,
+            "runs": self.runs,
+            "interval": self.interval,
+            "chat_retention_days": self.chat_retention_days,
+            "message_retention_days": self.message_retention_days,
+            "last_run": self.last_run,
+            "last_error": self.last_error
+        }
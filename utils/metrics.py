@@ -0,0 +1,299 @@
+import os
+import math
+import bisect
+import logging
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Configuration
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Seconds; covers fast cache hits up to slow completions
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base class: a named metric family with fixed label names."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """(suffix, formatted labels, value) for every sample."""
+        return []
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    """Monotonic count, e.g. requests or tokens."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [("", _format_labels(self.labelnames, key), value) for key, value in items]
+
+
+class Histogram(Metric):
+    """
+    Distribution of observations in cumulative buckets.
+
+    observe() is a bisect plus two additions under a lock, cheap enough
+    for every request.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        samples = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append(("_bucket", _format_labels(self.labelnames, key, ("le", _format_value(bound))), cumulative))
+            samples.append(("_sum", _format_labels(self.labelnames, key), total))
+            samples.append(("_count", _format_labels(self.labelnames, key), cumulative))
+        return samples
+
+
+class CallbackMetric(Metric):
+    """
+    Gauge or counter read from elsewhere at scrape time.
+
+    fn returns either a number or a {label value tuple: number} mapping,
+    so existing stats (cache hit counters, knowledge base size) are
+    exposed without touching the hot path at all.
+    """
+
+    def __init__(self, name: str, help: str, fn: Callable[[], object], type: str = "gauge",
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+        self.type = type
+
+    def samples(self):
+        try:
+            values = self.fn()
+        except Exception as e:
+            logger.error(f"Error collecting metric {self.name}: {str(e)}")
+            return []
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            return [("", "", float(values))]
+        return [("", _format_labels(self.labelnames, key if isinstance(key, tuple) else (key,)), float(value))
+                for key, value in values.items()]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            # Re-registering (e.g. a module imported twice) keeps the first instance
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name: str, help: str, fn: Callable[[], object], type: str = "gauge",
+                 labelnames: Sequence[str] = ()) -> CallbackMetric:
+        with self._lock:
+            # Callbacks are replaced, so the newest owner of the stats is reported
+            metric = self._metrics[name] = CallbackMetric(name, help, fn, type, labelnames)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Shared by the modules that make OpenAI calls
+OPENAI_REQUEST_SECONDS = REGISTRY.histogram(
+    "openai_request_duration_seconds", "OpenAI API call latency.", ["operation"]
+)
+OPENAI_TOKENS = REGISTRY.counter(
+    "openai_tokens_total", "Tokens reported in OpenAI usage fields.", ["model", "kind"]
+)
+OPENAI_ERRORS = REGISTRY.counter(
+    "openai_errors_total", "Failed OpenAI API calls.", ["operation"]
+)
+
+
+def record_openai_usage(model: str, usage) -> None:
+    """Count prompt and completion tokens from a response's usage field, if present."""
+    if not METRICS_ENABLED or usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+    completion_tokens = getattr(usage, "completion_tokens", None) or 0
+    if prompt_tokens:
+        OPENAI_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+    if completion_tokens:
+        OPENAI_TOKENS.inc(completion_tokens, model=model, kind="completion")
+
+
+@contextmanager
+def openai_call(operation: str):
+    """Time an OpenAI API call and count it as an error if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if METRICS_ENABLED:
+            OPENAI_ERRORS.inc(operation=operation)
+        raise
+    finally:
+        if METRICS_ENABLED:
+            OPENAI_REQUEST_SECONDS.observe(time.perf_counter() - start, operation=operation)
+
+
+def instrument_app(app) -> None:
+    """Record the latency of every request by endpoint, method and status."""
+    from flask import g, request
+
+    http_seconds = REGISTRY.histogram(
+        "http_request_duration_seconds", "Time to build each response (streamed bodies excluded).",
+        ["endpoint", "method", "status"]
+    )
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            http_seconds.observe(
+                time.perf_counter() - start,
+                endpoint=request.endpoint or "unmatched",
+                method=request.method,
+                status=str(response.status_code)
+            )
+        return response
+
+
+def instrument_sqlalchemy() -> None:
+    """Record query and commit durations for every engine and session."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.orm import Session
+
+    query_seconds = REGISTRY.histogram(
+        "db_query_duration_seconds", "Database statement latency.", ["operation"]
+    )
+    commit_seconds = REGISTRY.histogram(
+        "db_commit_duration_seconds", "Session commit latency, including the flush."
+    )
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_start")
+        if starts:
+            operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+            query_seconds.observe(time.perf_counter() - starts.pop(), operation=operation)
+
+    @event.listens_for(Engine, "handle_error")
+    def _failed_execute(context):
+        starts = context.connection.info.get("metrics_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    @event.listens_for(Session, "before_commit")
+    def _before_commit(session):
+        session.info["metrics_commit_start"] = time.perf_counter()
+
+    @event.listens_for(Session, "after_commit")
+    def _after_commit(session):
+        start = session.info.pop("metrics_commit_start", None)
+        if start is not None:
+            commit_seconds.observe(time.perf_counter() - start)
@@ -0,0 +1,366 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Configuration
+OPENAI_MAX_CONNECTIONS = int(os.environ.get("OPENAI_MAX_CONNECTIONS", "20"))         # Pooled connections to the API
+OPENAI_KEEPALIVE_CONNECTIONS = int(os.environ.get("OPENAI_KEEPALIVE_CONNECTIONS", "10"))  # Idle connections kept open
+OPENAI_KEEPALIVE_EXPIRY = float(os.environ.get("OPENAI_KEEPALIVE_EXPIRY", "60"))     # Seconds an idle connection is kept
+OPENAI_CONNECT_TIMEOUT = float(os.environ.get("OPENAI_CONNECT_TIMEOUT", "3"))        # Seconds to establish a connection
+OPENAI_EMBEDDING_TIMEOUT = float(os.environ.get("OPENAI_EMBEDDING_TIMEOUT", "10"))   # Budget per embeddings call, retries included
+OPENAI_COMPLETION_TIMEOUT = float(os.environ.get("OPENAI_COMPLETION_TIMEOUT", "30")) # Budget per completion call, retries included
+OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", "16"))         # API calls in flight per process
+OPENAI_ASYNC_MAX_CONCURRENCY = int(os.environ.get("OPENAI_ASYNC_MAX_CONCURRENCY", "256"))  # Same, for the async client
+OPENAI_QUEUE_TIMEOUT = float(os.environ.get("OPENAI_QUEUE_TIMEOUT", "2"))            # Seconds to wait for a free slot
+OPENAI_MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", "2"))                  # Retries after the first attempt
+OPENAI_RETRY_BASE = 0.25                # Seconds; backoff doubles per retry, with full jitter
+OPENAI_RETRY_MAX = 2.0                  # Seconds; longest single backoff
+OPENAI_BREAKER_THRESHOLD = int(os.environ.get("OPENAI_BREAKER_THRESHOLD", "5"))      # Consecutive failures that open the circuit
+OPENAI_BREAKER_COOLDOWN = float(os.environ.get("OPENAI_BREAKER_COOLDOWN", "30"))     # Seconds before a trial call is let through
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class UpstreamUnavailable(Exception):
+    """The call was not attempted: the API is considered down or we're at capacity."""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    pass
+
+
+class ConcurrencyLimitError(UpstreamUnavailable):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Fail fast while a dependency is unhealthy.
+
+    After `threshold` consecutive failures the circuit opens and calls are
+    rejected without being attempted. Once `cooldown` seconds have passed a
+    single trial call is let through (half-open): success closes the
+    circuit, failure opens it for another cooldown.
+    """
+
+    def __init__(self, threshold: int = OPENAI_BREAKER_THRESHOLD, cooldown: float = OPENAI_BREAKER_COOLDOWN,
+                 clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opens = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN and self.clock() - self._opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def available(self) -> bool:
+        """False while calls would be rejected outright."""
+        return self.state != OPEN or self.clock() - self._opened_at >= self.cooldown
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("Circuit closed: upstream recovered")
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def cancel(self) -> None:
+        """The allowed call was never made; let another trial call through."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.threshold):
+                self.state = OPEN
+                self._opened_at = self.clock()
+                self.opens += 1
+                logger.warning(f"Circuit opened after {self.failures} consecutive failures; "
+                               f"failing fast for {self.cooldown:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "rejected": self.rejected
+        }
+
+
+class ResilientOpenAI:
+    """
+    The OpenAI client the app calls through.
+
+    - One pooled HTTP client with keep-alive connections, shared by all
+      threads.
+    - Separate time budgets for embeddings and completions. A budget covers
+      every attempt and backoff, so a call never takes much longer than it.
+    - At most max_concurrency calls in flight; callers wait up to
+      queue_timeout for a slot, then fail fast instead of piling up.
+    - Connection errors, timeouts, 429 and 5xx responses are retried with
+      exponential backoff and full jitter, and count towards the circuit
+      breaker. Other API errors mean upstream is answering, so they are
+      raised as-is and count as a success.
+
+    While the breaker is open, calls raise CircuitOpenError immediately.
+    """
+
+    def __init__(self, client=None, breaker: Optional[CircuitBreaker] = None,
+                 max_concurrency: int = OPENAI_MAX_CONCURRENCY, queue_timeout: float = OPENAI_QUEUE_TIMEOUT,
+                 max_retries: int = OPENAI_MAX_RETRIES, embedding_timeout: float = OPENAI_EMBEDDING_TIMEOUT,
+                 completion_timeout: float = OPENAI_COMPLETION_TIMEOUT):
+        # Imported here: the SDK takes a noticeable part of a second to import
+        import openai
+
+        self._openai = openai
+        self.client = client if client is not None else self._create_client()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.queue_timeout = queue_timeout
+        self.embedding_timeout = embedding_timeout
+        self.completion_timeout = completion_timeout
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._calls = 0
+        self._retries = 0
+        self._failures = 0
+        self._saturated = 0
+
+    def _create_client(self):
+        openai = self._openai
+        # The Limits class of whichever httpx the installed SDK is built on
+        limits = type(openai.DEFAULT_CONNECTION_LIMITS)(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+        )
+        http_client = openai.DefaultHttpxClient(limits=limits)
+        # Retries and timeouts are handled per call below
+        return openai.OpenAI(http_client=http_client, max_retries=0,
+                             timeout=openai.Timeout(OPENAI_COMPLETION_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT))
+
+    def available(self) -> bool:
+        return self.breaker.available()
+
+    def _retryable(self, error: Exception) -> bool:
+        status = getattr(error, "status_code", None)
+        if status is not None:
+            return status in (408, 409, 429) or status >= 500
+        return isinstance(error, self._openai.APIConnectionError)
+
+    @contextmanager
+    def _slot(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError("OpenAI circuit is open")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._saturated += 1
+            self.breaker.cancel()
+            raise ConcurrencyLimitError(f"{self.max_concurrency} OpenAI calls already in flight")
+        with self._lock:
+            self._in_flight += 1
+            self._calls += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def _attempt(self, create: Callable[..., Any], budget: float, **kwargs) -> Any:
+        """Call create with retries, within budget seconds; records the outcome on the breaker."""
+        deadline = time.monotonic() + budget
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            timeout = self._openai.Timeout(max(remaining, 0.1), connect=min(OPENAI_CONNECT_TIMEOUT, max(remaining, 0.1)))
+            try:
+                response = create(timeout=timeout, **kwargs)
+            except Exception as e:
+                if not self._retryable(e):
+                    self.breaker.record_success()
+                    raise
+                backoff = random.uniform(0, min(OPENAI_RETRY_MAX, OPENAI_RETRY_BASE * 2 ** attempt))
+                if attempt >= self.max_retries or time.monotonic() + backoff >= deadline:
+                    self._failures += 1
+                    self.breaker.record_failure()
+                    raise
+                attempt += 1
+                self._retries += 1
+                logger.warning(f"OpenAI call failed ({type(e).__name__}), retry {attempt} in {backoff:.2f}s")
+                time.sleep(backoff)
+                continue
+            self.breaker.record_success()
+            return response
+
+    def embeddings(self, **kwargs) -> Any:
+        with self._slot():
+            return self._attempt(self.client.embeddings.create, self.embedding_timeout, **kwargs)
+
+    def chat(self, **kwargs) -> Any:
+        with self._slot():
+            return self._attempt(self.client.chat.completions.create, self.completion_timeout, **kwargs)
+
+    def chat_stream(self, **kwargs) -> Iterator[Any]:
+        """
+        Stream completion chunks.
+
+        Only opening the stream is retried; a failure mid-stream is raised
+        (and counted) since part of the answer was already delivered. The
+        slot is held until the stream is consumed or closed.
+        """
+        with self._slot():
+            stream = self._attempt(self.client.chat.completions.create, self.completion_timeout,
+                                   stream=True, **kwargs)
+            try:
+                for chunk in stream:
+                    yield chunk
+            except Exception as e:
+                if self._retryable(e):
+                    self._failures += 1
+                    self.breaker.record_failure()
+                raise
+            finally:
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "calls": self._calls,
+            "retries": self._retries,
+            "failures": self._failures,
+            "saturated": self._saturated
+        }
+        stats.update(self.breaker.stats())
+        return stats
+
+
+class AsyncResilientOpenAI(ResilientOpenAI):
+    """
+    ResilientOpenAI for asyncio code, built on AsyncOpenAI.
+
+    Same budgets, retries and stats, but waiting (for a slot, a backoff or
+    the API) suspends the coroutine instead of blocking a thread, so one
+    event loop can keep hundreds of calls in flight. Pass the sync client's
+    breaker to share its view of upstream health.
+
+    The underlying HTTP client belongs to the event loop it is first used
+    on; use one instance per loop.
+    """
+
+    def __init__(self, client=None, breaker: Optional[CircuitBreaker] = None,
+                 max_concurrency: int = OPENAI_ASYNC_MAX_CONCURRENCY, **kwargs):
+        super().__init__(client=client, breaker=breaker, max_concurrency=max_concurrency, **kwargs)
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    def _create_client(self):
+        openai = self._openai
+        limits = type(openai.DEFAULT_CONNECTION_LIMITS)(
+            max_connections=max(OPENAI_MAX_CONNECTIONS, OPENAI_ASYNC_MAX_CONCURRENCY),
+            max_keepalive_connections=OPENAI_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+        )
+        http_client = openai.DefaultAsyncHttpxClient(limits=limits)
+        return openai.AsyncOpenAI(http_client=http_client, max_retries=0,
+                                  timeout=openai.Timeout(OPENAI_COMPLETION_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT))
+
+    @asynccontextmanager
+    async def _slot(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError("OpenAI circuit is open")
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._saturated += 1
+            self.breaker.cancel()
+            raise ConcurrencyLimitError(f"{self.max_concurrency} OpenAI calls already in flight")
+        self._in_flight += 1
+        self._calls += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    async def _attempt(self, create: Callable[..., Any], budget: float, **kwargs) -> Any:
+        deadline = time.monotonic() + budget
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            timeout = self._openai.Timeout(max(remaining, 0.1), connect=min(OPENAI_CONNECT_TIMEOUT, max(remaining, 0.1)))
+            try:
+                response = await create(timeout=timeout, **kwargs)
+            except Exception as e:
+                if not self._retryable(e):
+                    self.breaker.record_success()
+                    raise
+                backoff = random.uniform(0, min(OPENAI_RETRY_MAX, OPENAI_RETRY_BASE * 2 ** attempt))
+                if attempt >= self.max_retries or time.monotonic() + backoff >= deadline:
+                    self._failures += 1
+                    self.breaker.record_failure()
+                    raise
+                attempt += 1
+                self._retries += 1
+                logger.warning(f"OpenAI call failed ({type(e).__name__}), retry {attempt} in {backoff:.2f}s")
+                await asyncio.sleep(backoff)
+                continue
+            self.breaker.record_success()
+            return response
+
+    async def embeddings(self, **kwargs) -> Any:
+        async with self._slot():
+            return await self._attempt(self.client.embeddings.create, self.embedding_timeout, **kwargs)
+
+    async def chat(self, **kwargs) -> Any:
+        async with self._slot():
+            return await self._attempt(self.client.chat.completions.create, self.completion_timeout, **kwargs)
+
+    async def chat_stream(self, **kwargs) -> AsyncIterator[Any]:
+        """Stream completion chunks; see ResilientOpenAI.chat_stream."""
+        async with self._slot():
+            stream = await self._attempt(self.client.chat.completions.create, self.completion_timeout,
+                                         stream=True, **kwargs)
+            try:
+                async for chunk in stream:
+                    yield chunk
+            except Exception as e:
+                if self._retryable(e):
+                    self._failures += 1
+                    self.breaker.record_failure()
+                raise
+            finally:
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    await close()
@@ -1,71 +1,233 @@
 import PyPDF2
 import io
+import os
+import hashlib
 import logging
-from typing import Dict
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+from typing import Dict, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Configuration
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))   # Extraction processes
+PDF_PAGES_PER_TASK = int(os.environ.get("PDF_PAGES_PER_TASK", "8"))                  # Pages extracted per task
+PDF_CACHE_DIR = os.environ.get("PDF_CACHE_DIR", "content/.cache/pdf")                 # Extracted text per page
+
+
+def _hash_object(digest, obj, seen: set) -> None:
+    """Feed a PDF object and everything it references into digest, each indirect object once."""
+    if isinstance(obj, IndirectObject):
+        ref = (obj.idnum, obj.generation)
+        digest.update(f"R{ref}".encode('utf-8'))
+        if ref in seen:
+            return
+        seen.add(ref)
+        obj = obj.get_object()
+    if isinstance(obj, DictionaryObject):
+        digest.update(b"<<")
+        for key in sorted(obj.keys()):
+            digest.update(str(key).encode('utf-8'))
+            _hash_object(digest, obj.raw_get(key), seen)
+        digest.update(b">>")
+        # Image data can't change extracted text; form XObjects, ToUnicode maps and fonts can
+        if isinstance(obj, StreamObject) and obj.get("/Subtype") != "/Image":
+            try:
+                digest.update(obj.get_data())
+            except Exception:
+                digest.update(obj._data or b"")
+    elif isinstance(obj, ArrayObject):
+        digest.update(b"[")
+        for item in list.__iter__(obj):
+            _hash_object(digest, item, seen)
+        digest.update(b"]")
+    else:
+        digest.update(repr(obj).encode('utf-8'))
+
+
+def _page_key(page) -> str:
+    """
+    Hash of what a page's text depends on: its content stream and its whole
+    resource tree (fonts with their encodings and ToUnicode maps, form
+    XObjects and their own resources).
+    """
+    digest = hashlib.sha256()
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+    _hash_object(digest, page.raw_get("/Resources") if "/Resources" in page else None, set())
+    return digest.hexdigest()
+
+
+def _quiet_worker() -> None:
+    """Pool initializer: no logging in forked workers (they may run PyPDF2's warnings too)."""
+    logging.disable(logging.CRITICAL)
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int,
+                        cache_dir: Optional[str] = PDF_CACHE_DIR) -> Tuple[List[Tuple[int, str]], List[str]]:
+    """
+    Extract the text of pages [start, stop), reusing cached text for unchanged pages.
+
+    Returns the pages and any problems, which the caller logs: this runs
+    in forked workers, where logging is off.
+    """
+    reader = PyPDF2.PdfReader(pdf_path)
+    pages = []
+    problems = []
+    for number in range(start, stop):
+        page = reader.pages[number]
+        path = None
+        if cache_dir:
+            path = os.path.join(cache_dir, _page_key(page) + ".txt")
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    pages.append((number, f.read()))
+                continue
+            except OSError:
+                pass
+
+        text = page.extract_text() or ""
+        pages.append((number, text))
+        if path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                problems.append(f"Could not cache page text: {str(e)}")
+    return pages, problems
+
+
+def _log_problems(problems: List[str]) -> None:
+    for problem in problems:
+        logger.warning(problem)
+
+
+def iter_pdf_pages(pdf_path: str, workers: int = PDF_WORKERS, pages_per_task: int = PDF_PAGES_PER_TASK,
+                   cache_dir: Optional[str] = PDF_CACHE_DIR) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page number, text) for every page, in order.
+
+    Page ranges are extracted in parallel by a process pool (text
+    extraction is CPU-bound), with at most two tasks per worker in flight,
+    so only a bounded window of pages is held in memory however long the
+    document is. Small documents are extracted in this process.
+    """
+    total = len(PyPDF2.PdfReader(pdf_path).pages)
+    ranges = [(start, min(start + pages_per_task, total)) for start in range(0, total, pages_per_task)]
+    if workers <= 1 or len(ranges) <= 1:
+        for start, stop in ranges:
+            pages, problems = _extract_page_range(pdf_path, start, stop, cache_dir)
+            _log_problems(problems)
+            yield from pages
+        return
+
+    # fork where available: spawn and forkserver re-import the server's main
+    # module (and so the whole app) in every worker. A forked child only runs
+    # PyPDF2 and file I/O, and never logs: another server thread may have
+    # held a logging lock at fork time
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=context,
+                             initializer=_quiet_worker) as pool:
+        pending = []
+        remaining = iter(ranges)
+        for start, stop in remaining:
+            pending.append(pool.submit(_extract_page_range, pdf_path, start, stop, cache_dir))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            pages, problems = pending.pop(0).result()
+            _log_problems(problems)
+            next_range = next(remaining, None)
+            if next_range is not None:
+                pending.append(pool.submit(_extract_page_range, pdf_path, *next_range, cache_dir))
+            yield from pages
+
+
+def write_pdf_markdown(pdf_path: str, output_path: str, title: Optional[str] = None) -> int:
+    """
+    Stream a PDF's text into a markdown file, one '## Page N' section per page.
+
+    The file is chunked like any other knowledge file. It is written page
+    by page and swapped in atomically. Returns the number of pages.
+    """
+    title = title or os.path.splitext(os.path.basename(pdf_path))[0]
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    pages = 0
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(f"# {title}\n\n")
+        for number, text in iter_pdf_pages(pdf_path):
+            f.write(f"## Page {number + 1}\n\n")
+            for line in text.split('\n'):
+                # Keep document text from being read as section headers
+                f.write(("\\" + line if line.lstrip().startswith('#') else line) + "\n")
+            f.write("\n")
+            pages += 1
+    os.replace(tmp_path, output_path)
+    logger.info(f"Ingested {pages} pages from {pdf_path} into {output_path}")
+    return pages
+
+
 def extract_pdf_content(pdf_path: str) -> Dict:
     """Extract content from PDF and organize it into sections."""
     try:
-        with open(pdf_path, 'rb') as file:
-            # Create a PDF reader object
-            pdf_reader = PyPDF2.PdfReader(file)
+        # Extract text from all pages (in parallel for long documents)
+        content = "".join(text for _, text in iter_pdf_pages(pdf_path))
+
+        # Split content into sections
+        sections = {
+            "summary": "",
+            "experience": [],
+            "education": [],
+            "skills": []
+        }
+
+        # Parse content into sections
+        current_section = None
+        current_content = []
+        
+        for line in content.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
             
-            # Extract text from all pages
-            content = ""
-            for page in pdf_reader.pages:
-                content += page.extract_text()
-
-            # Split content into sections
-            sections = {
-                "summary": "",
-                "experience": [],
-                "education": [],
-                "skills": []
-            }
-
-            # Parse content into sections
-            current_section = None
-            current_content = []
+            lower_line = line.lower()
             
-            for line in content.split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                
-                lower_line = line.lower()
-                
-                # Detect sections
-                if "summary" in lower_line or "profile" in lower_line:
-                    if current_section and current_content:
-                        sections[current_section] = "\n".join(current_content)
-                    current_section = "summary"
-                    current_content = []
-                elif "experience" in lower_line or "employment" in lower_line:
-                    if current_section and current_content:
-                        sections[current_section] = "\n".join(current_content)
-                    current_section = "experience"
-                    current_content = []
-                elif "education" in lower_line:
-                    if current_section and current_content:
-                        sections[current_section] = "\n".join(current_content)
-                    current_section = "education"
-                    current_content = []
-                elif "skills" in lower_line or "competencies" in lower_line:
-                    if current_section and current_content:
-                        sections[current_section] = "\n".join(current_content)
-                    current_section = "skills"
-                    current_content = []
-                elif current_section:
-                    current_content.append(line)
-
-            # Add the last section
-            if current_section and current_content:
-                sections[current_section] = "\n".join(current_content)
-
-            logger.info("Successfully extracted content from PDF")
-            return sections
+            # Detect sections
+            if "summary" in lower_line or "profile" in lower_line:
+                if current_section and current_content:
+                    sections[current_section] = "\n".join(current_content)
+                current_section = "summary"
+                current_content = []
+            elif "experience" in lower_line or "employment" in lower_line:
+                if current_section and current_content:
+                    sections[current_section] = "\n".join(current_content)
+                current_section = "experience"
+                current_content = []
+            elif "education" in lower_line:
+                if current_section and current_content:
+                    sections[current_section] = "\n".join(current_content)
+                current_section = "education"
+                current_content = []
+            elif "skills" in lower_line or "competencies" in lower_line:
+                if current_section and current_content:
+                    sections[current_section] = "\n".join(current_content)
+                current_section = "skills"
+                current_content = []
+            elif current_section:
+                current_content.append(line)
+
+        # Add the last section
+        if current_section and current_content:
+            sections[current_section] = "\n".join(current_content)
+
+        logger.info("Successfully extracted content from PDF")
+        return sections
 
     except Exception as e:
         logger.error(f"Error extracting PDF content: {str(e)}")
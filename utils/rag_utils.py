@@ -1,16 +1,97 @@
 import os
 import logging
-from typing import List, Dict, Any
-from openai import OpenAI
+import time
+import hashlib
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, AsyncIterator, Callable, Iterator, Optional, Set, Tuple
 import numpy as np
+from utils.embedding_store import EmbeddingStore, embedding_key
+from utils.retrieval import RetrievalIndex, KnowledgeSnapshot, section_text
+from utils.shared_index import SharedIndexDirectory
+from utils.bm25 import BM25Index
+from utils.chunker import chunk_file
+from utils.embedding_cache import QueryEmbeddingCache, SingleFlight
+from utils.metrics import openai_call, record_openai_usage
+from utils.openai_client import ResilientOpenAI, AsyncResilientOpenAI
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-client = OpenAI()
+_client = None
+_client_lock = threading.Lock()
 
-def load_content_from_file(file_path: str = "content/knowledge_base.md") -> List[Dict[str, str]]:
+def get_client() -> ResilientOpenAI:
+    """
+    The OpenAI client (pooled, with retries and a circuit breaker), created on first use.
+
+    Importing and constructing it takes a noticeable part of a second, so
+    it is kept off the application's import path.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ResilientOpenAI()
+    return _client
+
+_async_client = None
+
+def get_async_client() -> AsyncResilientOpenAI:
+    """
+    The async OpenAI client, for the event loop of the async server.
+
+    It shares the sync client's circuit breaker, so both serving modes
+    agree on whether OpenAI is up.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncResilientOpenAI(breaker=get_client().breaker)
+    return _async_client
+
+def openai_available() -> bool:
+    """False while the circuit breaker is failing OpenAI calls fast."""
+    return _client is None or _client.available()
+
+def get_openai_stats() -> Dict[str, Any]:
+    """Stats of the sync client, with the async client's call counts added in."""
+    if _client is None:
+        return {}
+    stats = _client.stats()
+    if _async_client is not None:
+        async_stats = _async_client.stats()
+        for key in ("in_flight", "max_concurrency", "calls", "retries", "failures", "saturated"):
+            stats[key] += async_stats[key]
+    return stats
+
+# Configuration
+EMBEDDING_MODEL = "text-embedding-ada-002"  # 8K token limit per input
+COMPLETION_MODEL = "gpt-3.5-turbo"         # 16K token context window
+SIMILARITY_THRESHOLD = 0.7                  # Minimum similarity score to consider a section relevant
+TOP_K = int(os.environ.get("RAG_TOP_K", "3"))   # Number of chunks returned as context
+INTERVIEWS_DIR = "content/interviews"       # Q&A JSON files added to the knowledge base
+DOCUMENTS_DIR = "content/documents"         # Ingested documents (e.g. PDFs) as markdown
+SHARED_INDEX_DIR = os.environ.get("SHARED_INDEX_DIR", "")  # Publish/map the index here to share it across workers
+CHAT_ERROR_RESPONSE = "I apologize, but I encountered an error processing your question."
+DEGRADED_RESPONSE_INTRO = ("I can't put together a full answer right now, "
+                           "but here is the most relevant part of my profile:")
+DEGRADED_EXCERPT_CHARS = 600                # Context shown in a degraded answer
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid")  # "hybrid" (BM25 + vectors) or "vector"
+HYBRID_ALPHA = 0.7                          # Weight of vector similarity in hybrid scores
+LEXICAL_RELEVANCE = 0.5                     # Min scaled BM25 score to consider a section relevant
+LEXICAL_FAST_PATH_MIN_TERMS = int(os.environ.get("LEXICAL_FAST_PATH_MIN_TERMS", "2"))    # Query terms needed to skip embeddings
+LEXICAL_FAST_PATH_MARGIN = float(os.environ.get("LEXICAL_FAST_PATH_MARGIN", "1.5"))    # Lead over the runner-up BM25 score
+EMBEDDING_BATCH_SIZE = 64                   # Inputs per embeddings API call
+EMBEDDING_CONCURRENCY = 4                   # Embedding batches in flight at once
+WARMUP_RETRY_BASE = 5.0                     # Seconds before retrying an incomplete index build; doubles per retry
+WARMUP_RETRY_MAX = 300.0                    # Seconds; longest wait between index build retries
+WARMUP_MAX_ATTEMPTS = int(os.environ.get("WARMUP_MAX_ATTEMPTS", "10"))  # Index build retries before serving a partial index
+
+def load_content_from_file(file_path: str = "content/knowledge_base.md", warm: bool = True,
+                           interviews_dir: Optional[str] = INTERVIEWS_DIR,
+                           documents_dir: Optional[str] = DOCUMENTS_DIR) -> List[Dict[str, Any]]:
     """
     Load and chunk content from a text file with improved sectioning.
 
@@ -23,53 +104,47 @@ def load_content_from_file(file_path: str = "content/knowledge_base.md") -> List
     - etc.
 
     Each section should be self-contained but maintain cross-referencing ability.
+    '#'/'##' headers delimit sections, which are then packed into chunks of
+    about CHUNK_TOKENS tokens with CHUNK_OVERLAP tokens of overlap (see
+    utils/chunker.py). Every chunk keeps its header path as "title" and
+    the enclosing headers as "parents".
+
+    file_path may be a .md, .txt or .json Q&A file. The Q&A files in
+    interviews_dir (e.g. linkedin_qa.json) are added as one chunk per pair,
+    and the .md/.txt files in documents_dir (ingested PDFs) are chunked
+    like the main file.
+
+    With warm=True the retrieval index for the returned sections is built in a
+    background thread, so no user request pays for embedding them.
     """
     try:
         if not os.path.exists(file_path):
             logger.error(f"File not found: {file_path}")
             return []
 
-        with open(file_path, 'r') as file:
-            content = file.read()
-
-        # Split content into sections based on headers and subheaders
-        sections = []
-        current_section = {"title": "", "content": []}
-        current_subsection = []
-
-        for line in content.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-
-            # Major section headers (lines starting with #)
-            if line.startswith('# '):
-                if current_section["title"] and current_section["content"]:
-                    sections.append({
-                        "title": current_section["title"],
-                        "content": " ".join(current_section["content"])
-                    })
-                current_section = {"title": line[2:].strip(), "content": []}
-
-            # Subsection headers (lines starting with ##)
-            elif line.startswith('## '):
-                if current_subsection:
-                    current_section["content"].extend(current_subsection)
-                    current_subsection = []
-                current_section["content"].append(line)
-
-            # Regular content
-            else:
-                current_section["content"].append(line)
-
-        # Add the last section
-        if current_section["title"] and current_section["content"]:
-            sections.append({
-                "title": current_section["title"],
-                "content": " ".join(current_section["content"])
-            })
+        sections = chunk_file(file_path)
+
+        if interviews_dir and os.path.isdir(interviews_dir):
+            for name in sorted(os.listdir(interviews_dir)):
+                if name.endswith('.json'):
+                    qa_path = os.path.join(interviews_dir, name)
+                    try:
+                        sections.extend(chunk_file(qa_path))
+                    except Exception as e:
+                        logger.error(f"Error loading Q&A file {qa_path}: {str(e)}")
+
+        if documents_dir and os.path.isdir(documents_dir):
+            for name in sorted(os.listdir(documents_dir)):
+                if name.endswith(('.md', '.txt')):
+                    document_path = os.path.join(documents_dir, name)
+                    try:
+                        sections.extend(chunk_file(document_path))
+                    except Exception as e:
+                        logger.error(f"Error loading document {document_path}: {str(e)}")
 
         logger.info(f"Loaded {len(sections)} sections from {file_path}")
+        if warm and sections:
+            start_index_warmup(sections)
         return sections
 
     except Exception as e:
@@ -86,28 +161,71 @@ def get_embedding(text: str) -> List[float]:
     - Cost is very low ($0.0001 per 1K tokens)
     """
     try:
-        response = client.embeddings.create(
-            model="text-embedding-ada-002",
-            input=text
-        )
+        with openai_call("embedding"):
+            response = get_client().embeddings(
+                model=EMBEDDING_MODEL,
+                input=text
+            )
+        record_openai_usage(EMBEDDING_MODEL, getattr(response, "usage", None))
         return response.data[0].embedding
     except Exception as e:
         logger.error(f"Error getting embedding: {str(e)}")
         return []
 
-def cosine_similarity(a: List[float], b: List[float]) -> float:
-    """Calculate cosine similarity between two vectors."""
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+async def get_embedding_async(text: str) -> List[float]:
+    """get_embedding for coroutines."""
+    try:
+        with openai_call("embedding"):
+            response = await get_async_client().embeddings(
+                model=EMBEDDING_MODEL,
+                input=text
+            )
+        record_openai_usage(EMBEDDING_MODEL, getattr(response, "usage", None))
+        return response.data[0].embedding
+    except Exception as e:
+        logger.error(f"Error getting embedding: {str(e)}")
+        return []
+
+def embed_batch(texts: List[str]) -> List[List[float]]:
+    """
+    Get embeddings for several texts with a single API call.
+
+    The embeddings endpoint accepts a list input and returns one item per
+    input, tagged with its position, so a batch costs one round trip.
+    Errors are raised; see get_embeddings.
+    """
+    with openai_call("embedding_batch"):
+        response = get_client().embeddings(
+            model=EMBEDDING_MODEL,
+            input=texts
+        )
+    record_openai_usage(EMBEDDING_MODEL, getattr(response, "usage", None))
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+def get_embeddings(texts: List[str]) -> List[List[float]]:
+    """embed_batch, returning [] if the call failed."""
+    try:
+        return embed_batch(texts)
+    except Exception as e:
+        logger.error(f"Error getting batch embeddings: {str(e)}")
+        return []
+
+def is_bad_input(error: Exception) -> bool:
+    """True if the API rejected the request itself, so sending it again would fail again."""
+    return getattr(error, "status_code", None) in (400, 413, 422)
 
-def find_relevant_context(query: str, sections: List[Dict[str, str]], top_k: int = 1) -> str:
+def find_relevant_context(query: str, sections: List[Dict[str, str]], top_k: int = TOP_K,
+                          query_embedding: Optional[List[float]] = None) -> str:
     """
     Find the most relevant sections for a given query.
 
     Process:
-    1. Convert query to embedding vector
-    2. Convert each section to embedding vector
-    3. Find sections with highest cosine similarity to query
-    4. Return concatenated text of top-k most relevant sections
+    1. Build (once per loaded knowledge base) a retrieval index holding the
+       normalized embedding of every section
+    2. Convert query to embedding vector
+       (callers that already embedded the query can pass query_embedding)
+    3. Score all sections with one matrix-vector product
+    4. Return concatenated text of the top-k sections above SIMILARITY_THRESHOLD
 
     The returned context + query + system prompt should fit in model's context window:
     - GPT-3.5-turbo: 16K tokens
@@ -123,44 +241,406 @@ def find_relevant_context(query: str, sections: List[Dict[str, str]], top_k: int
             logger.warning("No sections available for context retrieval")
             return ""
 
-        # Get query embedding
-        query_embedding = get_embedding(query)  # Don't cache query embeddings
-        if not query_embedding:
+        # Sections and indexes all come from one snapshot, even mid-reload
+        snapshot = get_snapshot(sections)
+        if snapshot is None or not len(snapshot):
             return ""
-
-        # Get embeddings for all sections
-        section_embeddings = []
-        for section in sections:
-            # Combine title and content for embedding
-            section_text = f"{section['title']}: {section['content']}"
-            embedding = get_cached_embedding(section_text)
-            if embedding:
-                section_embeddings.append({
-                    "text": section_text,
-                    "embedding": embedding
-                })
-
-        # Calculate similarities and get top-k sections
-        similarities = [
-            (cosine_similarity(query_embedding, section["embedding"]), section["text"])
-            for section in section_embeddings
-        ]
-        similarities.sort(reverse=True)
-
-        # Return concatenated top-k sections
-        relevant_sections = [text for _, text in similarities[:top_k]]
-        return "\n".join(relevant_sections)
+        sections = snapshot.sections
+        lexical = snapshot.lexical if RETRIEVAL_MODE == "hybrid" else None
+        index = snapshot.dense
+
+        # Lexical fast path: a clear keyword match needs no embedding call
+        if lexical is not None and query_embedding is None:
+            context = lexical_context(query, sections, top_k)
+            if context is not None:
+                return context
+
+        if query_embedding is None and index is not None and len(index):
+            query_embedding = get_query_embedding(query)
+
+        # Embeddings unavailable: keep answering from the lexical index
+        if index is None or not len(index) or query_embedding is None or not len(query_embedding):
+            if lexical is None:
+                return ""
+            logger.warning("Vector retrieval unavailable, falling back to lexical retrieval")
+            results = lexical.search(query, top_k=top_k)
+            return "\n".join(section_text(sections[row]) for _, row in results)
+
+        if lexical is None:
+            results = index.search(query_embedding, top_k=top_k, threshold=SIMILARITY_THRESHOLD)
+            if not results:
+                logger.info(f"No section scored above {SIMILARITY_THRESHOLD} for query")
+
+            # Return concatenated top-k sections
+            return "\n".join(index.texts[row] for _, row in results)
+
+        rows = hybrid_search(query, query_embedding, index, lexical, top_k)
+        if not rows:
+            logger.info(f"No section scored above {SIMILARITY_THRESHOLD} for query")
+        return "\n".join(section_text(sections[row]) for row in rows)
 
     except Exception as e:
         logger.error(f"Error finding relevant context: {str(e)}")
         return ""
 
-def get_chat_response(query: str, context: str) -> str:
+def hybrid_search(query: str, query_embedding: List[float], index: RetrievalIndex,
+                  lexical: BM25Index, top_k: int) -> List[int]:
     """
-    Get chat completion using the relevant context.
+    Rank sections by a weighted sum of cosine similarity and BM25 score.
+
+    BM25 scores are scaled by the best score for the query so both signals
+    fall in comparable ranges. A section qualifies if either its cosine
+    similarity reaches SIMILARITY_THRESHOLD or its scaled lexical score
+    reaches LEXICAL_RELEVANCE. Returns section positions, best first.
     """
-    try:
-        system_prompt = """You are Ignacio Garcia (Nacho), an accomplished Service Manager and IT Leader with 20+ years of experience.
+    dense = np.zeros(len(lexical), dtype=np.float32)
+    dense[index.positions] = index.scores(query_embedding)
+
+    sparse = lexical.scores(query)
+    best = sparse.max() if len(sparse) else 0.0
+    if best > 0:
+        sparse = sparse / best
+
+    fused = HYBRID_ALPHA * dense + (1.0 - HYBRID_ALPHA) * sparse
+    fused[(dense < SIMILARITY_THRESHOLD) & (sparse < LEXICAL_RELEVANCE)] = -np.inf
+
+    k = min(top_k, len(fused))
+    if k <= 0:
+        return []
+    if k < len(fused):
+        top = np.argpartition(-fused, k - 1)[:k]
+    else:
+        top = np.arange(len(fused))
+    top = top[np.argsort(-fused[top])]
+    return [int(row) for row in top if np.isfinite(fused[row])]
+
+def lexical_context(query: str, sections: List[Dict[str, str]], top_k: int = TOP_K) -> Optional[str]:
+    """
+    Return context from BM25 alone when the lexical match is confident, else None.
+
+    Confident means the best section contains every query term (and there
+    are at least LEXICAL_FAST_PATH_MIN_TERMS of them), and its BM25 score
+    beats the runner-up by a factor of LEXICAL_FAST_PATH_MARGIN.
+    """
+    if RETRIEVAL_MODE != "hybrid" or not sections:
+        return None
+    snapshot = get_snapshot(sections)
+    if snapshot is None or snapshot.lexical is None:
+        return None
+    sections = snapshot.sections
+    lexical = snapshot.lexical
+    results = lexical.search(query, top_k=max(top_k, 2))
+    if not results:
+        return None
+    if len(results) > 1 and results[0][0] < LEXICAL_FAST_PATH_MARGIN * results[1][0]:
+        return None
+    found, terms = lexical.coverage(query, results[0][1])
+    if terms < LEXICAL_FAST_PATH_MIN_TERMS or found < terms:
+        return None
+    logger.debug(f"Lexical fast path (BM25 score {results[0][0]:.2f})")
+    return "\n".join(section_text(sections[row]) for _, row in results[:top_k])
+
+def embed_missing_sections(texts: List[str]) -> int:
+    """
+    Embed every text that is not in the embedding store yet.
+
+    Texts are sent EMBEDDING_BATCH_SIZE at a time, with at most
+    EMBEDDING_CONCURRENCY batches in flight. Returns the number of new
+    embeddings buffered in the store.
+
+    A batch the API rejects as a bad request is resent one text at a
+    time, so one bad input (e.g. too long) doesn't hold back the rest;
+    texts rejected on their own are not sent again by this process.
+    """
+    missing = list(dict.fromkeys(text for text in texts if is_embeddable_missing(text)))
+    if not missing:
+        return 0
+
+    def attempt(batch: List[str]) -> Tuple[List[List[float]], Optional[Exception]]:
+        try:
+            return embed_batch(batch), None
+        except Exception as e:
+            return [], e
+
+    batches = [missing[i:i + EMBEDDING_BATCH_SIZE] for i in range(0, len(missing), EMBEDDING_BATCH_SIZE)]
+    embedded = 0
+    with ThreadPoolExecutor(max_workers=EMBEDDING_CONCURRENCY) as pool:
+        for batch, (vectors, error) in zip(batches, pool.map(attempt, batches)):
+            if error is not None and is_bad_input(error) and len(batch) > 1:
+                results = list(pool.map(attempt, [[text] for text in batch]))
+                vectors = [single[0] if single else None for single, _ in results]
+                errors = [single_error for _, single_error in results]
+            elif error is not None:
+                vectors, errors = [None] * len(batch), [error] * len(batch)
+            else:
+                errors = [None] * len(batch)
+
+            for text, vector, text_error in zip(batch, vectors, errors):
+                if vector is not None:
+                    _embedding_store.put(embedding_key(EMBEDDING_MODEL, text), vector)
+                    embedded += 1
+                elif text_error is not None and is_bad_input(text_error):
+                    # Rejected when sent alone: it would fail the same way every time
+                    _unembeddable.add(embedding_key(EMBEDDING_MODEL, text))
+            failed = sum(1 for vector in vectors if vector is None)
+            if failed:
+                logger.error(f"Embedding {failed} of {len(batch)} sections failed: {str(error)}")
+
+    logger.info(f"Embedded {embedded} new sections in {len(batches)} batches")
+    return embedded
+
+def is_embeddable_missing(text: str) -> bool:
+    """True if text has no stored embedding and the API hasn't rejected it as a bad request."""
+    key = embedding_key(EMBEDDING_MODEL, text)
+    return key not in _embedding_store and key not in _unembeddable
+
+def build_retrieval_index(sections: List[Dict[str, str]]) -> Optional[RetrievalIndex]:
+    """Embed new or changed sections in batches and build a retrieval index."""
+    # Pick up embeddings published by other workers
+    _embedding_store.refresh()
+
+    all_texts = [section_text(section) for section in sections]
+    embed_missing_sections(all_texts)
+
+    # Publish newly computed embeddings and drop the ones no section uses,
+    # including after sections were only removed and nothing new was embedded
+    section_keys = [embedding_key(EMBEDDING_MODEL, text) for text in all_texts]
+    if _embedding_store.has_pending or _embedding_store.published_keys() != set(section_keys):
+        _embedding_store.flush(keep=section_keys)
+
+    texts = []
+    embeddings = []
+    positions = []
+    for position, (text, key) in enumerate(zip(all_texts, section_keys)):
+        embedding = _embedding_store.get(key)
+        if embedding is not None:
+            texts.append(text)
+            embeddings.append(embedding)
+            positions.append(position)
+
+    if not embeddings:
+        return None
+    return RetrievalIndex(texts, np.vstack(embeddings), positions)
+
+def section_keys(sections: List[Dict[str, Any]]) -> List[str]:
+    """Content hashes identifying each section's text."""
+    return [embedding_key(EMBEDDING_MODEL, section_text(section)) for section in sections]
+
+def knowledge_version(sections: List[Dict[str, Any]]) -> str:
+    """Hash of the whole knowledge base; equal content gives an equal version."""
+    return hashlib.sha256("\n".join(section_keys(sections)).encode("utf-8")).hexdigest()[:16]
+
+def diff_sections(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Count sections added, removed and unchanged between two loads, by content hash."""
+    old_keys = set(section_keys(old))
+    new_keys = set(section_keys(new))
+    return {
+        "added": len(new_keys - old_keys),
+        "removed": len(old_keys - new_keys),
+        "unchanged": len(new_keys & old_keys),
+    }
+
+def build_snapshot(sections: List[Dict[str, Any]], dense: bool = True) -> KnowledgeSnapshot:
+    """Build the lexical index and (unless dense=False) the vector index for sections."""
+    lexical = BM25Index([section_text(section) for section in sections])
+    index = build_retrieval_index(sections) if dense else None
+    return KnowledgeSnapshot(sections, knowledge_version(sections), lexical, index)
+
+def build_shared_snapshot(sections: List[Dict[str, Any]]) -> KnowledgeSnapshot:
+    """
+    Return the published snapshot for sections, building and publishing it if needed.
+
+    Only one worker builds at a time; workers that were waiting on the
+    builder lock usually find the version already published and just map it.
+    """
+    version = knowledge_version(sections)
+    with _shared_index.builder_lock():
+        current = _shared_index.current()
+        if current is None or current["version"] != version:
+            snapshot = build_snapshot(sections)
+            # Publish only complete indexes, so a partial one is retried next time
+            if snapshot.dense is None or len(snapshot.dense) != len(sections):
+                return snapshot
+            current = _shared_index.publish(snapshot)
+        snapshot = _shared_index.load(current)
+
+    # Same content: keep the caller's list so identity lookups in get_snapshot match
+    if snapshot is not None and snapshot.version == version:
+        snapshot.sections = sections
+    return snapshot
+
+def refresh_shared_snapshot() -> Optional[KnowledgeSnapshot]:
+    """
+    Install the published snapshot if another worker published a newer generation.
+
+    Returns the newly installed snapshot, or None if nothing changed.
+    """
+    if _shared_index is None:
+        return None
+    current = _shared_index.current()
+    active = _active_snapshot
+    if current is None or (active is not None and active.generation == current["generation"]):
+        return None
+
+    snapshot = _shared_index.load(current)
+    if snapshot is None or not install_snapshot(snapshot, next(_generations)):
+        return None
+    _index_ready.set()
+    logger.info(f"Mapped shared index generation {snapshot.generation}")
+    return snapshot
+
+def install_snapshot(snapshot: KnowledgeSnapshot, generation: int) -> bool:
+    """
+    Make snapshot the one queries use, in a single reference swap.
+
+    Returns False if a snapshot requested later has already been installed.
+    """
+    global _active_snapshot, _installed_generation
+    with _snapshot_lock:
+        # A reload requested after this one may already have finished
+        if generation < _installed_generation:
+            return False
+        _active_snapshot = snapshot
+        _installed_generation = generation
+    return True
+
+def is_complete(snapshot: Optional[KnowledgeSnapshot], sections: List[Dict[str, Any]]) -> bool:
+    """True if snapshot has a vector index covering every section."""
+    return snapshot is not None and snapshot.dense is not None and len(snapshot.dense) == len(sections)
+
+def warm_retrieval_index(sections: List[Dict[str, Any]]) -> Optional[KnowledgeSnapshot]:
+    """Build the full snapshot for sections and make it the active one."""
+    generation = next(_generations)
+    with _build_lock:
+        with _snapshot_lock:
+            previous = _active_snapshot
+        if previous is not None and previous.sections is sections and is_complete(previous, sections):
+            return previous
+
+        start = time.perf_counter()
+        if _shared_index is not None:
+            snapshot = build_shared_snapshot(sections)
+        else:
+            snapshot = build_snapshot(sections)
+        if install_snapshot(snapshot, generation):
+            if previous is not None and previous.sections is not sections:
+                logger.info(f"Knowledge base changes: {diff_sections(previous.sections, sections)}")
+            if is_complete(snapshot, sections):
+                _index_ready.set()
+                logger.info(f"Built retrieval index over {len(snapshot.dense)} sections "
+                            f"in {time.perf_counter() - start:.2f}s")
+            else:
+                covered = len(snapshot.dense) if snapshot.dense is not None else 0
+                logger.warning(f"Retrieval index covers {covered} of {len(sections)} sections")
+        return snapshot
+
+def warm_until_complete(sections: List[Dict[str, Any]], on_done: Optional[Callable[[], None]] = None) -> None:
+    """
+    Warm the index for sections, retrying with backoff until it covers them all.
+
+    A build is incomplete when embedding calls failed (e.g. OpenAI was
+    down at boot); queries meanwhile use whatever was installed. No
+    attempt is made while the OpenAI circuit breaker is open, since its
+    calls would be rejected outright. Retries stop once a newer list of
+    sections is being warmed, or after WARMUP_MAX_ATTEMPTS, or when only
+    sections the API rejected as bad requests are missing; the partial
+    index is then served (those sections are found by BM25 only).
+
+    on_done, if given, is called when the index for sections is served,
+    complete or partial; not when a newer warm-up took over.
+    """
+    attempt = 0
+    while True:
+        snapshot = warm_retrieval_index(sections)
+        if is_complete(snapshot, sections):
+            if on_done is not None:
+                on_done()
+            return
+        retryable = sum(1 for section in sections if is_embeddable_missing(section_text(section)))
+        if retryable == 0 or attempt >= WARMUP_MAX_ATTEMPTS:
+            covered = len(snapshot.dense) if snapshot is not None and snapshot.dense is not None else 0
+            logger.error(f"Giving up on embedding {len(sections) - covered} of {len(sections)} sections "
+                         f"after {attempt + 1} attempts; serving a partial retrieval index")
+            with _snapshot_lock:
+                served = _warmup[0] is sections and _active_snapshot is snapshot
+                if served:
+                    _index_ready.set()
+            if served and on_done is not None:
+                on_done()
+            return
+        delay = min(WARMUP_RETRY_MAX, WARMUP_RETRY_BASE * 2 ** attempt)
+        attempt += 1
+        logger.info(f"Retrying the retrieval index build in {delay:.0f}s")
+        time.sleep(delay)
+        while True:
+            with _snapshot_lock:
+                if _warmup[0] is not sections:
+                    return
+            if openai_available():
+                break
+            time.sleep(WARMUP_RETRY_BASE)
+
+def start_index_warmup(sections: List[Dict[str, Any]],
+                       on_done: Optional[Callable[[], None]] = None) -> threading.Thread:
+    """
+    Build the snapshot for sections in a background thread (see warm_until_complete).
+
+    On a cold start (nothing installed yet) a lexical-only snapshot is
+    installed right away, so queries are answered from BM25 until the
+    vector index is warm instead of waiting for it.
+    """
+    global _warmup
+    thread = threading.Thread(
+        target=warm_until_complete,
+        args=(sections, on_done),
+        name="rag-index-warmup",
+        daemon=True
+    )
+    with _snapshot_lock:
+        _warmup = (sections, thread)
+        cold = _active_snapshot is None
+    if cold and RETRIEVAL_MODE == "hybrid":
+        install_snapshot(build_snapshot(sections, dense=False), next(_generations))
+    thread.start()
+    return thread
+
+def is_index_ready() -> bool:
+    """True once a warm retrieval index is available to serve queries."""
+    return _index_ready.is_set()
+
+def get_knowledge_version() -> Optional[str]:
+    """Version of the knowledge base queries are currently answered from."""
+    snapshot = _active_snapshot
+    return snapshot.version if snapshot is not None else None
+
+def get_snapshot(sections: List[Dict[str, Any]]) -> Optional[KnowledgeSnapshot]:
+    """
+    Return the snapshot to answer queries against this list of sections.
+
+    Indexes are built once per list returned by load_content_from_file and
+    reused by every query until the knowledge base is reloaded. While a
+    reload is still warming up, queries keep using the previous snapshot.
+    """
+    with _snapshot_lock:
+        active = _active_snapshot
+        warming_sections, thread = _warmup
+
+    if active is not None and active.sections is sections:
+        return active
+
+    if warming_sections is sections and thread is not None and thread.is_alive():
+        if active is not None:
+            return active
+        # Wait for the first build attempt; the thread may then keep retrying
+        while thread.is_alive():
+            thread.join(0.1)
+            with _snapshot_lock:
+                if _active_snapshot is not None and _active_snapshot.sections is sections:
+                    return _active_snapshot
+
+    return warm_retrieval_index(sections)
+
+SYSTEM_PROMPT = """You are Ignacio Garcia (Nacho), an accomplished Service Manager and IT Leader with 20+ years of experience.
         Your responses should reflect your extensive expertise in IT service management, digital transformation, and team leadership.
 
         Communication Guidelines:
@@ -199,30 +679,197 @@ def get_chat_response(query: str, context: str) -> str:
         Use the provided context to give accurate, relevant responses. If unsure about something, 
         acknowledge the limitation rather than speculating."""
 
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+def build_chat_messages(query: str, context: str, history=None) -> List[Dict[str, str]]:
+    """
+    Messages sent to the completion model for a query and its context.
+
+    history, if given, is the conversation memory (a summary of earlier
+    turns plus the latest exchanges), inserted before the question.
+    """
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if history:
+        if history.summary:
+            messages.append({"role": "system", "content": f"Summary of the conversation so far: {history.summary}"})
+        for previous_query, previous_answer in history.turns:
+            messages.append({"role": "user", "content": previous_query})
+            messages.append({"role": "assistant", "content": previous_answer})
+    messages.append({"role": "user", "content": f"Context:\n{context}\n\nQuestion: {query}"})
+    return messages
+
+SUMMARY_PROMPT = """Maintain a short running summary of a conversation between a website visitor and
+        Ignacio's CV assistant. Merge the new exchanges into the existing summary. Keep who the visitor
+        is, the topics, companies and skills discussed, and any open questions. Answer with the summary
+        only, in at most 120 words."""
+
+def summarize_conversation(summary: str, turns: List[tuple]) -> str:
+    """Fold exchanges that left the conversation window into the rolling summary."""
+    exchanges = "\n".join(f"Visitor: {query}\nAssistant: {answer}" for query, answer in turns)
+    with openai_call("summary"):
+        response = get_client().chat(
+            model=COMPLETION_MODEL,
             messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {query}"}
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Summary so far:\n{summary or '(empty)'}\n\nNew exchanges:\n{exchanges}"}
             ],
-            temperature=0.7,
-            max_tokens=300  # Increased token limit for more detailed responses
+            temperature=0.2,
+            max_tokens=200
         )
+    record_openai_usage(COMPLETION_MODEL, getattr(response, "usage", None))
+    return response.choices[0].message.content.strip()
+
+def degraded_response(context: str) -> str:
+    """
+    Answer without the completion model: an excerpt of the retrieved context.
+
+    Used while OpenAI is failing, so visitors still get something useful
+    quickly instead of an apology after a long timeout.
+    """
+    if not context:
+        return CHAT_ERROR_RESPONSE
+    excerpt = context.strip()
+    if len(excerpt) > DEGRADED_EXCERPT_CHARS:
+        excerpt = excerpt[:DEGRADED_EXCERPT_CHARS].rsplit(" ", 1)[0] + "..."
+    return f"{DEGRADED_RESPONSE_INTRO}\n\n{excerpt}"
+
+def is_fallback_response(response: str) -> bool:
+    """True for the apology and degraded answers, which are never worth caching."""
+    return response == CHAT_ERROR_RESPONSE or response.startswith(DEGRADED_RESPONSE_INTRO)
+
+def get_chat_response(query: str, context: str, history=None) -> str:
+    """
+    Get chat completion using the relevant context.
+
+    If the call fails (or the circuit breaker is open) a degraded answer
+    built from the context is returned instead.
+    """
+    try:
+        with openai_call("chat"):
+            response = get_client().chat(
+                model=COMPLETION_MODEL,
+                messages=build_chat_messages(query, context, history),
+                temperature=0.7,
+                max_tokens=300  # Increased token limit for more detailed responses
+            )
+        record_openai_usage(COMPLETION_MODEL, getattr(response, "usage", None))
         return response.choices[0].message.content
     except Exception as e:
         logger.error(f"Error getting chat response: {str(e)}")
-        return "I apologize, but I encountered an error processing your question."
+        return degraded_response(context)
 
-# Configuration
-EMBEDDING_MODEL = "text-embedding-ada-002"  # 8K token limit per input
-COMPLETION_MODEL = "gpt-3.5-turbo"         # 16K token context window
-SIMILARITY_THRESHOLD = 0.7                  # Minimum similarity score to consider a section relevant
+async def get_chat_response_async(query: str, context: str, history=None) -> str:
+    """get_chat_response for coroutines."""
+    try:
+        with openai_call("chat"):
+            response = await get_async_client().chat(
+                model=COMPLETION_MODEL,
+                messages=build_chat_messages(query, context, history),
+                temperature=0.7,
+                max_tokens=300
+            )
+        record_openai_usage(COMPLETION_MODEL, getattr(response, "usage", None))
+        return response.choices[0].message.content
+    except Exception as e:
+        logger.error(f"Error getting chat response: {str(e)}")
+        return degraded_response(context)
+
+def stream_chat_response(query: str, context: str, history=None) -> Iterator[str]:
+    """
+    Stream a chat completion, yielding text fragments as the model produces them.
+
+    If the request fails before anything was produced, the degraded answer
+    is yielded instead, so callers always end up with a complete answer.
+    """
+    produced = False
+    try:
+        with openai_call("chat_stream"):
+            stream = get_client().chat_stream(
+                model=COMPLETION_MODEL,
+                messages=build_chat_messages(query, context, history),
+                temperature=0.7,
+                max_tokens=300,
+                # The last chunk then carries the token counts
+                stream_options={"include_usage": True}
+            )
+            for chunk in stream:
+                record_openai_usage(COMPLETION_MODEL, getattr(chunk, "usage", None))
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    produced = True
+                    yield text
+    except Exception as e:
+        logger.error(f"Error streaming chat response: {str(e)}")
+        if not produced:
+            yield degraded_response(context)
+
+async def stream_chat_response_async(query: str, context: str, history=None) -> AsyncIterator[str]:
+    """stream_chat_response for coroutines."""
+    produced = False
+    try:
+        with openai_call("chat_stream"):
+            stream = get_async_client().chat_stream(
+                model=COMPLETION_MODEL,
+                messages=build_chat_messages(query, context, history),
+                temperature=0.7,
+                max_tokens=300,
+                stream_options={"include_usage": True}
+            )
+            try:
+                async for chunk in stream:
+                    record_openai_usage(COMPLETION_MODEL, getattr(chunk, "usage", None))
+                    if not chunk.choices:
+                        continue
+                    text = chunk.choices[0].delta.content
+                    if text:
+                        produced = True
+                        yield text
+            finally:
+                # Release the client's slot now if the caller stopped early
+                await stream.aclose()
+    except Exception as e:
+        logger.error(f"Error streaming chat response: {str(e)}")
+        if not produced:
+            yield degraded_response(context)
+
+
+# Persistent, content-addressed store for section embeddings
+_embedding_store = EmbeddingStore()
+
+# Keys of section texts the embeddings API rejected on their own (see embed_missing_sections)
+_unembeddable: Set[str] = set()
+
+# Concurrent misses for the same query share one embedding call (section
+# embedding is already one build at a time, under _build_lock)
+_embedding_flight = SingleFlight()
+
+# Recent query embeddings, keyed on normalized query text
+_query_embeddings = QueryEmbeddingCache(lambda text: get_embedding(text), flight=_embedding_flight,
+                                        embed_async=lambda text: get_embedding_async(text))
+
+def get_query_embedding(query: str) -> List[float]:
+    """Get the embedding of a user query, reusing recent identical queries."""
+    return _query_embeddings.get(query)
+
+async def get_query_embedding_async(query: str) -> List[float]:
+    """get_query_embedding for coroutines; shares its cache."""
+    return await _query_embeddings.get_async(query)
+
+def peek_query_embedding(query: str) -> Optional[List[float]]:
+    """Return a cached query embedding, or None, without calling the API."""
+    return _query_embeddings.peek(query)
+
+def get_query_cache_stats() -> Dict[str, Any]:
+    return _query_embeddings.stats()
 
-# Cache for embeddings
-_embeddings_cache = {}
+# Index published for all worker processes, when SHARED_INDEX_DIR is set
+_shared_index = SharedIndexDirectory(SHARED_INDEX_DIR) if SHARED_INDEX_DIR else None
 
-def get_cached_embedding(text: str) -> List[float]:
-    """Get embedding from cache or compute and cache it."""
-    if text not in _embeddings_cache:
-        _embeddings_cache[text] = get_embedding(text)
-    return _embeddings_cache[text]
\ No newline at end of file
+# Snapshot (sections + indexes) that queries are answered from
+_snapshot_lock = threading.Lock()
+_active_snapshot: Optional[KnowledgeSnapshot] = None
+_build_lock = threading.Lock()
+_index_ready = threading.Event()
+_warmup = (None, None)
+_generations = itertools.count()
+_installed_generation = -1
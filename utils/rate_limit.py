@@ -0,0 +1,319 @@
+import os
+import math
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from flask import jsonify, make_response, request
+
+from utils.metrics import REGISTRY, METRICS_ENABLED
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Configuration
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_STORE = os.environ.get("RATE_LIMIT_STORE", "memory")          # "memory", or a SQLite file shared by workers
+RATE_LIMIT_KEY = os.environ.get("RATE_LIMIT_KEY", "ip")                  # "ip", or "session" (issued chat session id, else ip)
+RATE_LIMIT_PROXY_HOPS = int(os.environ.get("RATE_LIMIT_PROXY_HOPS", "0"))  # Trusted proxies setting X-Forwarded-For
+RATE_LIMIT_SESSIONS_PER_IP = float(os.environ.get("RATE_LIMIT_SESSIONS_PER_IP", "10"))  # Session budgets one address shares
+BUCKET_MAX_KEYS = 100000                # Buckets kept in memory (idle ones are full, so dropping them is lossless)
+BUCKET_MAX_IDLE = 3600                  # Seconds before an idle bucket is removed from the shared store
+BUSY_RETRY_AFTER = 2                    # Seconds suggested to clients shed by a concurrency cap
+
+# Per-route budgets: requests per minute per client, burst size, requests in flight per process
+CHAT_RATE_PER_MINUTE = float(os.environ.get("CHAT_RATE_PER_MINUTE", "12"))
+CHAT_BURST = int(os.environ.get("CHAT_BURST", "6"))
+CHAT_MAX_CONCURRENT = int(os.environ.get("CHAT_MAX_CONCURRENT", "16"))
+IMPORT_RATE_PER_MINUTE = float(os.environ.get("IMPORT_RATE_PER_MINUTE", "2"))
+IMPORT_BURST = int(os.environ.get("IMPORT_BURST", "5"))
+IMPORT_MAX_CONCURRENT = int(os.environ.get("IMPORT_MAX_CONCURRENT", "2"))
+
+LIMITED_REQUESTS = REGISTRY.counter(
+    "http_requests_limited_total", "Requests rejected with a 429.", ["route", "reason"]
+)
+
+
+def take_token(tokens: float, updated: float, now: float, rate: float, capacity: float,
+               cost: float = 1.0) -> Tuple[float, bool, float]:
+    """
+    Token bucket step: refill for the time elapsed, then try to spend cost.
+
+    Returns (tokens left, allowed, seconds until cost would be available).
+    """
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= cost:
+        return tokens - cost, True, 0.0
+    return tokens, False, (cost - tokens) / rate if rate > 0 else math.inf
+
+
+class MemoryBucketStore:
+    """Buckets in this process only; each worker enforces its own limits."""
+
+    def __init__(self, max_keys: int = BUCKET_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens, allowed, retry_after = take_token(tokens, updated, now, rate, capacity, cost)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """
+    Buckets in a SQLite file, shared by every worker process on the host.
+
+    Each take is one short IMMEDIATE transaction, so concurrent workers
+    serialize on the bucket update. If the file can't be used the request
+    is allowed (fail open) rather than turning a limiter fault into an
+    outage.
+    """
+
+    def __init__(self, path: str, max_idle: float = BUCKET_MAX_IDLE):
+        self.path = path
+        self.max_idle = max_idle
+        self._local = threading.local()
+        self._takes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> Tuple[bool, float]:
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens, updated = row if row is not None else (capacity, now)
+                tokens, allowed, retry_after = take_token(tokens, updated, now, rate, capacity, cost)
+                conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                             (key, tokens, now))
+                self._takes += 1
+                if self._takes % 1000 == 0:
+                    conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.max_idle,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return allowed, retry_after
+        except Exception as e:
+            logger.error(f"Error updating rate limit bucket: {str(e)}")
+            return True, 0.0
+
+    def __len__(self) -> int:
+        try:
+            return self._connection().execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+        except Exception:
+            return 0
+
+
+def bucket_store_from_env(setting: str = RATE_LIMIT_STORE):
+    """'memory' for per-process buckets, anything else is the path of a shared SQLite file."""
+    if setting in ("", "memory"):
+        return MemoryBucketStore()
+    return SQLiteBucketStore(setting[len("sqlite:///"):] if setting.startswith("sqlite:///") else setting)
+
+
+class ConcurrencyLimit:
+    """A non-blocking cap on requests in flight: over the cap, shed instead of queueing."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+
+def client_address(remote_addr: str, forwarded_for: List[str], proxy_hops: int = RATE_LIMIT_PROXY_HOPS) -> str:
+    """The client's IP, trusting only the last proxy_hops entries of X-Forwarded-For."""
+    # X-Forwarded-For is "client, proxy1, ..."; earlier entries can be forged by the client
+    if proxy_hops > 0 and forwarded_for:
+        return forwarded_for[-proxy_hops] if len(forwarded_for) >= proxy_hops else forwarded_for[0]
+    return remote_addr or "unknown"
+
+
+# A bucket a request counts against, and its size as a multiple of the route's budget
+BucketKey = Tuple[str, float]
+
+
+def bucket_keys(address: str, session_id: Optional[str] = None,
+                issued: Optional[Callable[[str], bool]] = None,
+                key_mode: str = RATE_LIMIT_KEY) -> List[BucketKey]:
+    """
+    The buckets of a request from address, carrying session_id.
+
+    In session mode a session id counts only if issued(session_id) says
+    the server handed it out, so made-up ids fall back to the address.
+    Every session from one address also draws on a shared bucket of
+    RATE_LIMIT_SESSIONS_PER_IP budgets, so collecting fresh ids can't
+    multiply a client's budget without bound.
+    """
+    if key_mode == "session" and session_id and issued is not None and issued(session_id):
+        return [(f"session:{session_id}", 1.0), (f"sessions-ip:{address}", RATE_LIMIT_SESSIONS_PER_IP)]
+    return [(f"ip:{address}", 1.0)]
+
+
+def client_key(issued: Optional[Callable[[str], bool]] = None, key_mode: str = RATE_LIMIT_KEY) -> List[BucketKey]:
+    """Who a Flask request counts against: its client IP, or its issued chat session when configured."""
+    session_id = None
+    if key_mode == "session":
+        data = request.get_json(silent=True) or {}
+        session_id = data.get("session_id") if isinstance(data, dict) else None
+    forwarded_for = request.access_route if request.headers.get("X-Forwarded-For") else []
+    return bucket_keys(client_address(request.remote_addr, forwarded_for), session_id, issued, key_mode)
+
+
+class RateLimiter:
+    """
+    Admission control for expensive routes.
+
+    limit(name, ...) decorates a view with two checks, each answered with
+    a 429 and a Retry-After header:
+
+    - a token bucket per client (rate_per_minute, with bursts of up to
+      `burst`), kept in the bucket store, so one client can't monopolize
+      the route;
+    - a cap on requests of this route in flight in this process, so a
+      spike is shed quickly instead of queueing behind slow upstream
+      calls. Streamed responses hold their slot until the stream closes.
+
+    Routes sharing a name share their budgets. Servers that don't go
+    through Flask use budget(), admit() and release() directly.
+    """
+
+    def __init__(self, store=None, enabled: bool = RATE_LIMIT_ENABLED,
+                 key: Callable[[], Union[str, Sequence[BucketKey]]] = client_key):
+        self.store = store if store is not None else bucket_store_from_env()
+        self.enabled = enabled
+        self.key = key
+        self._budgets: Dict[str, Tuple[float, int]] = {}
+        self._concurrency: Dict[str, ConcurrencyLimit] = {}
+        self._limited: Dict[str, int] = {}
+
+    def budget(self, name: str, rate_per_minute: float, burst: int, max_concurrent: int) -> None:
+        """Set the budgets of a route name (changing them if already set)."""
+        self._budgets[name] = (rate_per_minute / 60.0, burst)
+        if name in self._concurrency:
+            self._concurrency[name].limit = max_concurrent
+        else:
+            self._concurrency[name] = ConcurrencyLimit(max_concurrent)
+
+    def admit(self, name: str, client: Union[str, Sequence[BucketKey]]) -> Optional[Tuple[str, float, str]]:
+        """
+        None if the request may proceed, holding one of the route's slots
+        until release(name). Otherwise (reason, retry_after, message).
+
+        client is a bucket key, or several (key, size) pairs that must all
+        have a token to spare (see bucket_keys).
+        """
+        if not self.enabled:
+            return None
+        rate, burst = self._budgets[name]
+        allowed, retry_after = True, 0.0
+        for key, size in ([(client, 1.0)] if isinstance(client, str) else client):
+            # Stop at the first empty bucket so a rejected request doesn't drain the others
+            allowed, retry_after = self.store.take(f"{name}:{key}", rate * size, burst * size)
+            if not allowed:
+                break
+        if not allowed:
+            rejection = ("rate", retry_after,
+                         f"Too many requests. Please wait {max(1, math.ceil(retry_after))} seconds and try again.")
+        elif not self._concurrency[name].acquire():
+            rejection = ("concurrency", BUSY_RETRY_AFTER, "The assistant is busy right now. Please try again in a moment.")
+        else:
+            return None
+        self._limited[f"{name}:{rejection[0]}"] = self._limited.get(f"{name}:{rejection[0]}", 0) + 1
+        if METRICS_ENABLED:
+            LIMITED_REQUESTS.inc(route=name, reason=rejection[0])
+        return rejection
+
+    def release(self, name: str) -> None:
+        if self.enabled:
+            self._concurrency[name].release()
+
+    @staticmethod
+    def rejection_body(retry_after: float, message: str) -> Tuple[int, Dict[str, object]]:
+        """Retry-After seconds and the JSON body of a 429."""
+        seconds = max(1, math.ceil(retry_after))
+        # "response" too, so chat clients can show the message as the bot's answer
+        return seconds, {"success": False, "error": message, "response": message, "retry_after": seconds}
+
+    def limit(self, name: str, rate_per_minute: float, burst: int, max_concurrent: int) -> Callable:
+        self.budget(name, rate_per_minute, burst, max_concurrent)
+
+        def decorator(view: Callable) -> Callable:
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                rejection = self.admit(name, self.key())
+                if rejection is not None:
+                    _, retry_after, message = rejection
+                    seconds, body = self.rejection_body(retry_after, message)
+                    response = jsonify(body)
+                    response.status_code = 429
+                    response.headers["Retry-After"] = str(seconds)
+                    return response
+                try:
+                    response = make_response(view(*args, **kwargs))
+                except Exception:
+                    self.release(name)
+                    raise
+                if response.is_streamed:
+                    response.call_on_close(lambda: self.release(name))
+                else:
+                    self.release(name)
+                return response
+
+            return wrapper
+
+        return decorator
+
+    def in_flight(self) -> Dict[str, int]:
+        return {name: limit.in_flight for name, limit in self._concurrency.items()}
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "store": type(self.store).__name__,
+            "buckets": len(self.store),
+            "in_flight": self.in_flight(),
+            "limits": {name: limit.limit for name, limit in self._concurrency.items()},
+            "rejected": dict(self._limited)
+        }
@@ -0,0 +1,139 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Configuration
+RESPONSE_CACHE_THRESHOLD = float(os.environ.get("RESPONSE_CACHE_THRESHOLD", "0.95"))  # Query similarity needed for a hit
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "256"))               # Max cached answers (LRU)
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "3600"))              # Seconds an answer stays valid
+
+
+class ResponseCache:
+    """
+    Semantic cache of chatbot answers keyed by query embedding.
+
+    A lookup matches the closest cached query by cosine similarity and
+    returns its answer when the similarity reaches the threshold, so
+    "tell me about yourself" and "what's your background" can share one
+    completion. Cached query vectors live in a fixed-size matrix, so a
+    lookup is a single matrix-vector product over at most max_entries rows.
+
+    Entries are evicted least-recently-used when full, after ttl seconds,
+    and all at once when the knowledge base version changes.
+    """
+
+    def __init__(
+        self,
+        threshold: float = RESPONSE_CACHE_THRESHOLD,
+        max_entries: int = RESPONSE_CACHE_SIZE,
+        ttl: float = RESPONSE_CACHE_TTL,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._version: Any = None
+        self._matrix: Optional[np.ndarray] = None
+        self._active = np.zeros(max_entries, dtype=bool)
+        # slot -> (answer, stored_at); order is least to most recently used
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if vector.ndim != 1 or norm == 0:
+            return None
+        return vector / norm
+
+    def _check_version(self, version: Any) -> None:
+        if version != self._version:
+            if self._entries:
+                logger.info("Knowledge base changed, clearing response cache")
+            self._clear_locked()
+            self._version = version
+
+    def _clear_locked(self) -> None:
+        self._entries.clear()
+        self._active[:] = False
+
+    def _evict_locked(self, slot: int) -> None:
+        self._entries.pop(slot, None)
+        self._active[slot] = False
+
+    def get(self, embedding: List[float], version: Any = None) -> Optional[str]:
+        """Return the cached answer for the most similar query, or None."""
+        query = self._normalize(embedding)
+        with self._lock:
+            self._check_version(version)
+            if query is None or self._matrix is None or not self._entries or query.shape[0] != self._matrix.shape[1]:
+                self.misses += 1
+                return None
+
+            scores = self._matrix @ query
+            scores[~self._active] = -np.inf
+            slot = int(np.argmax(scores))
+            if scores[slot] < self.threshold:
+                self.misses += 1
+                return None
+
+            answer, stored_at = self._entries[slot]
+            if time.monotonic() - stored_at > self.ttl:
+                self._evict_locked(slot)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            return answer
+
+    def put(self, embedding: List[float], answer: str, version: Any = None) -> None:
+        """Cache an answer under its query embedding."""
+        query = self._normalize(embedding)
+        if query is None or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            if self._matrix is None or self._matrix.shape[1] != query.shape[0]:
+                self._matrix = np.zeros((self.max_entries, query.shape[0]), dtype=np.float32)
+                self._clear_locked()
+
+            if len(self._entries) >= self.max_entries:
+                oldest = next(iter(self._entries))
+                self._evict_locked(oldest)
+            slot = int(np.argmin(self._active))
+
+            self._matrix[slot] = query
+            self._active[slot] = True
+            self._entries[slot] = (answer, time.monotonic())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size, for tuning the threshold and capacity."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl": self.ttl,
+        }
@@ -0,0 +1,96 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+def section_text(section: Dict[str, Any]) -> str:
+    """Text that is embedded and returned as context for a section."""
+    return f"{section['title']}: {section['content']}"
+
+
+class RetrievalIndex:
+    """
+    Dense top-k retrieval over a fixed set of section embeddings.
+
+    Section vectors are L2-normalized once at build time, so answering a
+    query is a single matrix-vector product followed by argpartition:
+    O(n) for the scores and O(k log k) for ordering the winners, instead of
+    a Python loop and a full sort over every section.
+    """
+
+    def __init__(self, texts: List[str], embeddings: np.ndarray, positions: Optional[List[int]] = None):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(texts):
+            raise ValueError("Expected one embedding row per section text")
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.matrix = matrix / norms
+        self.texts = texts
+        # Position of each row in the section list the index was built from
+        self.positions = np.asarray(positions if positions is not None else range(len(texts)), dtype=np.int64)
+
+    @classmethod
+    def from_normalized(cls, texts: List[str], matrix: np.ndarray, positions: List[int]) -> "RetrievalIndex":
+        """Wrap an already-normalized matrix (e.g. a read-only memory map) without copying it."""
+        index = cls.__new__(cls)
+        index.matrix = matrix
+        index.texts = texts
+        index.positions = np.asarray(positions, dtype=np.int64)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def scores(self, query_embedding: List[float]) -> np.ndarray:
+        """Cosine similarity of the query against every section."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.zeros(len(self.texts), dtype=np.float32)
+        return self.matrix @ (query / norm)
+
+    def search(self, query_embedding: List[float], top_k: int = 1, threshold: float = 0.0) -> List[Tuple[float, int]]:
+        """
+        Return up to top_k (score, row) pairs, best first, whose cosine
+        similarity to the query is at least threshold.
+        """
+        if not len(self.texts) or top_k <= 0:
+            return []
+
+        scores = self.scores(query_embedding)
+        k = min(top_k, len(scores))
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+
+        return [(float(scores[row]), int(row)) for row in top if scores[row] >= threshold]
+
+
+class KnowledgeSnapshot:
+    """
+    One loaded knowledge base together with the indexes built over it.
+
+    A snapshot is never modified after it is built; reloading builds a new
+    one and swaps the reference, so a request that grabbed a snapshot sees
+    sections, lexical index and vector index from the same version.
+    """
+
+    def __init__(self, sections: List[Dict[str, Any]], version: str, lexical: Any = None,
+                 dense: Optional[RetrievalIndex] = None, generation: int = 0):
+        self.sections = sections
+        self.version = version
+        self.lexical = lexical
+        self.dense = dense
+        # Shared index generation this snapshot was mapped from (0 if built locally)
+        self.generation = generation
+
+    def __len__(self) -> int:
+        return len(self.sections)
@@ -0,0 +1,123 @@
+import os
+import json
+import fcntl
+import shutil
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from utils.bm25 import BM25Index
+from utils.retrieval import RetrievalIndex, KnowledgeSnapshot, section_text
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "builder.lock"
+GENERATION_PREFIX = "gen-"
+
+
+class SharedIndexDirectory:
+    """
+    A knowledge index published to disk for every worker process to map.
+
+    Layout:
+    - gen-<generation>-<version>/matrix.npy: normalized float32 section vectors
+    - gen-<generation>-<version>/sections.json: sections and matrix row positions
+    - CURRENT: {"generation": int, "version": str, "path": directory name}
+
+    One process at a time builds and publishes (guarded by an flock on
+    builder.lock). Publishing writes a new generation directory and then
+    swaps CURRENT with os.replace. Workers compare the generation in
+    CURRENT with the one they have mapped and load the new one when it
+    changes; the matrix is opened with mmap_mode='r', so all workers share
+    the same pages instead of each holding a private copy.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def current_path(self) -> str:
+        return os.path.join(self.directory, CURRENT_FILE)
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        """The published generation, or None if nothing has been published."""
+        try:
+            with open(self.current_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading shared index pointer: {str(e)}")
+            return None
+
+    def generation(self) -> int:
+        current = self.current()
+        return current["generation"] if current else 0
+
+    @contextmanager
+    def builder_lock(self):
+        """Exclusive, cross-process lock held while building and publishing."""
+        with open(os.path.join(self.directory, LOCK_FILE), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def publish(self, snapshot: KnowledgeSnapshot) -> Dict[str, Any]:
+        """Write snapshot as the next generation and point CURRENT at it. Hold builder_lock."""
+        generation = self.generation() + 1
+        name = f"{GENERATION_PREFIX}{generation:06d}-{snapshot.version}"
+        path = os.path.join(self.directory, name)
+        os.makedirs(path, exist_ok=True)
+
+        with open(os.path.join(path, "matrix.npy"), 'wb') as f:
+            np.save(f, np.ascontiguousarray(snapshot.dense.matrix, dtype=np.float32))
+        with open(os.path.join(path, "sections.json"), 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": snapshot.version,
+                "sections": snapshot.sections,
+                "positions": snapshot.dense.positions.tolist()
+            }, f, ensure_ascii=False)
+
+        current = {"generation": generation, "version": snapshot.version, "path": name}
+        tmp_path = f"{self.current_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(current, f)
+        os.replace(tmp_path, self.current_path)
+        logger.info(f"Published shared index generation {generation} ({len(snapshot)} sections)")
+
+        self._remove_old_generations(keep={name})
+        return current
+
+    def load(self, current: Optional[Dict[str, Any]] = None) -> Optional[KnowledgeSnapshot]:
+        """Map a published generation (the current one by default)."""
+        current = current or self.current()
+        if current is None:
+            return None
+
+        path = os.path.join(self.directory, current["path"])
+        with open(os.path.join(path, "sections.json"), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        matrix = np.load(os.path.join(path, "matrix.npy"), mmap_mode='r')
+
+        sections = data["sections"]
+        positions = data["positions"]
+        dense = RetrievalIndex.from_normalized([section_text(sections[p]) for p in positions], matrix, positions)
+        lexical = BM25Index([section_text(section) for section in sections])
+        return KnowledgeSnapshot(sections, data["version"], lexical, dense, current["generation"])
+
+    def _remove_old_generations(self, keep) -> None:
+        # Keep the newest previous generation too, for workers that are mid-switch
+        generations = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(GENERATION_PREFIX) and name not in keep
+        )
+        for name in generations[:-1]:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
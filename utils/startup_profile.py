@@ -0,0 +1,61 @@
+import re
+import sys
+import time
+import logging
+import subprocess
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Startup phase -> milliseconds, in the order the phases ran
+_phases: "OrderedDict[str, float]" = OrderedDict()
+
+
+@contextmanager
+def phase(name: str):
+    """Record how long a startup phase takes."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] = (time.perf_counter() - start) * 1000
+
+
+def report() -> Dict[str, float]:
+    """Startup phase timings in milliseconds."""
+    return dict(_phases)
+
+
+def log_report() -> None:
+    summary = " ".join(f"{name}={ms:.1f}ms" for name, ms in _phases.items())
+    logger.info(f"Startup profile: {summary}")
+
+
+def import_time_report(module: str = "app", top: int = 20) -> List[Tuple[str, float, float]]:
+    """
+    Profile importing module in a fresh interpreter with `python -X importtime`.
+
+    Returns (module, self ms, cumulative ms) for the top-level imports with
+    the largest cumulative time, slowest first.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        # Only direct imports (one space of indentation) to keep the report short
+        if match and len(match.group(3)) == 1:
+            rows.append((match.group(4), int(match.group(1)) / 1000, int(match.group(2)) / 1000))
+    if completed.returncode != 0:
+        logger.error(f"Importing {module} failed: {completed.stderr.strip().splitlines()[-1:]}")
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows[:top]
@@ -0,0 +1,186 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import insert
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Configuration
+WRITE_BEHIND_ENABLED = os.environ.get("WRITE_BEHIND", "").lower() in ("1", "true", "yes")
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", "100"))     # Rows per bulk insert
+WRITE_BEHIND_INTERVAL = float(os.environ.get("WRITE_BEHIND_INTERVAL", "2.0"))       # Max seconds a row waits
+WRITE_BEHIND_MAX_QUEUE = int(os.environ.get("WRITE_BEHIND_MAX_QUEUE", "10000"))     # Rows buffered before backpressure
+WRITE_BEHIND_MAX_RETRIES = int(os.environ.get("WRITE_BEHIND_MAX_RETRIES", "5"))     # Retries of a failed batch before dropping it
+WRITE_BEHIND_RETRY_BASE = 1.0                                                       # Seconds before the first retry, doubling each time
+
+
+class WriteBehindQueue:
+    """
+    Buffer inserts in memory and write them to the database in batches.
+
+    Rows are queued from the request thread without touching the database.
+    A background thread flushes them with one bulk INSERT per model whenever
+    batch_size rows are waiting or flush_interval seconds have passed since
+    the oldest one arrived, so a burst of requests costs a few round trips
+    instead of one commit each. Remaining rows are flushed on shutdown.
+
+    A batch that fails to write (database restarting, connection lost) is
+    retried up to max_retries times with exponential backoff; only then
+    are its rows dropped, and each dropped row is logged.
+
+    Only use this for fire-and-forget rows such as logs; anything whose
+    caller needs confirmation should be committed synchronously.
+    """
+
+    def __init__(self, app, db, batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+                 flush_interval: float = WRITE_BEHIND_INTERVAL, max_queue: int = WRITE_BEHIND_MAX_QUEUE,
+                 max_retries: int = WRITE_BEHIND_MAX_RETRIES, retry_base: float = WRITE_BEHIND_RETRY_BASE):
+        self.app = app
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self._queue: "queue.Queue[Tuple[Any, Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._write_lock = threading.Lock()
+        # Failed batches waiting for another attempt: (due time, attempts so far, rows)
+        self._retries: List[Tuple[float, int, List[Tuple[Any, Dict[str, Any]]]]] = []
+        self._retry_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.written = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Stop the background thread and write everything still queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+
+    def enqueue(self, model, values: Dict[str, Any]) -> None:
+        """Queue one row for insertion into model's table."""
+        try:
+            self._queue.put_nowait((model, values))
+        except queue.Full:
+            # Backpressure: write this row on the caller's thread rather than drop it
+            logger.warning("Write-behind queue is full, writing synchronously")
+            self._write([(model, values)])
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def retrying(self) -> int:
+        """Rows of failed batches waiting for another attempt."""
+        with self._retry_lock:
+            return sum(len(items) for _, _, items in self._retries)
+
+    def flush(self) -> None:
+        """Write every queued row now, and retry failed batches without waiting out their backoff."""
+        for _, attempts, items in self._take_retries(due_only=False):
+            self._write(items, attempts)
+        items = self._drain(block=False)
+        while items:
+            self._write(items)
+            items = self._drain(block=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self._thread is not None,
+            "depth": self.depth(),
+            "written": self.written,
+            "retrying": self.retrying(),
+            "retried": self.retried,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+    def _drain(self, block: bool) -> List[Tuple[Any, Dict[str, Any]]]:
+        items = []
+        deadline = None
+        while len(items) < self.batch_size:
+            try:
+                if block and not items:
+                    # Wait for the first row, returning regularly to check for stop and retries
+                    items.append(self._queue.get(timeout=0.5))
+                    deadline = time.monotonic() + self.flush_interval
+                elif block:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    items.append(self._queue.get(timeout=remaining))
+                else:
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            for _, attempts, items in self._take_retries(due_only=True):
+                self._write(items, attempts)
+            items = self._drain(block=True)
+            if items:
+                self._write(items)
+
+    def _take_retries(self, due_only: bool) -> List[Tuple[float, int, List[Tuple[Any, Dict[str, Any]]]]]:
+        now = time.monotonic()
+        with self._retry_lock:
+            taken = [entry for entry in self._retries if not due_only or entry[0] <= now]
+            self._retries = [entry for entry in self._retries if due_only and entry[0] > now]
+        return taken
+
+    def _retry_later(self, items: List[Tuple[Any, Dict[str, Any]]], attempts: int) -> None:
+        # Once stopped, nothing is left to retry them
+        if attempts > self.max_retries or (self._stop.is_set() and self._thread is None):
+            self._drop(items, attempts)
+            return
+        delay = self.retry_base * 2 ** (attempts - 1)
+        with self._retry_lock:
+            self._retries.append((time.monotonic() + delay, attempts, items))
+        self.retried += len(items)
+        logger.warning(f"Retrying {len(items)} queued rows in {delay:g}s (attempt {attempts + 1})")
+
+    def _drop(self, items: List[Tuple[Any, Dict[str, Any]]], attempts: int) -> None:
+        self.failed += len(items)
+        logger.error(f"Dropping {len(items)} queued rows after {attempts} failed attempts")
+        for model, values in items:
+            logger.error(f"Dropped {model.__tablename__} row: {values!r}")
+
+    def _write(self, items: List[Tuple[Any, Dict[str, Any]]], attempts: int = 0) -> None:
+        rows_by_model = defaultdict(list)
+        for model, values in items:
+            rows_by_model[model].append(values)
+
+        with self._write_lock, self.app.app_context():
+            try:
+                for model, rows in rows_by_model.items():
+                    self.db.session.execute(insert(model), rows)
+                self.db.session.commit()
+                self.written += len(items)
+                self.batches += 1
+                logger.debug(f"Write-behind flushed {len(items)} rows")
+            except Exception as e:
+                self.db.session.rollback()
+                logger.error(f"Error flushing {len(items)} queued rows: {str(e)}")
+                self._retry_later(items, attempts + 1)
+            finally:
+                self.db.session.remove()